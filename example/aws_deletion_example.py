@@ -15,7 +15,6 @@
 #
 
 from miqcli import Client
-from time import sleep
 
 # The input to aws deletion is the name of the vm and provider name
 # INPUT_VM_NAME = "<vm_name_to_delete>"
@@ -61,12 +60,7 @@ print("INFO: Task ID of terminate instance: {0}".format(task_id))
 
 # check the deletion task, and wait for it to be finished
 client.collection = "tasks"
-done = False
-while not done:
-    result = client.collection.status(task_id)
-    if result.state == "Finished":
-        done = True
-    sleep(5)
+result = client.collection.wait_for(task_id)
 
 if result.status == "Error":
     print("Deleting the instance: {0} failed: {1}".format(INPUT_VM_NAME,
@@ -81,12 +75,7 @@ print("INFO: Task ID for attempt to delete vm: {0}".format(task_id))
 
 # check the task and make sure the vm reference is removed successfully
 client.collection = "tasks"
-done = False
-while not done:
-    result = client.collection.status(task_id)
-    if result.state == "Finished":
-        done = True
-    sleep(5)
+result = client.collection.wait_for(task_id)
 
 if result.status == "Error":
     print("Deleting the VM reference: {0} failed: "
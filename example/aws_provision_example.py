@@ -16,7 +16,6 @@
 
 import json
 from miqcli import Client
-from time import sleep
 
 # create a client object
 # use the default credentials
@@ -47,23 +46,14 @@ print("ID of the request: {0}".format(req_id))
 
 # Query the provision request until it is active, then query
 # the spawned request task
-done = False
-while not done:
-    result = client.collection.status(req_id)
-    if result.request_state == 'active' or result.request_state == 'finished':
-        done = True
-    sleep(5)
+result = client.collection.wait_for(
+    req_id, states=('active', 'finished'))
 
 # 3. the script will query the request task until the state is finished
 #  once finished, it will return information about the provisioned machine
 #  or display the error message
 client.collection = "request_tasks"
-done = False
-while not done:
-    result = client.collection.status(req_id)
-    if result.state == "finished":
-        done = True
-    sleep(5)
+result = client.collection.wait_for(req_id)
 
 # 4. Report the floating ip address back to the user if there are no errors
 if result.status == "Error":
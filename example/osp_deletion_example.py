@@ -15,7 +15,6 @@
 #
 import ast
 from miqcli import Client
-from time import sleep
 
 # The input to deletion is the name of the vm and provider name
 # INPUT_VM_NAME = "<vm_name_to_delete>"
@@ -78,22 +77,12 @@ if fip_id and instances["vendor"] == "openstack":
 
     # 3. the script will keep querying automate_request for the status to be
     #  active, once active, it will query the spawned request task.
-    done = False
-    while not done:
-        result = client.collection.status(req_id)
-        if result.request_state == "active" or\
-                result.request_state == "finished":
-            done = True
-        sleep(5)
+    result = client.collection.wait_for(
+        req_id, states=("active", "finished"))
 
     # Query the request task
     client.collection = "request_tasks"
-    done = False
-    while not done:
-        result = client.collection.status(req_id)
-        if result.state == "finished":
-            done = True
-        sleep(5)
+    result = client.collection.wait_for(req_id)
 
     # Task is complete, go back to the automation request to get the output
     client.collection = "automation_requests"
@@ -125,12 +114,7 @@ print("Task ID of the deleted instance: {0}".format(task_id))
 
 # 5. check the deletion task, and wait for it to be finished
 client.collection = "tasks"
-done = False
-while not done:
-    result = client.collection.status(task_id)
-    if result.state == "Finished":
-        done = True
-    sleep(5)
+result = client.collection.wait_for(task_id)
 
 if result.status == "Error":
     print("Deleting the instance: {0} failed: {1}".format(INPUT_VM_NAME,
@@ -145,12 +129,7 @@ print("Task ID for the attempt to delete vm: {0}".format(task_id))
 
 # 7. check the task and make sure the vm reference is removed successfully
 client.collection = "tasks"
-done = False
-while not done:
-    result = client.collection.status(task_id)
-    if result.state == "Finished":
-        done = True
-    sleep(5)
+result = client.collection.wait_for(task_id)
 
 if result.status == "Error":
     print("Deleting the VM reference: {0} failed: "
@@ -17,7 +17,6 @@
 from miqcli import Client
 import ast
 import json
-from time import sleep
 
 # create a client object
 client = Client()
@@ -42,24 +41,14 @@ if "fip_pool" in payload_data and payload_data["fip_pool"]:
 
     # 3. the script will keep querying automate_request for the status to be
     #  active, once active, it will monitor the spawned request task.
-    done = False
-    while not done:
-        result = client.collection.status(req_id)
-        if result.request_state == "active" or\
-                result.request_state == "finished":
-            done = True
-        sleep(5)
+    result = client.collection.wait_for(
+        req_id, states=("active", "finished"))
 
     # 4. the script will keep querying request task and wait for the state to
     #  be finished, once finished, it will query for the floating ip id. If
     #  there was an error, the script will display the error message and exit.
     client.collection = "request_tasks"
-    done = False
-    while not done:
-        result = client.collection.status(req_id)
-        if result.state == "finished":
-            done = True
-        sleep(5)
+    result = client.collection.wait_for(req_id)
 
     # Task is complete, go back to the automation request to get the output
     client.collection = "automation_requests"
@@ -98,23 +87,14 @@ print("ID of the request: {0}".format(req_id))
 
 # Query the provision request until it is active, then query
 # the spawned request task
-done = False
-while not done:
-    result = client.collection.status(req_id)
-    if result.request_state == "active" or result.request_state == "finished":
-        done = True
-    sleep(5)
+result = client.collection.wait_for(
+    req_id, states=("active", "finished"))
 
 # 6. the script will query the request task until the state is finished,
 #  once finished, it will return information about the provisioned machine
 #  or display the error message
 client.collection = "request_tasks"
-done = False
-while not done:
-    result = client.collection.status(req_id)
-    if result.state == "finished":
-        done = True
-    sleep(5)
+result = client.collection.wait_for(req_id)
 
 # 7. Report the floating ip address back to the user if there are no errors
 if result.status == "Error":
@@ -14,6 +14,47 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-from miqcli.api import Client
+import sys
+import types
+from importlib import import_module
 
 __all__ = ['Client']
+
+if sys.version_info >= (3, 5):
+    __all__.append('AsyncClient')
+
+#: public clients -> module defining them
+_CLIENTS = {'Client': 'miqcli.api', 'AsyncClient': 'miqcli.aio'}
+
+
+def _client(name):
+    return getattr(import_module(_CLIENTS[name]), name)
+
+
+def __getattr__(name):
+    # the clients import the manageiq client and requests, they are only
+    # imported when used so the cli starts without them (see PEP 562)
+    if name in __all__:
+        return _client(name)
+    raise AttributeError('module {0!r} has no attribute {1!r}'.format(
+        __name__, name))
+
+
+class _LazyModule(types.ModuleType):
+    """Module importing the clients when used, before python 3.7."""
+
+    def __getattr__(self, name):
+        value = __getattr__(name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(__all__))
+
+
+if sys.version_info < (3, 7):
+    _module = _LazyModule(__name__, __doc__)
+    _module.__dict__.update(globals())
+    # python 2 clears the globals of a released module, keep it
+    _module._module = sys.modules[__name__]
+    sys.modules[__name__] = _module
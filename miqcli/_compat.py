@@ -17,6 +17,11 @@
 """Compatibility module for Python 2.x/3.x support."""
 
 try:
-    from xmlrpclib import ServerProxy
+    from urllib2 import urlopen
 except ImportError:
-    from xmlrpc.client import ServerProxy
+    from urllib.request import urlopen
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
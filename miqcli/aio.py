@@ -0,0 +1,254 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Aio module contains the asyncio client (Python 3.5+ only).
+
+The collection actions run in a thread pool over the pooled http session
+of a single client api object. A semaphore bounds the actions in flight
+to the size of the connection pool, every other action waits its turn
+without holding a thread. Waiting on requests and tasks sleeps in the
+event loop, only the polls use the thread pool.
+"""
+
+import asyncio
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from click import Context
+from manageiq_client.api import APIException
+
+from miqcli.api import ClientAPI, client_settings
+from miqcli.constants import HTTP_POOL_SIZE
+from miqcli.utils import get_collection_class, log
+from miqcli.watch import Watcher
+
+__all__ = ['AsyncClient']
+
+
+def _run(func, *args):
+    """Run the function in a worker thread.
+
+    Collection actions abort the command with :class:`SystemExit` on
+    errors, which would stop the event loop, it is raised as an
+    :class:`APIException` instead.
+
+    :param func: function
+    :type func: function
+    :return: function return value
+    """
+    try:
+        return func(*args)
+    except SystemExit as e:
+        raise APIException('{0} aborted (exit code {1}), see the error '
+                           'logged.'.format(getattr(func, '__name__', func),
+                                            e.code))
+
+
+class AsyncCollection(object):
+    """Collection whose actions are coroutines.
+
+    Each attribute is a coroutine function running the collection action
+    of the same name, e.g. ``await client.collection('vms').query(name)``.
+    """
+
+    def __init__(self, client, name):
+        """Constructor.
+
+        :param client: async client
+        :type client: AsyncClient
+        :param name: collection name
+        :type name: str
+        """
+        self._client = client
+        self._name = name
+
+    def __getattr__(self, action):
+        if action.startswith('_'):
+            raise AttributeError(action)
+        return functools.partial(self._client.call, self._name, action)
+
+
+class AsyncClient(object):
+    """ManageIQ asyncio client class.
+
+    The asyncio counterpart of :class:`miqcli.api.Client`, one client can
+    drive many concurrent collection actions and request lifecycles.
+
+    .. code-block: python
+
+        from miqcli import AsyncClient
+
+        client = AsyncClient({'url': '', 'username': '', 'password': ''})
+        requests = client.collection('provision_requests')
+
+        async def provision(payload):
+            req_id = await requests.create('OpenStack', payload, None)
+            return await client.wait_for('provision_requests', req_id)
+
+        loop.run_until_complete(asyncio.gather(
+            *[provision(payload) for payload in payloads]))
+    """
+
+    def __init__(self, conf=None, verbose=False, concurrency=None,
+                 trace=False):
+        """Constructor.
+
+        :param conf: server configuration
+        :type conf: dict
+        :param verbose: verbose mode
+        :type verbose: bool
+        :param concurrency: maximum actions in flight, the connection pool
+            size by default
+        :type concurrency: int
+        :param trace: record the http calls, see :attr:`api` tracer
+        :type trace: bool
+        """
+        config = client_settings(conf, verbose)
+        if trace:
+            config['trace'] = True
+        self.concurrency = concurrency or config.get('pool_size',
+                                                     HTTP_POOL_SIZE)
+        config['pool_size'] = self.concurrency
+
+        self._api = ClientAPI(config)
+        self._api.connect()
+        self._verbose = verbose
+
+        # click context object, only used to report invalid collections
+        from miqcli.cli.main import ManageIQ
+        self._ctx = Context(ManageIQ())
+        self._ctx.params['verbose'] = verbose
+
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        # a semaphore is bound to the event loop it is used in
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def api(self):
+        """Client api property.
+
+        :return: client api object
+        :rtype: ClientAPI
+        """
+        return self._api
+
+    def collection(self, name):
+        """Return the collection, its actions are coroutines.
+
+        :param name: collection name
+        :type name: str
+        :return: collection
+        :rtype: AsyncCollection
+        """
+        return AsyncCollection(self, name)
+
+    def _action(self, name, action, args, kwargs):
+        """Run the collection action, a collection object per action.
+
+        :param name: collection name
+        :type name: str
+        :param action: collection action name
+        :type action: str
+        :return: collection action return value
+        """
+        collection = get_collection_class(self._ctx, name)(
+            api=self._api, verbose=self._verbose)
+        return getattr(collection, action)(*args, **kwargs)
+
+    async def _submit(self, func, *args):
+        """Run the function in the thread pool, once a slot is free.
+
+        :param func: function
+        :type func: function
+        :return: function return value
+        """
+        loop = asyncio.get_event_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(
+                self.concurrency)
+        async with semaphore:
+            return await loop.run_in_executor(
+                self._executor, log.propagate(functools.partial(
+                    _run, func, *args)))
+
+    async def call(self, name, action, *args, **kwargs):
+        """Run a collection action.
+
+        :param name: collection name
+        :type name: str
+        :param action: collection action name
+        :type action: str
+        :return: collection action return value
+        """
+        return await self._submit(self._action, name, action, args, kwargs)
+
+    async def watch(self, name, ids, callback=None, **kwargs):
+        """Watch requests or tasks until they reach a terminal state.
+
+        See :class:`miqcli.watch.Watcher` for the settings. The watcher
+        sleeps in the event loop between polls.
+
+        :param name: collection name
+        :type name: str
+        :param ids: resource ids
+        :type ids: list
+        :param callback: called with each state change
+        :type callback: function
+        :return: watcher, holding the last event of each resource
+        :rtype: miqcli.watch.Watcher
+        """
+        watcher = Watcher(self._api, name, ids, **kwargs)
+        while watcher.pending:
+            events = await self._submit(watcher.update)
+            for event in events:
+                if callback:
+                    callback(event)
+
+            delay = watcher.delay(events)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        return watcher
+
+    async def wait_for(self, name, req_id, states=None, timeout=None,
+                       callback=None, **kwargs):
+        """Wait for a request or task to reach one of the given states.
+
+        :param name: collection name
+        :type name: str
+        :param req_id: id of the request or task
+        :type req_id: str
+        :param states: states to wait for, the collection terminal states
+            by default
+        :type states: tuple
+        :param timeout: seconds to wait, None for no limit
+        :type timeout: float
+        :param callback: called with each state change
+        :type callback: function
+        :return: outcome of the wait, with the poll count and the latency
+        :rtype: miqcli.watch.WaitResult
+        :raises WaitTimeout: the states were not reached in time
+        :raises WaitNotFound: the server does not return the resource
+        """
+        watcher = await self.watch(name, [req_id], callback=callback,
+                                   states=states, timeout=timeout, **kwargs)
+        return watcher.result(req_id)
+
+    def close(self):
+        """Shut down the thread pool once the running actions are done."""
+        self._executor.shutdown(wait=True)
@@ -14,21 +14,33 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import copy
+import hashlib
+import json
+import logging
 import os
+import threading
+import time
 import urllib3
 import errno
 
 from click import Context
-from click.globals import push_context
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
-from manageiq_client.api import APIException, ManageIQClient
+from manageiq_client.api import APIException, CollectionsIndex, \
+    ManageIQClient
 
 from requests.exceptions import ConnectionError
 
-from miqcli.constants import CFG_DIR, CFG_NAME, DEFAULT_CONFIG, TOKENFILE
+from miqcli.cache import FileCache, LRUCache
+from miqcli.constants import API_CACHE_TTL, CACHE_DIR, CFG_DIR, CFG_NAME, \
+    DEFAULT_CONFIG, HTTP_CONNECT_TIMEOUT, HTTP_POOL_SIZE, HTTP_READ_TIMEOUT, \
+    PROVIDER_CACHE_TTL, RESOLVE_CACHE_SIZE, RESOLVE_CACHE_TTL, TOKENFILE, \
+    TOKEN_EXPIRY_MARGIN, TOKEN_TTL
+from miqcli.instrumentation import RoundTrips, Tracer
 from miqcli.utils import log, get_collection_class, Config
 
 __all__ = ['ClientAPI', 'Client']
@@ -36,6 +48,109 @@ __all__ = ['ClientAPI', 'Client']
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTP adapter applying default timeouts to every request."""
+
+    def __init__(self, timeout=None, **kwargs):
+        """Constructor.
+
+        :param timeout: (connect, read) timeouts in seconds
+        :type timeout: tuple
+        """
+        self._timeout = timeout
+        super(_TimeoutHTTPAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        """Send the request, with the default timeouts unless given."""
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self._timeout
+        return super(_TimeoutHTTPAdapter, self).send(request, **kwargs)
+
+
+class _ManageIQClient(ManageIQClient):
+    """ManageIQ API client sharing the client api http session.
+
+    Requests answered with a 401 status are sent again once the reauth
+    callable provided a new token.
+    """
+
+    def __init__(self, entry_point, auth, session=None, reauth=None,
+                 entry_cache=None, entry_key=None, entry=None, logger=None,
+                 verify_ssl=True, ca_bundle_path=None):
+        """Constructor.
+
+        Mirrors the ManageIQ API client constructor, using the given
+        session instead of creating a new one.
+
+        :param session: http session to send the requests with
+        :type session: requests.Session
+        :param reauth: callable returning a new token
+        :type reauth: function
+        :param entry_cache: cache for the entry point document
+        :type entry_cache: FileCache
+        :param entry_key: entry point document cache key, the entry point
+            url by default
+        :type entry_key: str
+        :param entry: entry point document just received from the server
+        :type entry: dict
+        """
+        self._reauth = reauth
+        self._entry_cache = entry_cache
+        self._entry_key = entry_key or entry_point
+        self._entry = entry
+        self._entry_point = entry_point
+        self._auth = auth
+        self._verify_ssl = verify_ssl
+        self._ca_bundle_path = ca_bundle_path
+        self._session = session or requests.Session()
+        self._session.headers.update(
+            {'Content-Type': 'application/json; charset=utf-8'})
+        self._build_auth(auth)
+        if not verify_ssl:
+            self._session.verify = False
+        elif ca_bundle_path:
+            self._session.verify = ca_bundle_path
+        self.logger = logger or logging.getLogger('manageiq_client.api')
+        self.response = None
+        self._load_data()
+
+    def _load_data(self):
+        """Load the entry point document, from the cache when possible.
+
+        The collection proxies are built from the cached document, no
+        request is sent to the server until a collection is used. A fresh
+        document (given or requested) replaces the cached one, which picks
+        up server upgrades whenever the token is validated or the cached
+        document expires.
+        """
+        data, fresh = self._entry, True
+        if data is None and self._entry_cache is not None:
+            data, fresh = self._entry_cache.get(self._entry_key), False
+
+        if data is None:
+            data, fresh = self.get(self._entry_point), True
+        if fresh and self._entry_cache is not None:
+            self._entry_cache.set(self._entry_key, data)
+        data = copy.deepcopy(data)
+
+        self.collections = CollectionsIndex(self, data.pop('collections', []))
+        self._version = data.pop('version', None)
+        self._versions = {}
+        for version in data.pop('versions', []):
+            self._versions[version['name']] = version['href']
+        for key, value in data.items():
+            setattr(self, key, value)
+
+    def _sending_request(self, func, retries=2):
+        """Send the request, retrying it once with a new token on 401."""
+        result = super(_ManageIQClient, self)._sending_request(func, retries)
+        if result.status_code == 401 and self._reauth is not None:
+            self._session.headers.update({'X-Auth-Token': self._reauth()})
+            result = super(_ManageIQClient, self)._sending_request(
+                func, retries)
+        return result
+
+
 class ClientAPI(object):
     """ManageIQ API client class.
 
@@ -74,6 +189,35 @@ class ClientAPI(object):
         self._password = settings.get('password', DEFAULT_CONFIG['password'])
 
         self._token = settings.get('token', None)
+        self._token_ttl = settings.get('token_ttl', TOKEN_TTL)
+        self._given_token = False
+
+        # entry point document received when validating the token
+        self._entry = None
+
+        # entry point document cache, a ttl of 0 disables it
+        self._api_cache_ttl = settings.get('api_cache_ttl', API_CACHE_TTL)
+
+        # provider types registry shared by the provider components
+        self._provider_cache_ttl = settings.get('provider_cache_ttl',
+                                                PROVIDER_CACHE_TTL)
+        self._provider_types = None
+
+        # resource name to id resolutions, a ttl of 0 disables them
+        self._resolve_cache_ttl = settings.get('resolve_cache_ttl',
+                                               RESOLVE_CACHE_TTL)
+        self._resolve_cache_size = settings.get('resolve_cache_size',
+                                                RESOLVE_CACHE_SIZE)
+        self._resolve_cache_persist = settings.get('resolve_cache_persist',
+                                                   True)
+        self._resolutions = None
+
+        # http session shared by every request sent to the server
+        self._round_trips = RoundTrips()
+        self._tracer = None
+        if settings.get('trace') or settings.get('trace_file'):
+            self._tracer = Tracer()
+        self._session = self._build_session(settings)
 
         self._client = None
 
@@ -85,6 +229,33 @@ class ClientAPI(object):
         """
         return self._token
 
+    @property
+    def session(self):
+        """Return the http session property.
+
+        :return: http session
+        :rtype: requests.Session
+        """
+        return self._session
+
+    @property
+    def round_trips(self):
+        """Return the round trips counter property.
+
+        :return: round trips sent through the http session
+        :rtype: RoundTrips
+        """
+        return self._round_trips
+
+    @property
+    def tracer(self):
+        """Return the http calls tracer property.
+
+        :return: tracer or None when tracing is off
+        :rtype: Tracer
+        """
+        return self._tracer
+
     @property
     def client(self):
         """Return the ManageIQ API Client connection property.
@@ -93,6 +264,78 @@ class ClientAPI(object):
         """
         return self._client
 
+    @property
+    def provider_types(self):
+        """Return the provider types registry property.
+
+        The registry lives as long as this client api, every provider
+        component built from it shares the same provider types.
+
+        :return: provider types registry
+        :rtype: ProviderTypeRegistry
+        """
+        if self._provider_types is None:
+            from miqcli.provider import ProviderTypeRegistry
+
+            cache = None
+            if self._provider_cache_ttl:
+                cache = FileCache(os.path.join(CACHE_DIR, 'providers.json'),
+                                  self._provider_cache_ttl)
+            self._provider_types = ProviderTypeRegistry(self, cache, self._url)
+        return self._provider_types
+
+    @property
+    def resolutions(self):
+        """Return the resource name to id resolutions cache property.
+
+        :return: resolutions cache or None when disabled
+        :rtype: LRUCache
+        """
+        if self._resolutions is None and self._resolve_cache_ttl:
+            store = None
+            if self._resolve_cache_persist:
+                store = FileCache(os.path.join(CACHE_DIR, 'resolve.json'),
+                                  self._resolve_cache_ttl)
+            self._resolutions = LRUCache(self._resolve_cache_size,
+                                         self._resolve_cache_ttl, store,
+                                         self._url)
+        return self._resolutions
+
+    def clear_caches(self):
+        """Forget the server data cached by this client api."""
+        if self._provider_types is not None:
+            self._provider_types.clear()
+        if self._resolutions is not None:
+            self._resolutions.clear()
+
+    def _build_session(self, settings):
+        """
+        Create the http session used for every request sent to the
+        server. Connections are kept alive and pooled, the pool size and
+        the timeouts are taken from the settings.
+
+        :param settings: client settings
+        :type settings: dict
+        :return: http session
+        :rtype: requests.Session
+        """
+        pool_size = settings.get('pool_size', HTTP_POOL_SIZE)
+        adapter = _TimeoutHTTPAdapter(
+            timeout=(settings.get('connect_timeout', HTTP_CONNECT_TIMEOUT),
+                     settings.get('read_timeout', HTTP_READ_TIMEOUT)),
+            pool_connections=pool_size,
+            pool_maxsize=pool_size
+        )
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.verify = self._verify_ssl
+        session.hooks['response'].append(self._round_trips)
+        if self._tracer is not None:
+            session.hooks['response'].append(self._tracer)
+        return session
+
     def connect(self):
         """
         Create a connection pointer for the ManageIQ instance. This
@@ -112,6 +355,12 @@ class ClientAPI(object):
         auth file is not valid or if the file doesn't exist, it will
         create a new token.
 
+        The auth file stores the token along with the time it was issued,
+        its ttl and the url/username it belongs to. A token from the auth
+        file that is known to be fresh is used without validating it
+        against the server. Should it be rejected later on, the client
+        re-authenticates (see :meth:`_reauthenticate`).
+
         The idea of this function is it will fail only if the user
         provides an invalid token via the command line or if there is
         an error reading the auth file (apart from if the file doesn't
@@ -121,49 +370,121 @@ class ClientAPI(object):
         :param token: given token
 
         """
+        cache = self._read_auth_file()
+        issued, token_ttl = cache.get('issued'), cache.get('token_ttl')
 
         # if none is given
         if token is None:
-            # get from auth file and test it
-            token = self._get_from_auth_file()
-
-            # if token from auth file is not valid, generate one
-            if token is None or not self._valid_token(token):
-                token = self._generate_token()
+            # get from auth file and test it when its freshness is unknown
+            token = cache.get('token')
+
+            if token is not None and self._fresh_token(cache) is None:
+                if self._valid_token(token):
+                    issued, token_ttl = time.time(), self._token_ttl
+                else:
+                    token = None
+
+            # if token from auth file is not valid or expired, generate one
+            if token is None or self._fresh_token(cache) is False:
+                token, token_ttl = self._generate_token()
+                issued = time.time()
         else:
-            # check if given token is valid
-            if not self._valid_token(token):
-                log.abort('Given token {0} is not valid.'.format(token))
+            self._given_token = True
+
+            # check if given token is valid, unless it is known to be fresh
+            if cache.get('token') != token or not self._fresh_token(cache):
+                if not self._valid_token(token):
+                    log.abort('Given token {0} is not valid.'.format(token))
+                issued, token_ttl = time.time(), self._token_ttl
 
-        # always save the token in the auth file
-        self._set_auth_file(token)
+        # save the token in the auth file when it changed
+        if cache.get('token') != token or cache.get('issued') != issued:
+            self._set_auth_file(token, issued, token_ttl)
         self._token = token
 
-    @staticmethod
-    def _set_auth_file(token):
+    def _fresh_token(self, cache):
+        """
+        Tell whether the token from the auth file is fresh. The token
+        is only trusted when it was issued for the same url and username
+        the client is configured with.
+
+        :param cache: auth file content
+        :type cache: dict
+        :return: True if fresh, False if expired, None if unknown
+        :rtype: bool
+        """
+        if cache.get('url') != self._url or \
+                cache.get('username') != self._username:
+            return None
+        try:
+            expires = cache['issued'] + cache['token_ttl']
+        except (KeyError, TypeError):
+            return None
+        return time.time() < expires - TOKEN_EXPIRY_MARGIN
+
+    def _reauthenticate(self):
+        """
+        Generate a new token once the server rejects the current one
+        and save it in the auth file. A token given by the user is never
+        replaced.
+
+        :return: new token
+        :rtype: str
         """
-        Save the token into TOKENFILE
+        if self._given_token:
+            log.abort('Given token {0} is not valid.'.format(self._token))
+        token, token_ttl = self._generate_token()
+        self._set_auth_file(token, time.time(), token_ttl)
+        self._token = token
+        return token
+
+    def _set_auth_file(self, token, issued=None, token_ttl=None):
+        """
+        Save the token along with its expiry metadata into TOKENFILE
         :param token: given token
+        :param issued: time the token was issued at (epoch)
+        :param token_ttl: token lifetime in seconds
         """
+        data = dict(token=token, issued=issued, token_ttl=token_ttl,
+                    url=self._url, username=self._username)
         try:
             with open(TOKENFILE, "w") as fp:
-                fp.write(token)
+                json.dump(data, fp)
         except (IOError, OSError) as e:
             log.abort('Error setting token file. %s' % e)
 
     @staticmethod
-    def _get_from_auth_file():
+    def _read_auth_file():
         """
-        Get the token from the token file (TOKENFILE)
+        Read the token file (TOKENFILE). Files written by older versions
+        only contain the token itself, no expiry metadata.
+
+        :return: auth file content
+        :rtype: dict
         """
         try:
             with open(TOKENFILE, "r") as fp:
-                token = fp.read().strip()
+                content = fp.read().strip()
         except IOError as e:
             if e.errno != errno.ENOENT:
                 log.abort('Error reading local auth file.')
-            return None
-        return token
+            return dict()
+
+        if not content:
+            return dict()
+        try:
+            data = json.loads(content)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return dict(token=content)
+        return data
+
+    def _get_from_auth_file(self):
+        """
+        Get the token from the token file (TOKENFILE)
+        """
+        return self._read_auth_file().get('token')
 
     def _valid_token(self, token=None):
         """
@@ -179,10 +500,15 @@ class ClientAPI(object):
         """
         headers = {'Accept': 'application/json', 'X-Auth-Token': token}
         try:
-            output = requests.get(self._url, headers=headers,
-                                  verify=self._verify_ssl)
+            output = self._session.get(self._url, headers=headers)
             if output.status_code != 200:
                 return False
+            # the answer is the entry point document, fresher than a
+            # cached one
+            try:
+                self._entry = output.json()
+            except ValueError:
+                self._entry = None
             return True
         except ConnectionError:
             log.abort('Error connecting to service. Check your connection '
@@ -200,18 +526,24 @@ class ClientAPI(object):
         the username and password is not necessary. In any other case,
         these variables must be set otherwise the function will fail and
         the client will exit with -1.
+
+        :return: token and its ttl
+        :rtype: tuple
         """
         if self._username is None or self._password is None:
             log.abort('You need to set username and password.')
         auth_endpoint = self._url + "/auth"
         try:
-            output = requests.get(auth_endpoint,
-                                  auth=HTTPBasicAuth(self._username,
-                                                     self._password),
-                                  verify=False)
+            # drop the session token header, it may hold a rejected token
+            output = self._session.get(auth_endpoint,
+                                       headers={'X-Auth-Token': None},
+                                       auth=HTTPBasicAuth(self._username,
+                                                          self._password))
 
             if output.status_code == 200:
-                return output.json()["auth_token"]
+                data = output.json()
+                return data["auth_token"], data.get("token_ttl",
+                                                    self._token_ttl)
             else:
                 log.abort('Unsuccessful attempt to authenticate: '
                           '{0}'.format(output.status_code))
@@ -219,20 +551,76 @@ class ClientAPI(object):
             log.abort('Error connecting to service. Check your connection '
                       'settings.')
 
+    def _api_cache_key(self):
+        """
+        Return the cache key of the entry point document. The collections
+        the document lists depend on the appliance and on the user, it is
+        keyed by the appliance url and the username (or the token when no
+        username is set).
+
+        :return: entry point cache key
+        :rtype: str
+        """
+        user = self._username
+        if user is None:
+            user = hashlib.sha1(
+                str(self._token).encode('utf-8')).hexdigest()
+        return '{0} {1}'.format(self._url, user)
+
+    def _api_cache(self):
+        """
+        Return the cache for the entry point document (/api). It holds
+        the collections the server provides, see :meth:`_api_cache_key`.
+
+        :return: entry point cache or None when disabled
+        :rtype: FileCache
+        """
+        if not self._api_cache_ttl:
+            return None
+        return FileCache(os.path.join(CACHE_DIR, 'api.json'),
+                         self._api_cache_ttl)
+
     def _connect(self):
         """
         Create new manageIQClient pointer and assign to self._client
         """
         try:
-            self._client = ManageIQClient(self._url,
-                                          dict(token=self._token),
-                                          verify_ssl=self._verify_ssl)
+            self._client = _ManageIQClient(self._url,
+                                           dict(token=self._token),
+                                           session=self._session,
+                                           verify_ssl=self._verify_ssl,
+                                           reauth=self._reauthenticate,
+                                           entry_cache=self._api_cache(),
+                                           entry_key=self._api_cache_key(),
+                                           entry=self._entry)
         except APIException as e:
             log.abort('Error creating library pointer - {0}'.format(e.message))
         except Exception as e:
             log.abort('{0}'.format(e.message))
 
 
+def client_settings(conf=None, verbose=False):
+    """Return the server configuration settings used by the clients.
+
+    The given settings are overridden by the YAML configurations and the
+    MIQ_CFG environment variable, like the cli parameters are.
+
+    :param conf: server configuration
+    :type conf: dict
+    :param verbose: verbose mode
+    :type verbose: bool
+    :return: configuration settings
+    :rtype: Config
+    """
+    config = Config(settings=DEFAULT_CONFIG, verbose=verbose)
+    if conf:
+        config.update(conf)
+    config.from_yml(CFG_DIR, CFG_NAME)
+    config.from_yml(os.path.join(os.getcwd()), CFG_NAME)
+    config.from_env('MIQ_CFG')
+    return config
+
+
 class Client(object):
     """ManageIQ client class.
 
@@ -263,41 +651,58 @@ class Client(object):
     .. code-block: bash
 
         miqcli providers create <params>
-    """
 
-    _collection = object
+    Clients do not depend on the click context, several clients can be
+    used in one process. A client can be shared between threads, the
+    collection set by each thread is its own.
+
+    With tracing on, every http call is recorded by :attr:`tracer`.
 
-    def __init__(self, conf=None, verbose=False):
+    .. code-block: python
+
+        client = Client({...}, trace=True)
+        client.collection = 'vms'
+        client.collection.query('vm_foo')
+        print(client.tracer.table())
+    """
+
+    def __init__(self, conf=None, verbose=False, trace=False):
         """Constructor.
 
         :param conf: server configuration
         :type conf: dict
         :param verbose: verbose mode
         :type verbose: bool
+        :param trace: record the http calls
+        :type trace: bool
         """
 
         # lets first load the correct server configuration settings
-        config = Config(settings=DEFAULT_CONFIG, verbose=verbose)
-        if conf:
-            config.update(conf)
-        config.from_yml(CFG_DIR, CFG_NAME)
-        config.from_yml(os.path.join(os.getcwd()), CFG_NAME)
-        config.from_env('MIQ_CFG')
+        config = client_settings(conf, verbose)
+        if trace:
+            config['trace'] = True
 
         # create client api instance
-        api = ClientAPI(config)
-        api.connect()
+        self._api = ClientAPI(config)
+        self._api.connect()
+        self._verbose = verbose
 
-        # create click context object (req. for each collection class)
+        # click context object, only used to report invalid collections
         from miqcli.cli.main import ManageIQ
         self._ctx = Context(ManageIQ())
-
-        # inject req. data into context
         self._ctx.params['verbose'] = verbose
-        setattr(self._ctx, 'client_api', api)
 
-        # finally, push context object up the stack for collections to access
-        push_context(self._ctx)
+        # collection set by each thread
+        self._local = threading.local()
+
+    @property
+    def tracer(self):
+        """Http calls tracer property.
+
+        :return: tracer or None when tracing is off
+        :rtype: miqcli.instrumentation.Tracer
+        """
+        return self._api.tracer
 
     @property
     def collection(self):
@@ -306,7 +711,7 @@ class Client(object):
          :return: collection
          :rtype: class
          """
-        return self._collection
+        return getattr(self._local, 'collection', object)
 
     @collection.setter
     def collection(self, name):
@@ -315,4 +720,37 @@ class Client(object):
         :param name: collection name
         :type name: str
         """
-        self._collection = get_collection_class(self._ctx, name)()
+        self._local.collection = self.get_collection(name)
+
+    def get_collection(self, name):
+        """Return a new collection object bound to this client.
+
+        :param name: collection name
+        :type name: str
+        :return: collection
+        :rtype: object
+        """
+        return get_collection_class(self._ctx, name)(
+            api=self._api, verbose=self._verbose)
+
+    def watch(self, name, ids, **kwargs):
+        """Watch requests or tasks until they reach a terminal state.
+
+        All the resources are polled with a single query each interval.
+
+        .. code-block: python
+
+            for event in client.watch('provision_requests', ['1', '2']):
+                print(event.id, event.state, event.status)
+
+        :param name: collection name (provision_requests,
+            automation_requests, request_tasks or tasks)
+        :type name: str
+        :param ids: resource ids
+        :type ids: list
+        :param kwargs: watcher settings, see :class:`miqcli.watch.Watcher`
+        :return: watcher, iterating over it yields the state changes
+        :rtype: miqcli.watch.Watcher
+        """
+        from miqcli.watch import Watcher
+        return Watcher(self._api, name, ids, **kwargs)
@@ -0,0 +1,261 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Cache module contains the on-disk caches used by the cli."""
+
+import errno
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from miqcli.utils import log
+
+__all__ = ['FileCache', 'LRUCache']
+
+
+class FileCache(object):
+    """On-disk cache.
+
+    Entries are stored in a JSON file along with the time they were
+    stored at. Entries older than the cache ttl are considered expired.
+    The cache is best effort, a missing or corrupted file is treated as
+    an empty cache.
+    """
+
+    def __init__(self, path, ttl=None):
+        """Constructor.
+
+        :param path: cache file path
+        :type path: str
+        :param ttl: entries lifetime in seconds, None to never expire
+        :type ttl: int
+        """
+        self._path = path
+        self._ttl = ttl
+        self._entries = None
+
+    @property
+    def path(self):
+        """Cache file path property.
+
+        :return: cache file path
+        :rtype: str
+        """
+        return self._path
+
+    @property
+    def entries(self):
+        """Cache entries property.
+
+        The cache file is read the first time the entries are accessed.
+
+        :return: cache entries
+        :rtype: dict
+        """
+        if self._entries is None:
+            try:
+                with open(self._path, 'r') as fp:
+                    self._entries = json.load(fp)
+            except (IOError, OSError, ValueError):
+                self._entries = dict()
+            if not isinstance(self._entries, dict):
+                self._entries = dict()
+        return self._entries
+
+    def expired(self, entry):
+        """Tell whether the cache entry is expired.
+
+        :param entry: cache entry
+        :type entry: dict
+        :return: True if expired otherwise False
+        :rtype: bool
+        """
+        if self._ttl is None:
+            return False
+        return time.time() - entry.get('stored', 0) >= self._ttl
+
+    def get(self, key, default=None):
+        """Return the cached value for the given key.
+
+        :param key: cache key
+        :type key: str
+        :param default: value returned when missing or expired
+        :return: cached value
+        """
+        entry = self.entries.get(key)
+        if not isinstance(entry, dict) or self.expired(entry):
+            return default
+        return entry.get('value', default)
+
+    def set(self, key, value):
+        """Store the value for the given key.
+
+        :param key: cache key
+        :type key: str
+        :param value: JSON serializable value
+        """
+        self.entries[key] = dict(stored=time.time(), value=value)
+        self.save()
+
+    def delete(self, key):
+        """Remove the given key from the cache.
+
+        :param key: cache key
+        :type key: str
+        """
+        if self.entries.pop(key, None) is not None:
+            self.save()
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        self._entries = dict()
+        try:
+            os.remove(self._path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                log.warning('Unable to clear cache {0}: {1}'.format(
+                    self._path, e))
+
+    def save(self):
+        """Write the cache entries to disk.
+
+        The entries are written to a temporary file first which is then
+        renamed, concurrent cli processes never read a partial file.
+        """
+        directory = os.path.dirname(self._path)
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            fd, tmp = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(self.entries, fp)
+            os.rename(tmp, self._path)
+        except (IOError, OSError) as e:
+            log.warning('Unable to write cache {0}: {1}'.format(
+                self._path, e))
+
+
+class LRUCache(object):
+    """In-memory least recently used cache.
+
+    Entries expire after the cache ttl, once the cache is full the least
+    recently used entry is evicted. Entries can also be persisted in a
+    :class:`FileCache`, they are then shared by cli processes.
+    Thread safe.
+    """
+
+    def __init__(self, maxsize, ttl=None, store=None, namespace=''):
+        """Constructor.
+
+        :param maxsize: maximum number of entries kept in memory
+        :type maxsize: int
+        :param ttl: entries lifetime in seconds, None to never expire
+        :type ttl: int
+        :param store: cache persisting the entries
+        :type store: FileCache
+        :param namespace: prefix of the persisted entries keys
+        :type namespace: str
+        """
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._store = store
+        self._namespace = namespace
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, entry):
+        """Tell whether the (stored, value) entry is expired."""
+        if self._ttl is None:
+            return False
+        return time.time() - entry[0] >= self._ttl
+
+    def _store_key(self, key):
+        """Return the persisted entry key.
+
+        :param key: cache key
+        :type key: tuple
+        :return: persisted entry key
+        :rtype: str
+        """
+        return json.dumps([self._namespace] + list(key))
+
+    def get(self, key, default=None):
+        """Return the cached value for the given key.
+
+        :param key: cache key
+        :type key: tuple
+        :param default: value returned when missing or expired
+        :return: cached value
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and not self._expired(entry):
+                self._entries[key] = entry
+                return entry[1]
+
+            if self._store is not None:
+                # keep the time the entry was persisted at, the entry must
+                # not outlive the ttl because it was loaded in memory
+                stored = self._store.entries.get(self._store_key(key))
+                if isinstance(stored, dict) and \
+                        not self._store.expired(stored) and \
+                        stored.get('value') is not None:
+                    entry = (stored.get('stored', 0), stored['value'])
+                    if not self._expired(entry):
+                        self._add(key, entry[1], stored=entry[0])
+                        return entry[1]
+            return default
+
+    def set(self, key, value):
+        """Store the value for the given key.
+
+        :param key: cache key
+        :type key: tuple
+        :param value: JSON serializable value
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._add(key, value)
+            if self._store is not None:
+                self._store.set(self._store_key(key), value)
+
+    def _add(self, key, value, stored=None):
+        """Add the entry, evicting the least recently used ones.
+
+        :param key: cache key
+        :type key: tuple
+        :param value: cached value
+        :param stored: time the value was stored at, defaults to now
+        :type stored: float
+        """
+        if stored is None:
+            stored = time.time()
+        self._entries[key] = (stored, value)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries from the cache, persisted ones included."""
+        with self._lock:
+            self._entries.clear()
+            if self._store is not None:
+                self._store.clear()
@@ -13,3 +13,23 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
+
+import sys
+
+__all__ = ['main']
+
+
+def main():
+    """Entry point of the cli.
+
+    The command is forwarded to the miqcli daemon when one is running,
+    otherwise it is run by this process.
+    """
+    from miqcli.cli.daemon import forward
+
+    rc = forward(sys.argv[1:])
+    if rc is not None:
+        sys.exit(rc)
+
+    from miqcli.cli.main import cli
+    cli()
@@ -0,0 +1,70 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Cache module manages the server data cached by the cli."""
+
+import errno
+import os
+
+import click
+
+from miqcli.constants import CACHE_DIR
+
+__all__ = ['cache']
+
+
+@click.group(name='cache', help='Manage the server data cached by the cli.')
+def cache():
+    """Manage the server data cached by the cli."""
+    pass
+
+
+@cache.command(name='clear', help='Remove the cached server data '
+               '(collections, provider types and name resolutions).')
+@click.pass_context
+def clear(ctx):
+    """Remove the cached server data.
+
+    The cache files are removed along with the caches held in memory by
+    the client api objects of a running daemon.
+
+    :param ctx: click context
+    :type ctx: click.Context
+    """
+    removed = 0
+    try:
+        names = os.listdir(CACHE_DIR)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise click.ClickException('Unable to clear the cache: '
+                                       '{0}'.format(e))
+        names = list()
+
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+            removed += 1
+        except OSError as e:
+            raise click.ClickException('Unable to clear the cache: '
+                                       '{0}'.format(e))
+
+    client_apis = getattr(ctx.find_root().command, 'client_apis', None)
+    for api in (client_apis or dict()).values():
+        api.clear_caches()
+
+    click.echo('Cleared {0} cache file(s).'.format(removed))
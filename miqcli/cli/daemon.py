@@ -0,0 +1,350 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Daemon module runs the cli as a long running process.
+
+The daemon listens on a unix domain socket and runs the commands
+forwarded by the cli entry point. It keeps the connected client api
+objects alive between commands, each command then only costs the local
+round trip plus the requests sent to the server.
+
+Messages sent over the socket are framed: a one byte channel followed by
+the payload length (4 bytes, big endian) and the payload itself.
+"""
+
+import errno
+import io
+import json
+import os
+import socket
+import struct
+import sys
+import traceback
+
+import click
+
+from miqcli.constants import DAEMON_SOCKET, GLOBAL_PARAMS
+
+__all__ = ['daemon', 'forward', 'serve', 'stop']
+
+#: frame header, channel and payload length
+_HEADER = struct.Struct('>cI')
+
+#: frame channels
+_REQUEST, _STDOUT, _STDERR, _EXIT = b'r', b'o', b'e', b'x'
+
+#: environment variable disabling the forwarding to the daemon
+NO_DAEMON_ENV = 'MIQCLI_NO_DAEMON'
+
+
+def _send_frame(sock, channel, payload):
+    """Send a frame on the socket.
+
+    :param sock: socket
+    :type sock: socket.socket
+    :param channel: frame channel
+    :type channel: bytes
+    :param payload: frame payload
+    :type payload: bytes
+    """
+    sock.sendall(_HEADER.pack(channel, len(payload)) + payload)
+
+
+def _recv_exactly(sock, size):
+    """Receive exactly size bytes from the socket.
+
+    :return: received data or None when the connection was closed
+    :rtype: bytes
+    """
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _recv_frame(sock):
+    """Receive a frame from the socket.
+
+    :return: channel and payload or (None, None) when closed
+    :rtype: tuple
+    """
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None, None
+    channel, size = _HEADER.unpack(header)
+    return channel, _recv_exactly(sock, size)
+
+
+class _FrameWriter(io.RawIOBase):
+    """Raw stream sending everything written as frames on a socket."""
+
+    def __init__(self, sock, channel, tty=False):
+        super(_FrameWriter, self).__init__()
+        self._sock = sock
+        self._channel = channel
+        self._tty = tty
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return self._tty
+
+    def write(self, data):
+        # bytes() of a memoryview is its repr on python 2
+        _send_frame(self._sock, self._channel, bytes(bytearray(data)))
+        return len(data)
+
+
+def _text_writer(sock, channel, tty):
+    """Return a text stream writing frames on the socket."""
+    return io.TextIOWrapper(
+        io.BufferedWriter(_FrameWriter(sock, channel, tty)),
+        encoding='utf-8', line_buffering=True)
+
+
+def _command_name(args):
+    """Return the command name of the cli arguments.
+
+    The global options given before the command are skipped.
+
+    :param args: cli arguments
+    :type args: list
+    :return: command name, None without a command
+    :rtype: str
+    """
+    ctx = click.Context(click.Command('miqcli'), resilient_parsing=True)
+    parser = click.OptionParser(ctx)
+    parser.allow_interspersed_args = False
+    for param in GLOBAL_PARAMS:
+        param.add_to_parser(parser, ctx)
+    try:
+        _, args, _ = parser.parse_args(list(args))
+    except click.UsageError:
+        return None
+    return args[0] if args else None
+
+
+def forward(args, path=DAEMON_SOCKET):
+    """Forward the cli arguments to a running daemon.
+
+    :param args: cli arguments
+    :type args: list
+    :param path: daemon socket path
+    :type path: str
+    :return: exit code or None when no daemon is running
+    :rtype: int
+    """
+    if os.environ.get(NO_DAEMON_ENV) or not os.path.exists(path):
+        return None
+    # the daemon command is run by this process, the daemon would wait on
+    # itself to stop
+    if _command_name(args) == 'daemon':
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except socket.error:
+        # stale socket file, the daemon is gone
+        sock.close()
+        return None
+
+    request = dict(
+        args=list(args),
+        cwd=os.getcwd(),
+        env={'MIQ_CFG': os.environ.get('MIQ_CFG')},
+        tty=[sys.stdout.isatty(), sys.stderr.isatty()]
+    )
+    try:
+        _send_frame(sock, _REQUEST, json.dumps(request).encode('utf-8'))
+        streams = {_STDOUT: sys.stdout, _STDERR: sys.stderr}
+        while True:
+            channel, payload = _recv_frame(sock)
+            if channel is None:
+                sys.stderr.write('ERROR: Connection to miqcli daemon lost.\n')
+                return 1
+            if channel == _EXIT:
+                return json.loads(payload.decode('utf-8'))
+            streams[channel].write(payload.decode('utf-8'))
+            streams[channel].flush()
+    finally:
+        sock.close()
+
+
+def _run(cli, request, sock):
+    """Run the forwarded cli arguments, sending the output to the socket.
+
+    :param cli: cli entry point
+    :type cli: click.MultiCommand
+    :param request: forwarded request
+    :type request: dict
+    :param sock: client socket
+    :type sock: socket.socket
+    :return: exit code
+    :rtype: int
+    """
+    stdout, stderr = sys.stdout, sys.stderr
+    cwd, environ = os.getcwd(), dict(os.environ)
+    tty = request.get('tty', [False, False])
+
+    sys.stdout = _text_writer(sock, _STDOUT, tty[0])
+    sys.stderr = _text_writer(sock, _STDERR, tty[1])
+    try:
+        if _command_name(request['args']) == 'daemon':
+            raise click.UsageError('The daemon command cannot be run by '
+                                   'the miqcli daemon.')
+        os.chdir(request['cwd'])
+        for key, value in request.get('env', {}).items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+        cli.main(args=request['args'], prog_name='miqcli',
+                 standalone_mode=False)
+        rc = 0
+    except SystemExit as e:
+        rc = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except click.ClickException as e:
+        e.show()
+        rc = e.exit_code
+    except click.Abort:
+        sys.stderr.write('Aborted!\n')
+        rc = 1
+    except Exception:
+        traceback.print_exc()
+        rc = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except (IOError, OSError, ValueError):
+                pass
+        sys.stdout, sys.stderr = stdout, stderr
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(environ)
+    return rc
+
+
+def serve(path=DAEMON_SOCKET):
+    """Run the daemon, serving forwarded commands until stopped.
+
+    Commands are run one at a time. The connected client api objects are
+    kept by the cli for the life of the daemon.
+
+    :param path: daemon socket path
+    :type path: str
+    """
+    from miqcli.cli.main import cli
+
+    # keep the connected client api objects between commands
+    cli.client_apis = dict()
+
+    # create miqcli folder if it doesn't exist
+    try:
+        os.makedirs(os.path.dirname(path))
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+    try:
+        os.remove(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o077)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(umask)
+    server.listen(16)
+
+    try:
+        while True:
+            sock, _ = server.accept()
+            try:
+                channel, payload = _recv_frame(sock)
+                if channel != _REQUEST:
+                    continue
+                request = json.loads(payload.decode('utf-8'))
+                if request.get('stop'):
+                    _send_frame(sock, _EXIT, b'0')
+                    break
+                rc = _run(cli, request, sock)
+                _send_frame(sock, _EXIT, json.dumps(rc).encode('utf-8'))
+            except socket.error:
+                # client went away, nothing left to send it
+                pass
+            finally:
+                sock.close()
+    finally:
+        server.close()
+        os.remove(path)
+
+
+def stop(path=DAEMON_SOCKET):
+    """Stop a running daemon.
+
+    :param path: daemon socket path
+    :type path: str
+    :return: True if a daemon was stopped otherwise False
+    :rtype: bool
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        _send_frame(sock, _REQUEST, json.dumps({'stop': True}).encode('utf-8'))
+        return _recv_frame(sock)[0] == _EXIT
+    except socket.error:
+        return False
+    finally:
+        sock.close()
+
+
+@click.command(name='daemon', help='Run the cli as a daemon, miqcli '
+               'commands are forwarded to it while it runs. Set '
+               'MIQCLI_NO_DAEMON=1 to bypass it.')
+@click.option('--stop', 'stop_daemon', is_flag=True,
+              help='Stop the running daemon.')
+def daemon(stop_daemon):
+    """Run the cli as a daemon.
+
+    While the daemon is running, miqcli commands are forwarded to it over
+    a unix domain socket. The daemon keeps its connection to the server
+    alive between commands.
+
+    :param stop_daemon: stop the running daemon
+    :type stop_daemon: bool
+    """
+    if stop_daemon:
+        if not stop():
+            click.echo('No miqcli daemon is running.')
+        return
+
+    if stop():
+        click.echo('Replaced the running miqcli daemon.')
+    click.echo('miqcli daemon listening on {0}'.format(DAEMON_SOCKET))
+    try:
+        serve()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,140 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Index module lists the collection commands without importing them.
+
+Listing the commands (``miqcli --help``, shell completion) used to import
+every collection module, and with them the manageiq client and requests.
+The commands and their help are now read from an index cached on disk,
+rebuilt when miqcli is installed again or a collection module changes.
+"""
+
+import os
+from importlib import import_module
+
+import miqcli
+from miqcli.cache import FileCache
+from miqcli.constants import CACHE_DIR, COLLECTIONS_PACKAGE, \
+    COLLECTIONS_ROOT
+from miqcli.utils import get_class_methods
+
+__all__ = ['CommandIndex']
+
+#: cache file of the command index, under the cache directory
+INDEX_FILE = 'commands.json'
+
+
+class CommandIndex(object):
+    """Collection commands index.
+
+    The index maps each collection name to its help and sub-commands, it
+    is stored in a :class:`miqcli.cache.FileCache` keyed by the last
+    modification of the miqcli package (written by each install) and of
+    the collection modules. Reading the installed version would import
+    the package metadata on every start.
+    """
+
+    def __init__(self, root=COLLECTIONS_ROOT, path=None):
+        """Constructor.
+
+        :param root: collections package directory
+        :type root: str
+        :param path: index cache file path
+        :type path: str
+        """
+        self._root = root
+        self._cache = FileCache(path or os.path.join(CACHE_DIR, INDEX_FILE))
+        self._commands = None
+
+    def modules(self):
+        """Return the collection module names and their paths.
+
+        :return: module name -> module file path
+        :rtype: dict
+        """
+        modules = dict()
+        for filename in os.listdir(self._root):
+            if '__init__' in filename or not filename.endswith('.py'):
+                continue
+            modules[filename[:-3]] = os.path.join(self._root, filename)
+        return modules
+
+    def key(self, modules):
+        """Return the index cache key.
+
+        :param modules: module name -> module file path
+        :type modules: dict
+        :return: cache key
+        :rtype: str
+        """
+        paths = list(modules.values()) + [
+            os.path.join(self._root, '__init__.py'), miqcli.__file__]
+        mtime = max(os.path.getmtime(path) for path in paths
+                    if os.path.exists(path))
+        return '{0}:{1}'.format(len(modules), mtime)
+
+    @staticmethod
+    def build(modules):
+        """Build the index by importing the collection modules.
+
+        :param modules: module names
+        :type modules: list
+        :return: collection name -> help and sub-commands
+        :rtype: dict
+        """
+        commands = dict()
+        for name in modules:
+            cls = getattr(import_module(COLLECTIONS_PACKAGE + '.' + name),
+                          'Collections')
+            commands[name] = dict(help=cls.__doc__,
+                                  commands=get_class_methods(cls))
+        return commands
+
+    @property
+    def commands(self):
+        """Commands property, read from the cache or built once.
+
+        :return: collection name -> help and sub-commands
+        :rtype: dict
+        """
+        if self._commands is None:
+            modules = self.modules()
+            key = self.key(modules)
+            self._commands = self._cache.get(key)
+            if self._commands is None:
+                self._commands = self.build(modules)
+                # an index only has one valid key, drop the previous ones
+                self._cache.clear()
+                self._cache.set(key, self._commands)
+        return self._commands
+
+    def names(self):
+        """Return the collection names.
+
+        :return: sorted collection names
+        :rtype: list
+        """
+        return sorted(self.commands)
+
+    def get(self, name):
+        """Return the help and sub-commands of the given collection.
+
+        :param name: collection name
+        :type name: str
+        :return: help and sub-commands, None for an unknown collection
+        :rtype: dict
+        """
+        return self.commands.get(name)
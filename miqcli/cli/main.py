@@ -16,19 +16,29 @@
 
 import os
 from copy import copy
-from functools import wraps
+from functools import partial, wraps
 
 import click
-from os import listdir
 
-from miqcli.api import ClientAPI
-from miqcli._compat import ServerProxy
-from miqcli.constants import CFG_DIR, CFG_NAME, COLLECTIONS_ROOT, \
-    DEFAULT_CONFIG, GLOBAL_PARAMS, PACKAGE, PYPI, VERSION
+from miqcli.cli.cache import cache
+from miqcli.cli.daemon import daemon
+from miqcli.cli.index import CommandIndex
+from miqcli.cli.version import show_version
+from miqcli.cli.watch import watch
+from miqcli.constants import CFG_DIR, CFG_NAME, DEFAULT_CONFIG, \
+    GLOBAL_PARAMS
 from miqcli.utils import Config, get_class_methods, log, \
     is_default_config_used, _abort_invalid_commands, get_collection_class
 
 
+#: cli commands not backed by a collection
+CLI_COMMANDS = {
+    'cache': cache,
+    'daemon': daemon,
+    'watch': watch
+}
+
+
 class ManageIQ(click.MultiCommand):
     """ManageIQ command line interface.
 
@@ -44,23 +54,36 @@ class ManageIQ(click.MultiCommand):
             params=GLOBAL_PARAMS
         )
 
+        # connected client api objects by settings, only kept by long
+        # running processes (see miqcli.cli.daemon)
+        self.client_apis = None
+        self._index = None
+
+    @property
+    def index(self):
+        """Collection commands index property, loaded on first access.
+
+        :return: Command index.
+        :rtype: CommandIndex
+        """
+        if self._index is None:
+            self._index = CommandIndex()
+        return self._index
+
     def list_commands(self, ctx):
         """Return a list of available commands.
 
-        Traverses the collections package to get all module names. Module
-        names are the name of the command itself.
+        The collection commands are read from the command index, the
+        collection modules are not imported. Module names are the name of
+        the command itself.
 
         :param ctx: Click context.
         :type ctx: Namespace
         :return: Available commands.
         :rtype: list
         """
-        collections = list()
-        for filename in listdir(COLLECTIONS_ROOT):
-            if '__init__' in filename:
-                continue
-            if filename.endswith('.py'):
-                collections.append(filename[:-3])
+        collections = self.index.names()
+        collections.extend(CLI_COMMANDS)
         collections.sort()
         return collections
 
@@ -68,9 +91,8 @@ class ManageIQ(click.MultiCommand):
         """Return the command (collections) object based on the command
         selected to run.
 
-        Imports the collection module based on the command to run and gets
-        the collection class. The collection class is then passed to the
-        sub-command class.
+        The sub-command class is created from the command index, the
+        collection module is only imported once a sub-command runs.
 
         :param ctx: Click context.
         :type ctx: Namespace
@@ -79,7 +101,14 @@ class ManageIQ(click.MultiCommand):
         :return: Click command object.
         :rtype: object
         """
-        return SubCollections(get_collection_class(ctx, name))
+        if name in CLI_COMMANDS:
+            return CLI_COMMANDS[name]
+        entry = self.index.get(name)
+        if entry is None:
+            # aborts for an invalid command
+            return SubCollections(name, collection_cls=get_collection_class(
+                ctx, name))
+        return SubCollections(name, entry['help'], entry['commands'])
 
     def invoke(self, ctx):
         """Invoke the command selected.
@@ -87,45 +116,108 @@ class ManageIQ(click.MultiCommand):
         Runs the command given with all its arguments. When no command is
         given it will display the cli with all commands/options. This method
         also checks for the version parameter. When given it will display
-        version information about the cli.
+        the installed version and, unless disabled by the version_check
+        setting, the latest version released (see miqcli.cli.version).
 
         :param ctx: Click context.
         :type ctx: Namespace
         """
         if ctx.params.get('version', False):
-            # miq cli version
-            msg, version = '', ''
-
-            # get ManageIQ CLI available versions from PYPI
-            pypi = ServerProxy(PYPI)
-            versions = pypi.package_releases(PACKAGE)
-
-            # lets begin version message formatting
-            try:
-                version_index = versions.index(VERSION)
-                if version_index == 0:
-                    status = 'an up-to-date'
-                else:
-                    status = 'an out-of-date'
-            except ValueError:
-                status = 'a pre-release'
-
-            # lets finalize version message formatting
-            try:
-                version = versions[0]
-            except IndexError:
-                version = 'N/A'
-            finally:
-                msg = 'Installed version : {0}\nLatest version    : {1}\n\n' \
-                      'You are running {2} version of ManageIQ CLI!'. \
-                    format(VERSION, version, status)
-                click.echo(msg)
-                ctx.exit()
+            # the latest version lookup honors the configuration settings
+            load_settings(ctx)
+            show_version(ctx.params)
+            ctx.exit()
         else:
             # invoke the collection
             super(ManageIQ, self).invoke(ctx)
 
 
+def connect_client_api(ctx):
+    """Return a client api object connected to the manageiq server.
+
+    Long running processes keep the connected client api objects in the
+    root command, a client api connected with the same settings is then
+    reused.
+
+    :param ctx: Root click context.
+    :type ctx: Namespace
+    :return: Connected client api object.
+    :rtype: ClientAPI
+    """
+    from miqcli.api import ClientAPI
+
+    client_apis = getattr(ctx.command, 'client_apis', None)
+    key = repr(sorted(ctx.params.items()))
+
+    if client_apis is not None and key in client_apis:
+        return client_apis[key]
+
+    client = ClientAPI(ctx.params)
+    client.connect()
+
+    if client_apis is not None:
+        client_apis[key] = client
+    return client
+
+
+def load_settings(ctx):
+    """Load the configuration settings in the root context parameters.
+
+    :param ctx: Root click context.
+    :type ctx: Namespace
+    """
+    # create config object
+    config = Config(verbose=ctx.params['verbose'])
+
+    # load config settings in the following order:
+    #   1. Default configuration settings
+    #       - managed by ManageIQ CLI constants
+    #   2. CLI parameters
+    #       - $ miqcli --options
+    #   3. YAML configuration @ /etc/miqcli/miqcli.[yml|yaml]
+    #   4. YAML configuration @ ./miqcli.[yml|yaml]
+    #   5. Environment variable
+    #       - $ export MIQ_CFG="{'key': 'val'}"
+    config.from_yml(CFG_DIR, CFG_NAME)
+    config.from_yml(os.path.join(os.getcwd()), CFG_NAME)
+    config.from_env('MIQ_CFG')
+
+    # set the final parameters after loading config settings
+    ctx.params.update(dict(config))
+
+
+def load_client_api(ctx):
+    """Load the configuration settings and connect to the manageiq server.
+
+    The final configuration settings are set in the root context and the
+    connected client api object is saved in it for each collection to
+    access.
+
+    :param ctx: Root click context.
+    :type ctx: Namespace
+    :return: Connected client api object.
+    :rtype: ClientAPI
+    """
+    load_settings(ctx)
+
+    # notify user if default config is used
+    if is_default_config_used():
+        log.warning('Default configuration is used.')
+
+    # create the client api object and connect to manageiq server
+    client = connect_client_api(ctx)
+
+    # save the client api pointer reference in the root context for each
+    # collection to access
+    setattr(ctx, 'client_api', client)
+
+    # report the http calls once the command is done
+    if client.tracer is not None:
+        ctx.call_on_close(partial(client.tracer.report,
+                                  ctx.params.get('trace_file')))
+    return client
+
+
 class SubCollections(click.MultiCommand):
     """Sub-collections.
 
@@ -135,22 +227,44 @@ class SubCollections(click.MultiCommand):
         miqcli <parent_command> <sub_command>
     """
 
-    def __init__(self, collection_cls):
+    def __init__(self, name, help=None, commands=None, collection_cls=None):
         """Constructor.
 
-        :param collection: Collection class.
-        :type collection: class
+        :param name: Collection name.
+        :type name: str
+        :param help: Collection help, from the command index.
+        :type help: str
+        :param commands: Sub-command names, from the command index.
+        :type commands: list
+        :param collection_cls: Collection class, imported when not given.
+        :type collection_cls: class
+        """
+        if collection_cls is not None:
+            help = collection_cls.__doc__
+            commands = get_class_methods(collection_cls)
+        super(SubCollections, self).__init__(name=name, help=help)
+        self.commands = commands
+        self._collection_cls = collection_cls
+
+    @property
+    def collection_cls(self):
+        """Collection class property, imported on first access.
+
+        :return: Collection class.
+        :rtype: class
         """
-        super(SubCollections, self).__init__(help=collection_cls.__doc__)
-        self.collection_cls = collection_cls
+        if self._collection_cls is None:
+            self._collection_cls = get_collection_class(
+                click.get_current_context(), self.name)
+        return self._collection_cls
 
     def list_commands(self, ctx):
         """Return a list of available sub-commands for the parent command.
 
-        Traverses the collection class to get all method names. Class method
-        names are the names of the sub-commands for the parent command.
+        Class method names are the names of the sub-commands for the parent
+        command, they are listed by the command index.
         """
-        return get_class_methods(self.collection_cls)
+        return self.commands
 
     @staticmethod
     def convert_to_function(method):
@@ -227,44 +341,8 @@ class SubCollections(click.MultiCommand):
             _abort_invalid_commands(ctx, ctx.protected_args[0])
 
         if '--help' not in ctx.args:
-            # get parent context
-            parent_ctx = click.get_current_context().find_root()
-
-            # create config object
-            config = Config(verbose=parent_ctx.params['verbose'])
-
-            # load config settings in the following order:
-            #   1. Default configuration settings
-            #       - managed by ManageIQ CLI constants
-            #   2. CLI parameters
-            #       - $ miqcli --options
-            #   3. YAML configuration @ /etc/miqcli/miqcli.[yml|yaml]
-            #   4. YAML configuration @ ./miqcli.[yml|yaml]
-            #   5. Environment variable
-            #       - $ export MIQ_CFG="{'key': 'val'}"
-            config.from_yml(CFG_DIR, CFG_NAME)
-            config.from_yml(os.path.join(os.getcwd()), CFG_NAME)
-            config.from_env('MIQ_CFG')
-
-            # set the final parameters after loading config settings
-            click.get_current_context().find_root().params.update(
-                dict(config)
-            )
-
-            # notify user if default config is used
-            if is_default_config_used():
-                log.warning('Default configuration is used.')
-
-            # create the client api object
-            client = ClientAPI(click.get_current_context().find_root().params)
-
-            # connect to manageiq server
-            client.connect()
-
-            # save the client api pointer reference in the parent context for
-            # each collection to access
-            setattr(parent_ctx, 'client_api', client)
-            del parent_ctx
+            # load the configuration settings and connect to the server
+            load_client_api(click.get_current_context().find_root())
 
         super(SubCollections, self).invoke(ctx)
 
@@ -0,0 +1,161 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Version module reports the installed and latest released versions.
+
+The installed version is read from the package metadata. The latest
+version released on PyPI is looked up with a short timeout and cached, the
+lookup is skipped with the ``version_check`` setting set to false.
+"""
+
+import json
+import os
+import re
+import threading
+
+import click
+
+from miqcli.cache import FileCache
+from miqcli.constants import CACHE_DIR, PACKAGE, PYPI, VERSION_CHECK_TIMEOUT, \
+    VERSION_CHECK_TTL
+from miqcli.utils import get_version, log
+
+__all__ = ['fetch_latest_version', 'latest_version', 'show_version',
+           'version_status']
+
+#: cache file of the latest released version, under the cache directory
+VERSION_FILE = 'version.json'
+
+
+def _fetch(timeout, result):
+    """Get the latest version from PyPI, append it to the result list.
+
+    :param timeout: seconds to wait for PyPI
+    :type timeout: float
+    :param result: list the version is appended to
+    :type result: list
+    """
+    from miqcli._compat import urlopen
+
+    try:
+        response = urlopen('{0}/{1}/json'.format(PYPI, PACKAGE),
+                           timeout=timeout)
+        try:
+            result.append(json.loads(response.read().decode('utf-8'))[
+                'info']['version'])
+        finally:
+            response.close()
+    except Exception as e:
+        # the lookup is best effort, whatever the network failure
+        result.append(None)
+        log.debug('Unable to get the latest version from PyPI: {0}'.format(
+            e))
+
+
+def fetch_latest_version(timeout=VERSION_CHECK_TIMEOUT):
+    """Return the latest miqcli version released on PyPI.
+
+    The lookup runs in a daemon thread, the name resolution is not bounded
+    by the socket timeout and it is abandoned after the timeout as well.
+
+    :param timeout: seconds to wait for PyPI
+    :type timeout: float
+    :return: latest version, None when PyPI did not tell it in time
+    :rtype: str
+    """
+    result = list()
+    thread = threading.Thread(target=_fetch, args=(timeout, result))
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout)
+    if not result:
+        log.debug('PyPI did not tell the latest version within {0} '
+                  'seconds.'.format(timeout))
+        return None
+    return result[0]
+
+
+def latest_version(settings):
+    """Return the latest miqcli version released, from the cache if fresh.
+
+    Failed lookups are cached as well, a host without access to PyPI only
+    waits for the lookup timeout once per cache lifetime.
+
+    :param settings: configuration settings
+    :type settings: dict
+    :return: latest version, None when unknown or not checked
+    :rtype: str
+    """
+    if not settings.get('version_check', True):
+        return None
+
+    cache = FileCache(os.path.join(CACHE_DIR, VERSION_FILE),
+                      ttl=settings.get('version_check_ttl', VERSION_CHECK_TTL))
+    entry = cache.get(PACKAGE)
+    if entry is None:
+        entry = dict(latest=fetch_latest_version(settings.get(
+            'version_check_timeout', VERSION_CHECK_TIMEOUT)))
+        cache.set(PACKAGE, entry)
+    return entry['latest']
+
+
+def _parse(version):
+    """Return the numeric release parts of a version, e.g. (1, 2, 0).
+
+    :param version: version
+    :type version: str
+    :return: release parts
+    :rtype: tuple
+    """
+    release = re.match(r'\d+(\.\d+)*', version)
+    if release is None:
+        return tuple()
+    return tuple(int(part) for part in release.group(0).split('.'))
+
+
+def version_status(installed, latest):
+    """Return the status of the installed version against the latest one.
+
+    :param installed: installed version
+    :type installed: str
+    :param latest: latest released version
+    :type latest: str
+    :return: 'an up-to-date', 'an out-of-date' or 'a pre-release'
+    :rtype: str
+    """
+    if installed == latest:
+        return 'an up-to-date'
+    if _parse(installed) < _parse(latest):
+        return 'an out-of-date'
+    return 'a pre-release'
+
+
+def show_version(settings):
+    """Display the installed version, then compare it to the latest one.
+
+    :param settings: configuration settings
+    :type settings: dict
+    """
+    installed = get_version()
+    click.echo('Installed version : {0}'.format(installed))
+    if not settings.get('version_check', True):
+        return
+
+    latest = latest_version(settings)
+    click.echo('Latest version    : {0}'.format(latest or 'N/A'))
+    if latest is not None:
+        click.echo('\nYou are running {0} version of ManageIQ CLI!'.format(
+            version_status(installed, latest)))
@@ -0,0 +1,91 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Watch module follows requests or tasks until they finish."""
+
+import click
+
+from miqcli.constants import WATCH_INTERVAL, WATCH_MAX_INTERVAL, \
+    WATCHED_STATES
+from miqcli.utils import log
+
+__all__ = ['watch', 'format_event']
+
+
+def format_event(name, event):
+    """Return the message describing a state change.
+
+    :param name: collection name
+    :type name: str
+    :param event: state change
+    :type event: miqcli.watch.Event
+    :return: message
+    :rtype: str
+    """
+    if event.previous is None:
+        state = event.state
+    else:
+        state = '{0} -> {1}'.format(event.previous, event.state)
+    return ' * {0} {1}: {2}, status: {3}, message: {4}'.format(
+        name, event.id, state, event.status, event.message)
+
+
+@click.command(name='watch', help='Watch requests or tasks until they '
+               'finish, printing each state change.')
+@click.argument('name', metavar='COLLECTION',
+                type=click.Choice(sorted(WATCHED_STATES)))
+@click.argument('ids', metavar='ID...', nargs=-1, required=True)
+@click.option('--interval', type=float, default=WATCH_INTERVAL,
+              help='Seconds between the first polls, the time between '
+                   'polls grows while nothing changes.')
+@click.option('--max_interval', type=float, default=WATCH_MAX_INTERVAL,
+              help='Maximum seconds between polls.')
+@click.option('--timeout', type=float, default=None,
+              help='Seconds to wait for the resources to finish.')
+@click.pass_context
+def watch(ctx, name, ids, interval, max_interval, timeout):
+    """Watch requests or tasks until they finish.
+
+    The state of every watched resource is polled with a single query.
+
+    :param ctx: click context
+    :type ctx: click.Context
+    :param name: collection name
+    :type name: str
+    :param ids: resource ids
+    :type ids: tuple
+    :param interval: seconds between the first polls
+    :type interval: float
+    :param max_interval: maximum seconds between polls
+    :type max_interval: float
+    :param timeout: seconds to wait, None for no limit
+    :type timeout: float
+    :return: last event of each resource
+    :rtype: list
+    """
+    from miqcli.cli.main import load_client_api
+    from miqcli.watch import Watcher
+
+    api = load_client_api(ctx.find_root())
+    watcher = Watcher(api, name, ids, interval=interval,
+                      max_interval=max_interval, timeout=timeout)
+    for event in watcher:
+        log.info(format_event(name, event))
+
+    if watcher.pending:
+        log.abort('Timed out waiting for {0} {1}.'.format(
+            name, ', '.join(watcher.pending)))
+    return [watcher.events[_id] for _id in watcher.ids]
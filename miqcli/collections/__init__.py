@@ -14,6 +14,16 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+from multiprocessing.pool import ThreadPool
+
+import click
+from manageiq_client.api import APIException
+from miqcli.constants import BULK_BATCH_SIZE, BULK_WORKERS, \
+    WATCH_INTERVAL, WATCH_MAX_INTERVAL
+from miqcli.decorators import client_api
+from miqcli.utils import log
+from miqcli.watch import Watcher
+
 __all__ = ['CollectionsMixin']
 
 
@@ -21,11 +31,131 @@ class CollectionsMixin(object):
     """Mixin collections class.
 
     Provides extra properties and methods to collections.
+
+    Collections run by the cli find the client api object and the verbose
+    mode in the click context. Collections bound to a client api object
+    do not depend on the click context, each thread can use its own.
     """
 
     # request id
     _req_id = ''
 
+    # collection resources, loaded on first access
+    _all = None
+
+    # name of the collection action to resolve on first access
+    _action_name = None
+
+    def __init__(self, api=None, verbose=None):
+        """Constructor.
+
+        :param api: client api object, looked up in the click context
+            when not given
+        :type api: ClientAPI
+        :param verbose: verbose mode, the --verbose option when not given
+        :type verbose: bool
+        """
+        self._bound_api = api
+        self._bound_verbose = verbose
+
+    @property
+    def verbose(self):
+        """Verbose mode property.
+
+        :return: verbose mode
+        :rtype: bool
+        """
+        if self._bound_verbose is not None:
+            return self._bound_verbose
+        ctx = click.get_current_context(silent=True)
+        return bool(ctx and ctx.find_root().params.get('verbose'))
+
+    @property
+    def all(self):
+        """All collection resources property.
+
+        Reading this property requests every resource for the collection
+        from the server. It is only done the first time the property is
+        accessed, the resources are then memoized for the life of the
+        collection object.
+
+        :return: collection resources
+        :rtype: list
+        """
+        if self._all is None:
+            self._all = self.collection.all
+        return self._all
+
+    @property
+    def action(self):
+        """Collection action property.
+
+        The action matching the invoked collection method. It is resolved
+        when accessed since the lookup requires loading the collection
+        from the server.
+
+        :return: collection action or None when the action does not exist
+        :rtype: object
+        """
+        if self._action_name is None:
+            return None
+        try:
+            return getattr(self.collection.action, self._action_name)
+        except (AttributeError, RuntimeError):
+            # action does not exist
+            return None
+
+    def _show(self, resources, title, attr=None, debug=False):
+        """Log the resources as the query pages are received.
+
+        Collections bound to a client api object keep the resources for
+        their caller. Run by the cli, the resources are only logged and at
+        most the first one is kept, memory does not grow with the number
+        of resources matching.
+
+        :param resources: generator of resources
+        :type resources: generator
+        :param title: title logged before the first resource
+        :type title: str
+        :param attr: attributes logged along with the id and name
+        :type attr: tuple
+        :param debug: log all the attributes received
+        :type debug: bool
+        :return: kept resources and the number of resources
+        :rtype: tuple
+        """
+        attr = attr or ()
+        keep = self._bound_api is not None
+        found, count = list(), 0
+        for e in resources:
+            if not count:
+                log.info('-' * 50)
+                log.info(title.center(50))
+                log.info('-' * 50)
+            if keep or not count:
+                found.append(e)
+            count += 1
+
+            log.info(' * ID: %s' % e['id'])
+            log.info(' * NAME: %s' % e['name'])
+
+            if debug:
+                for k, v in e['_data'].items():
+                    if k == "id" or k == "name" or k in attr:
+                        continue
+                    try:
+                        log.debug(' * %s: %s' % (k.upper(), v))
+                    except AttributeError:
+                        log.debug(' * %s: ' % k.upper())
+
+            for a in attr:
+                try:
+                    log.info(' * %s: %s' % (a.upper(), e[a]))
+                except AttributeError:
+                    log.info(' * %s: ' % a.upper())
+            log.info('-' * 50)
+        return found, count
+
     @property
     def req_id(self):
         """Request id property.
@@ -54,10 +184,187 @@ class CollectionsMixin(object):
         :param value: request id
         :type value: iterator|list
         """
+        self._req_id = self.result_id(value)
+
+    @staticmethod
+    def result_id(value):
+        """Return the id of the first result of an action call.
+
+        :param value: action call results
+        :type value: iterator|list
+        :return: id
+        :rtype: str
+        :raises APIException: the action failed
+        """
         try:
             # python 3
             results = next(value)
         except TypeError:
             # python 2
             results = value.pop(0)
-        self._req_id = getattr(results, 'id')
+        if isinstance(results, dict):
+            # failed action, only its message was sent back
+            raise APIException(results.get('message'))
+        return getattr(results, 'id')
+
+    @client_api
+    def wait_for(self, req_id, states=None, timeout=None,
+                 interval=WATCH_INTERVAL, max_interval=WATCH_MAX_INTERVAL,
+                 callback=None):
+        """Wait for a request or task to reach one of the given states.
+
+        The state is polled with exponential backoff and jitter, from
+        interval up to max_interval seconds between polls.
+
+        Usage
+
+        .. code-block: python
+
+        client.collection = 'provision_requests'
+        result = client.collection.wait_for(req_id, timeout=3600)
+        log.info('Request %s: %s after %s polls.' % (
+            result.id, result.status, result.polls))
+
+        :param req_id: id of the request or task
+        :type req_id: str
+        :param states: states to wait for, the collection terminal states
+            by default
+        :type states: tuple
+        :param timeout: seconds to wait, None for no limit
+        :type timeout: float
+        :param interval: seconds between the first polls
+        :type interval: float
+        :param max_interval: maximum seconds between polls
+        :type max_interval: float
+        :param callback: called with each state change
+            (:class:`miqcli.watch.Event`)
+        :type callback: function
+        :return: outcome of the wait, with the poll count and the latency
+        :rtype: miqcli.watch.WaitResult
+        :raises WaitTimeout: the states were not reached in time
+        :raises WaitNotFound: the server does not return the resource
+        """
+        watcher = Watcher(self.api, self.__module__.split('.')[-1],
+                          [req_id], states=states, interval=interval,
+                          max_interval=max_interval, timeout=timeout)
+        for event in watcher:
+            if callback:
+                callback(event)
+        return watcher.result(req_id)
+
+    @staticmethod
+    def task_result(outcome):
+        """Return the task id of a bulk action result.
+
+        :param outcome: bulk action result of a resource
+        :type outcome: object|dict
+        :return: task id
+        :rtype: str
+        :raises APIException: the action failed for the resource
+        """
+        if isinstance(outcome, dict):
+            data = outcome
+        else:
+            data = getattr(outcome, '_data', dict())
+        if data.get('success') is False:
+            raise APIException(data.get('message'))
+        if 'task_id' in data:
+            return str(data['task_id'])
+        if isinstance(outcome, dict):
+            raise APIException(data.get('message', 'No task created'))
+        # entity built from the task href
+        return str(getattr(outcome, 'id'))
+
+    @staticmethod
+    def _submit_bulk(action, batch):
+        """Submit the action for a batch of resources with one request.
+
+        :param action: collection action
+        :type action: Action
+        :param batch: resources
+        :type batch: list
+        :return: result of each resource, its task id or error
+        :rtype: list
+        """
+        try:
+            outcome = list(action(*batch))
+        except APIException as e:
+            return [dict(id=str(r.id), name=r.__dict__.get('name'),
+                         error=str(e)) for r in batch]
+
+        results = list()
+        for index, resource in enumerate(batch):
+            result = dict(id=str(resource.id),
+                          name=resource.__dict__.get('name'))
+            try:
+                if index >= len(outcome):
+                    raise APIException('No result sent back by the server')
+                result['task_id'] = CollectionsMixin.task_result(
+                    outcome[index])
+            except APIException as e:
+                result['error'] = str(e)
+            results.append(result)
+        return results
+
+    def _bulk_action(self, resources, batch_size=BULK_BATCH_SIZE,
+                     workers=BULK_WORKERS, wait=False):
+        """Run the invoked collection action on many resources.
+
+        The resources are sent in batches, a single request per batch,
+        by a bounded pool of workers. The task created for each resource
+        is reported, with wait all the tasks are then watched together
+        until they finish.
+
+        :param resources: collection resources
+        :type resources: list
+        :param batch_size: resources sent by each request
+        :type batch_size: int
+        :param workers: requests submitted concurrently
+        :type workers: int
+        :param wait: wait for the tasks to finish
+        :type wait: bool
+        :return: result of each resource, its task id or error
+        :rtype: list
+        """
+        action = self.action
+        if action is None:
+            log.abort('Unable to run {0} on {1}: action not available.'
+                      .format(self._action_name, self.collection.name))
+
+        batches = [resources[i:i + batch_size]
+                   for i in range(0, len(resources), batch_size)]
+        outcome = list()
+        pool = ThreadPool(max(1, min(workers, len(batches))))
+        try:
+            for batch in pool.imap(log.propagate(
+                    lambda items: self._submit_bulk(action, items)), batches):
+                outcome.extend(batch)
+        finally:
+            pool.close()
+            pool.join()
+
+        for result in outcome:
+            if 'error' in result:
+                log.error(' * {0} ({1}): {2}'.format(
+                    result['name'], result['id'], result['error']))
+            else:
+                log.info(' * {0} ({1}): task {2}'.format(
+                    result['name'], result['id'], result['task_id']))
+
+        if wait:
+            tasks = dict((result['task_id'], result) for result in outcome
+                         if 'task_id' in result)
+            for event in Watcher(self.api, 'tasks', list(tasks)):
+                result = tasks[event.id]
+                result.update(state=event.state, status=event.status,
+                              message=event.message)
+                if event.terminal:
+                    log.info(' * {0} ({1}): task {2} {3}, status: {4}, '
+                             'message: {5}'.format(
+                                 result['name'], result['id'], event.id,
+                                 event.state, event.status, event.message))
+
+        failed = len([result for result in outcome if 'error' in result])
+        log.info('Tasks created: {0}, failed: {1}'.format(
+            len(outcome) - failed, failed))
+        return outcome
@@ -16,13 +16,14 @@
 
 import click
 from collections import OrderedDict
+from copy import deepcopy
 from manageiq_client.api import APIException
 from pprint import pformat
 
 from miqcli.collections import CollectionsMixin
 from miqcli.constants import OSP_FIP_PAYLOAD, SUPPORTED_AUTOMATE_REQUESTS, AR
 from miqcli.decorators import client_api
-from miqcli.provider import Networks, Tenant
+from miqcli.provider import Networks, ResourceNotFound, Tenant
 from miqcli.query import BasicQuery
 from miqcli.utils import log, get_input_data
 
@@ -67,22 +68,25 @@ class Collections(CollectionsMixin):
             _payload = input_data
         elif method == AR.GEN_FIP:
             # set the floating ip if set by the user
-            _payload = OSP_FIP_PAYLOAD
+            _payload = deepcopy(OSP_FIP_PAYLOAD)
             if 'fip_pool' in input_data:
-                # lookup cloud network resource to get the id
-                # TODO: need to have user set the provider
-                networks = Networks('OpenStack', self.api, 'public')
-                _payload['parameters']['cloud_network_id'] = \
-                    networks.get_id(input_data['fip_pool'])
-
-                # lookup cloud tenant
-                # TODO: need to have user set the provider
-                tenant = Tenant('OpenStack', self.api)
-                _payload['parameters']['cloud_tenant_id'] = \
-                    tenant.get_id(input_data['tenant'])
+                try:
+                    # lookup cloud network resource to get the id
+                    # TODO: need to have user set the provider
+                    networks = Networks('OpenStack', self.api, 'public')
+                    _payload['parameters']['cloud_network_id'] = \
+                        networks.get_id(input_data['fip_pool'])
+
+                    # lookup cloud tenant
+                    # TODO: need to have user set the provider
+                    tenant = Tenant('OpenStack', self.api)
+                    _payload['parameters']['cloud_tenant_id'] = \
+                        tenant.get_id(input_data['tenant'])
+                except ResourceNotFound as e:
+                    log.abort(e)
 
         elif method == AR.RELEASE_FIP:
-            _payload = OSP_FIP_PAYLOAD
+            _payload = deepcopy(OSP_FIP_PAYLOAD)
             # release the floating_ip
             _payload["uri_parts"]["instance"] = "release_floating_ip"
             if 'floating_ip' in input_data:
@@ -128,9 +132,12 @@ class Collections(CollectionsMixin):
         """
         status = OrderedDict()
         query = BasicQuery(self.collection)
+        # only the printed attributes are requested
+        fields = ('id', 'options', 'request_state', 'status', 'message')
 
         if req_id:
-            automation_requests = query(("id", "=", req_id))
+            automation_requests = query(("id", "=", req_id),
+                                        fields=fields)
 
             if len(automation_requests) < 1:
                 log.warning('Automation request id: %s not found!' % req_id)
@@ -152,7 +159,8 @@ class Collections(CollectionsMixin):
 
             return req
         else:
-            automation_requests = query(("request_state", "!=", "finished"))
+            automation_requests = query(
+                ("request_state", "!=", "finished"), fields=fields)
 
             if len(automation_requests) < 1:
                 log.warning('No active automation requests at this time.')
@@ -17,6 +17,7 @@
 import click
 from manageiq_client.api import APIException
 from miqcli.collections import CollectionsMixin
+from miqcli.constants import BULK_BATCH_SIZE
 from miqcli.decorators import client_api
 from miqcli.query import AdvancedQuery
 from miqcli.query import BasicQuery
@@ -27,31 +28,10 @@ from miqcli.utils import log
 class Collections(CollectionsMixin):
     """Instances collections."""
 
-    @click.option('--by_id', type=bool, default=False,
-                  help='inst_name given as ID of instance, '
-                       'all other options except --attr are ignored')
-    @click.option('--attr', type=str, default='',
-                  help='attribute of an instance(s)', multiple=True)
-    @click.option('--provider', type=str, default='',
-                  help='provider of an instance(s)')
-    @click.option('--network', type=str, default='',
-                  help='cloud network of an instance(s)')
-    @click.option('--tenant', type=str, default='',
-                  help='cloud tenant of an instance(s)')
-    @click.option('--subnet', type=str, default='',
-                  help='cloud subnet of an instance(s)')
-    @click.option('--vendor', type=str, default='',
-                  help='vendor of an instance(s)')
-    @click.option('--itype', type=str, default='',
-                  help='type of an instance(s) - ex. "Openstack", "Amazon"...')
-    @click.argument('inst_name', metavar='INST_NAME', type=str, default='')
-    @client_api
-    def query(self, inst_name, provider=None, network=None, tenant=None,
-              subnet=None, vendor=None, itype=None, attr=None, by_id=False):
-        """Query instances.
-
-        ::
-        Allows querying instances based on name and attributes
+    def _find(self, inst_name, provider=None, network=None, tenant=None,
+              subnet=None, vendor=None, itype=None, attr=None, by_id=False,
+              fields=None):
+        """Return the instances matching the options.
 
         :param inst_name: name of the instance
         :type inst_name: str
@@ -71,11 +51,12 @@ class Collections(CollectionsMixin):
         :type attr: tuple
         :param by_id: name is instance id
         :type by_id: bool
-        :return: instance object or list of instance objects
+        :param fields: only request these attributes (and id, attr), None
+            for all of them
+        :type fields: tuple
+        :return: generator of instances and the message when none is found
+        :rtype: tuple
         """
-
-        instances = None
-
         # Query by ID
         if by_id:
             # ID given in name
@@ -85,13 +66,9 @@ class Collections(CollectionsMixin):
 
                 qs_by_id = ("id", "=", inst_name)
                 query = BasicQuery(self.collection)
-                instances = query(qs_by_id, attr)
-
-                if len(instances) < 1:
-                    log.abort(
-                        'Cannot find Instance with ID:%s in %s' %
-                        (inst_name,
-                         self.collection.name))
+                instances = query.iter(qs_by_id, attr, fields)
+                not_found = 'Cannot find Instance with ID:%s in %s' % (
+                    inst_name, self.collection.name)
 
             # Error no ID given
             else:
@@ -125,66 +102,86 @@ class Collections(CollectionsMixin):
                 if len(qs) == 1:
                     # Name only
                     query = BasicQuery(self.collection)
-                    instances = query(qs[0], attr)
+                    instances = query.iter(qs[0], attr, fields)
                 else:
                     # Mix of various options and name
                     query = AdvancedQuery(self.collection)
-                    instances = query(qs, attr)
-
-                if len(instances) < 1:
-                    log.abort('No instance(s) found for given parameters')
+                    instances = query.iter(qs, attr, fields)
+                not_found = 'No instance(s) found for given parameters'
 
             # general query on all instances
             else:
+                query = BasicQuery(self.collection)
+                instances = query.iter(None, attr, fields)
+                not_found = 'No instance(s) found for given parameters'
 
-                # return instances that have the attribute passed set
-                if attr:
-                    # scrub attr of base attributes
-                    opt_lists = self.collection.options()
-                    att_list = list(attr)
-                    for att in att_list:
-                        if att in opt_lists['attributes']:
-                            att_list.remove(att)
-                    cln_atr = tuple(att_list)
-
-                    instances = self.collection.all_include_attributes(cln_atr)
+        return instances, not_found
 
-                # attribute not set, pass back all instances w/basic info
-                else:
-                    instances = self.collection.all
-
-        if instances:
-            log.info('-' * 50)
-            log.info('Instance Info'.center(50))
-            log.info('-' * 50)
+    @click.option('--by_id', type=bool, default=False,
+                  help='inst_name given as ID of instance, '
+                       'all other options except --attr are ignored')
+    @click.option('--attr', type=str, default='',
+                  help='attribute of an instance(s)', multiple=True)
+    @click.option('--provider', type=str, default='',
+                  help='provider of an instance(s)')
+    @click.option('--network', type=str, default='',
+                  help='cloud network of an instance(s)')
+    @click.option('--tenant', type=str, default='',
+                  help='cloud tenant of an instance(s)')
+    @click.option('--subnet', type=str, default='',
+                  help='cloud subnet of an instance(s)')
+    @click.option('--vendor', type=str, default='',
+                  help='vendor of an instance(s)')
+    @click.option('--itype', type=str, default='',
+                  help='type of an instance(s) - ex. "Openstack", "Amazon"...')
+    @click.argument('inst_name', metavar='INST_NAME', type=str, default='')
+    @client_api
+    def query(self, inst_name, provider=None, network=None, tenant=None,
+              subnet=None, vendor=None, itype=None, attr=None, by_id=False):
+        """Query instances.
 
-            debug = click.get_current_context().find_root().params['verbose']
-            for e in instances:
-                log.info(' * ID: %s' % e['id'])
-                log.info(' * NAME: %s' % e['name'])
+        ::
+        Allows querying instances based on name and attributes
 
-                if debug:
-                    for k, v in e['_data'].items():
-                        if k == "id" or k == "name" or k in attr:
-                            continue
-                        try:
-                            log.debug(' * %s: %s' % (k.upper(), v))
-                        except AttributeError:
-                            log.debug(' * %s: ' % k.upper())
-                if attr:
-                    for a in attr:
-                        try:
-                            log.info(' * %s: %s' % (a.upper(), e[a]))
-                        except AttributeError:
-                            log.info(' * %s: ' % a.upper())
-                log.info('-' * 50)
+        :param inst_name: name of the instance
+        :type inst_name: str
+        :param provider: name of provider
+        :type provider: str
+        :param network: name of cloud network
+        :type network: str
+        :param tenant: name of cloud tentant
+        :type tenant: str
+        :param subnet: name of cloud subnetwork
+        :type subnet: str
+        :param vendor: name of vendor
+        :type vendor: str
+        :param itype: type of instance - "Openstack" or "Amazon"
+        :type itype: str
+        :param attr: attribute
+        :type attr: tuple
+        :param by_id: name is instance id
+        :type by_id: bool
+        :return: instance object or list of instance objects
+        """
 
-            if len(instances) == 1:
-                return instances[0]
-            else:
-                return instances
+        # only the printed attributes are requested unless verbose
+        debug = self.verbose
+        fields = None if debug else ('id', 'name')
+
+        instances, not_found = self._find(
+            inst_name, provider, network, tenant, subnet, vendor, itype,
+            attr, by_id, fields)
+
+        # print the resources as the query pages are received, run by the
+        # cli they are not kept (see CollectionsMixin._show)
+        found, count = self._show(instances, 'Instance Info', attr, debug)
+        if not count:
+            log.abort(not_found)
+        elif count == 1:
+            return found[0]
         else:
-            log.abort('No instance(s) found for given parameters')
+            # several matched, run by the cli only the first one is kept
+            return found
 
     @click.option('--by_id', type=bool, default=False,
                   help='inst_name given as ID of instance '
@@ -201,13 +198,24 @@ class Collections(CollectionsMixin):
                   help='vendor of an instance(s)')
     @click.option('--itype', type=str, default='',
                   help='type of an instance(s) - ex. "Openstack", "Amazon"...')
+    @click.option('--all_matching', is_flag=True, default=False,
+                  help='terminate all the instances matching the options')
+    @click.option('--batch_size', type=int, default=BULK_BATCH_SIZE,
+                  help='instances terminated by each request with '
+                       '--all_matching')
+    @click.option('--wait', is_flag=True, default=False,
+                  help='wait for the tasks terminating the instances to '
+                       'finish with --all_matching')
     @click.argument('inst_name', metavar='INST_NAME', type=str, default='')
     @client_api
     def terminate(self, inst_name, provider=None, network=None, tenant=None,
-                  subnet=None, vendor=None, itype=None, by_id=False):
+                  subnet=None, vendor=None, itype=None, by_id=False,
+                  all_matching=False, batch_size=BULK_BATCH_SIZE, wait=False):
         """Terminate instance.
 
         ::
+        With all_matching, every instance matching the options is
+        terminated, the task created for each one is reported.
 
         :param inst_name: name of the instance
         :type inst_name: str
@@ -225,10 +233,29 @@ class Collections(CollectionsMixin):
         :type itype: str
         :param by_id: name is instance id
         :type by_id: bool
-        :return: id of the task created to terminate the instance
-        :rtype: int
+        :param all_matching: terminate all the matching instances
+        :type all_matching: bool
+        :param batch_size: instances terminated by each request
+        :type batch_size: int
+        :param wait: wait for the tasks to finish
+        :type wait: bool
+        :return: id of the task created to terminate the instance, with
+            all_matching the result of each instance
+        :rtype: int|list
         """
-        if inst_name:
+        if all_matching:
+            if not any((inst_name, provider, network, tenant, subnet, vendor,
+                        itype)):
+                log.abort('Set an instance or options matching the instances '
+                          'to be terminated.')
+            instances, not_found = self._find(
+                inst_name, provider, network, tenant, subnet, vendor, itype,
+                by_id=by_id, fields=('name',))
+            instances = list(instances)
+            if not instances:
+                log.abort(not_found)
+            return self._bulk_action(instances, batch_size, wait=wait)
+        elif inst_name:
             instance = self.query(inst_name, provider, network, tenant,
                                   subnet, vendor, itype, by_id=by_id)
             if instance and type(instance) is list:
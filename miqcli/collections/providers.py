@@ -17,9 +17,9 @@
 from pprint import pformat
 
 import click
-from collections import Mapping
 from manageiq_client.api import APIException
 
+from miqcli._compat import Mapping
 from miqcli.collections import CollectionsMixin
 from miqcli.constants import SUPPORTED_PROVIDERS
 from miqcli.decorators import client_api
@@ -14,21 +14,30 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import json
+import os
+from copy import deepcopy
+from multiprocessing.pool import ThreadPool
 from pprint import pformat
 
 import click
 from collections import OrderedDict
+from manageiq_client.api import APIException
 
 from miqcli.collections import CollectionsMixin
 from miqcli.constants import SUPPORTED_PROVIDERS, REQUIRED_OSP_KEYS, \
     OSP_PAYLOAD, REQUIRED_AWS_AUTO_PLACEMENT_KEYS, AWS_PAYLOAD, \
-    REQUIRED_AWS_PLACEMENT_KEYS
+    REQUIRED_AWS_PLACEMENT_KEYS, PROVISION_BATCH_SIZE, PROVISION_WORKERS
 from miqcli.decorators import client_api
-from miqcli.provider import Flavors, KeyPair, Networks, SecurityGroups,\
-    Templates, Tenant
+from miqcli.provider import Flavors, KeyPair, Networks, ResourceNotFound, \
+    SecurityGroups, Templates, Tenant
 from miqcli.query import BasicQuery
 from miqcli.utils import log, get_input_data
 
+#: errors building a payload from the user input: invalid input, resource
+#: names not found or matching several resources and failed lookups
+PAYLOAD_ERRORS = (APIException, AttributeError, ResourceNotFound, ValueError)
+
 
 class Collections(CollectionsMixin):
     """Provision requests collections."""
@@ -46,8 +55,24 @@ class Collections(CollectionsMixin):
     @click.option('--payload_file', type=str,
                   help='filename containing JSON formatted payload data for '
                        'provision request.')
+    @click.option('--manifest', type=str,
+                  help='filename containing one JSON formatted payload per '
+                       'line, a provision request is created for each.')
+    @click.option('--results', type=str,
+                  help='filename the manifest results are written to, one '
+                       'JSON object per line (default: '
+                       '<manifest>.results.jsonl).')
+    @click.option('--workers', type=click.IntRange(1, None),
+                  default=PROVISION_WORKERS,
+                  help='requests submitted concurrently for a manifest.')
+    @click.option('--batch_size', type=click.IntRange(1, None),
+                  default=PROVISION_BATCH_SIZE,
+                  help='provision requests sent by each request for a '
+                       'manifest.')
     @client_api
-    def create(self, provider, payload, payload_file):
+    def create(self, provider, payload, payload_file, manifest=None,
+               results=None, workers=PROVISION_WORKERS,
+               batch_size=PROVISION_BATCH_SIZE):
         """Create a provision request.
 
         ::
@@ -60,164 +85,341 @@ class Collections(CollectionsMixin):
         :type payload: str
         :param payload_file: file location of the payload
         :type payload_file: str
-        :return: provision request ID
-        :rtype: str
+        :param manifest: file location of the payloads, one per line
+        :type manifest: str
+        :param results: file location of the manifest results
+        :type results: str
+        :param workers: requests submitted concurrently for a manifest
+        :type workers: int
+        :param batch_size: provision requests sent by each request for a
+            manifest
+        :type batch_size: int
+        :return: provision request ID or the manifest results
+        :rtype: str or list
         """
-        # RFE: make generic as possible, remove conditional per provider
-        if provider == "OpenStack":
-            log.info("Attempt to create a provision request")
-
-            # get the data from user input
-            input_data = get_input_data(payload, payload_file)
-
-            # verify all the required keys are set
-            missing_data = []
-            for key in REQUIRED_OSP_KEYS:
-                if key not in input_data or input_data[key] is None:
-                    missing_data.append(key)
-            if missing_data:
-                log.abort("Required key(s) missing: {0}, please set it in "
-                          "the payload".format(missing_data))
-
-            # Verified data is valid, update payload w/id lookups
-            # set the email_address and vm name
-            OSP_PAYLOAD["requester"]["owner_email"] = input_data["email"]
-            OSP_PAYLOAD["vm_fields"]["vm_name"] = input_data["vm_name"]
-
-            # lookup cloud tenant resource to get the id
-            tenant = Tenant(provider, self.api)
-            OSP_PAYLOAD['vm_fields']['cloud_tenant'] = tenant.get_id(
-                input_data['tenant']
-            )
-            tenant_id = OSP_PAYLOAD['vm_fields']['cloud_tenant']
+        if manifest:
+            return self._create_from_manifest(provider, manifest, results,
+                                              workers, batch_size)
 
-            if 'floating_ip_id' in input_data:
-                OSP_PAYLOAD['vm_fields']['floating_ip_address'] = \
-                    input_data['floating_ip_id']
+        log.info("Attempt to create a provision request")
 
-            # lookup flavor resource to get the id
-            flavors = Flavors(provider, self.api)
-            OSP_PAYLOAD['vm_fields']['instance_type'] = flavors.get_id(
-                input_data['flavor'])
+        # get the data from user input
+        input_data = get_input_data(payload, payload_file)
 
-            # lookup image resource to get the id
-            templates = Templates(provider, self.api)
-            OSP_PAYLOAD['template_fields']['guid'] = templates.get_id(
-                input_data['image']
-            )
+        try:
+            _payload = self._build_payload(provider, input_data)
+        except PAYLOAD_ERRORS as e:
+            log.abort(e)
 
-            if 'security_group' in input_data and input_data['security_group']:
-                # lookup security group resource to get the id
-                sec_group = SecurityGroups(provider, self.api)
-                OSP_PAYLOAD['vm_fields']['security_groups'] = sec_group.get_id(
-                    input_data['security_group'], tenant_id
-                )
-
-            if 'key_pair' in input_data and input_data["key_pair"]:
-                # lookup key pair resource to get the id
-                key_pair = KeyPair(provider, self.api)
-                OSP_PAYLOAD['vm_fields']['guest_access_key_pair'] = \
-                    key_pair.get_id(input_data['key_pair'])
-
-            # lookup cloud network resource to get the id
-            network = Networks(provider, self.api, 'private')
-            OSP_PAYLOAD['vm_fields']['cloud_network'] = network.get_id(
-                input_data['network'], tenant_id
-            )
+        log.debug("Payload for the provisioning request: {0}".format(
+            pformat(_payload)))
+        self.req_id = self.action(_payload)
+        log.info("Provisioning request created: {0}".format(self.req_id))
+        return self.req_id
 
-            log.debug("Payload for the provisioning request: {0}".format(
-                pformat(OSP_PAYLOAD)))
-            self.req_id = self.action(OSP_PAYLOAD)
-            log.info("Provisioning request created: {0}".format(self.req_id))
-            return self.req_id
+    @staticmethod
+    def _validate(provider, input_data):
+        """Verify all the required keys are set in the user input.
 
-        # RFE: make generic as possible, remove conditional per provider
-        if provider == "Amazon":
-            log.info("Attempt to create a provision request")
+        :param provider: cloud provider
+        :type provider: str
+        :param input_data: user input
+        :type input_data: dict
+        :raises ValueError: required keys are missing
+        """
+        if provider == "OpenStack":
+            required_keys = REQUIRED_OSP_KEYS
+        elif 'auto_placement' in input_data and input_data['auto_placement']:
+            required_keys = REQUIRED_AWS_AUTO_PLACEMENT_KEYS
+        else:
+            required_keys = REQUIRED_AWS_PLACEMENT_KEYS
 
-            # get the data from user input
-            input_data = get_input_data(payload, payload_file)
+        missing_data = []
+        for key in required_keys:
+            if key not in input_data or input_data[key] is None:
+                missing_data.append(key)
+        if missing_data:
+            raise ValueError("Required key(s) missing: {0}, please set it "
+                             "in the payload".format(missing_data))
 
-            # Set Required fields
-            if 'auto_placement' in input_data and input_data['auto_placement']:
-                REQUIRED_AWS_KEYS = REQUIRED_AWS_AUTO_PLACEMENT_KEYS
-            else:
-                REQUIRED_AWS_KEYS = REQUIRED_AWS_PLACEMENT_KEYS
-            # verify all the required keys are set
-            missing_data = []
-            for key in REQUIRED_AWS_KEYS:
-                if key not in input_data or input_data[key] is None:
-                    missing_data.append(key)
-            if missing_data:
-                log.abort("Required key(s) missing: {0}, please set it in "
-                          "the payload".format(missing_data))
-
-            # Verified data is valid, update payload w/id lookups
-            # set the email_address and vm name
-            AWS_PAYLOAD["requester"]["owner_email"] = input_data["email"]
-            AWS_PAYLOAD["vm_fields"]["vm_name"] = input_data["vm_name"]
-
-            # lookup flavor resource to get the id
-            flavors = Flavors(provider, self.api)
-            AWS_PAYLOAD['vm_fields']['instance_type'] = flavors.get_id(
-                input_data['flavor'])
-
-            # lookup image resource to get the id
-            templates = Templates(provider, self.api)
-            AWS_PAYLOAD['template_fields']['guid'] = templates.get_id(
-                input_data['image']
-            )
+    def _build_payload(self, provider, input_data):
+        """Build the provision request payload from the user input.
+
+        Resource names are resolved to ids, the resolutions are cached by
+        the client api.
+
+        :param provider: cloud provider
+        :type provider: str
+        :param input_data: user input
+        :type input_data: dict
+        :return: payload
+        :rtype: dict
+        :raises ValueError: the user input is invalid
+        :raises ResourceNotFound: a resource name cannot be resolved
+        :raises AttributeError: a resource name matches several resources
+        :raises APIException: a resource lookup failed
+        """
+        self._validate(provider, input_data)
 
+        # RFE: make generic as possible, remove conditional per provider
+        if provider == "OpenStack":
+            return self._osp_payload(provider, input_data)
+        return self._aws_payload(provider, input_data)
+
+    def _osp_payload(self, provider, input_data):
+        """Build the OpenStack provision request payload.
+
+        :param provider: cloud provider
+        :type provider: str
+        :param input_data: verified user input
+        :type input_data: dict
+        :return: payload
+        :rtype: dict
+        """
+        _payload = deepcopy(OSP_PAYLOAD)
+
+        # Verified data is valid, update payload w/id lookups
+        # set the email_address and vm name
+        _payload["requester"]["owner_email"] = input_data["email"]
+        _payload["vm_fields"]["vm_name"] = input_data["vm_name"]
+
+        # lookup cloud tenant resource to get the id
+        tenant = Tenant(provider, self.api)
+        _payload['vm_fields']['cloud_tenant'] = tenant.get_id(
+            input_data['tenant']
+        )
+        tenant_id = _payload['vm_fields']['cloud_tenant']
+
+        if 'floating_ip_id' in input_data:
+            _payload['vm_fields']['floating_ip_address'] = \
+                input_data['floating_ip_id']
+
+        # lookup flavor resource to get the id
+        flavors = Flavors(provider, self.api)
+        _payload['vm_fields']['instance_type'] = flavors.get_id(
+            input_data['flavor'])
+
+        # lookup image resource to get the id
+        templates = Templates(provider, self.api)
+        _payload['template_fields']['guid'] = templates.get_id(
+            input_data['image']
+        )
+
+        if 'security_group' in input_data and input_data['security_group']:
             # lookup security group resource to get the id
-            if 'security_group' in input_data and input_data['security_group']:
-                sec_group = SecurityGroups(provider, self.api)
-                AWS_PAYLOAD['vm_fields']['security_groups'] = \
-                    sec_group.get_id(input_data['security_group'])
+            sec_group = SecurityGroups(provider, self.api)
+            _payload['vm_fields']['security_groups'] = sec_group.get_id(
+                input_data['security_group'], tenant_id
+            )
 
+        if 'key_pair' in input_data and input_data["key_pair"]:
             # lookup key pair resource to get the id
             key_pair = KeyPair(provider, self.api)
-            AWS_PAYLOAD['vm_fields']['guest_access_key_pair'] = \
+            _payload['vm_fields']['guest_access_key_pair'] = \
                 key_pair.get_id(input_data['key_pair'])
 
-            # lookup cloud network resource to get the id
-            if 'network' in input_data and input_data['network']:
-                network = Networks(provider, self.api)
-                AWS_PAYLOAD['vm_fields']['cloud_network'] = network.get_id(
-                    input_data['network']
-                )
-
-            # lookup cloud_subnets attribute from cloud network entity
-            # to get the id
-            if 'subnet' in input_data and input_data['subnet']:
-                out = network.get_attribute(
-                    AWS_PAYLOAD['vm_fields']['cloud_network'],
-                    'cloud_subnets')
-
-                # Get id for supplied Subnet
-                subnet_id = None
-                if isinstance(out, list):
-                    for att in out:
-                        if 'name' in att and att['name'] == \
-                                input_data['subnet']:
-                            subnet_id = att['id']
-                elif isinstance(out, dict):
-                    if out and 'name' in out and out['name'] == \
-                            input_data['subnet']:
-                        subnet_id = out['id']
+        # lookup cloud network resource to get the id
+        network = Networks(provider, self.api, 'private')
+        _payload['vm_fields']['cloud_network'] = network.get_id(
+            input_data['network'], tenant_id
+        )
+        return _payload
 
-                if subnet_id is None:
-                    log.abort('Cannot obtain Cloud Subnet: {0} info, please '
-                              'check setting in the payload '
-                              'is correct'.format(input_data['subnet']))
+    def _aws_payload(self, provider, input_data):
+        """Build the Amazon provision request payload.
 
-                log.info('Attribute: {0}'.format(out))
-                AWS_PAYLOAD['vm_fields']['cloud_subnet'] = subnet_id
+        :param provider: cloud provider
+        :type provider: str
+        :param input_data: verified user input
+        :type input_data: dict
+        :return: payload
+        :rtype: dict
+        """
+        _payload = deepcopy(AWS_PAYLOAD)
+
+        # Verified data is valid, update payload w/id lookups
+        # set the email_address and vm name
+        _payload["requester"]["owner_email"] = input_data["email"]
+        _payload["vm_fields"]["vm_name"] = input_data["vm_name"]
+
+        # lookup flavor resource to get the id
+        flavors = Flavors(provider, self.api)
+        _payload['vm_fields']['instance_type'] = flavors.get_id(
+            input_data['flavor'])
+
+        # lookup image resource to get the id
+        templates = Templates(provider, self.api)
+        _payload['template_fields']['guid'] = templates.get_id(
+            input_data['image']
+        )
+
+        # lookup security group resource to get the id
+        if 'security_group' in input_data and input_data['security_group']:
+            sec_group = SecurityGroups(provider, self.api)
+            _payload['vm_fields']['security_groups'] = \
+                sec_group.get_id(input_data['security_group'])
+
+        # lookup key pair resource to get the id
+        key_pair = KeyPair(provider, self.api)
+        _payload['vm_fields']['guest_access_key_pair'] = \
+            key_pair.get_id(input_data['key_pair'])
+
+        # lookup cloud network resource to get the id
+        if 'network' in input_data and input_data['network']:
+            network = Networks(provider, self.api)
+            _payload['vm_fields']['cloud_network'] = network.get_id(
+                input_data['network']
+            )
 
-            log.debug("Payload for the provisioning request: {0}".format(
-                pformat(AWS_PAYLOAD)))
-            self.req_id = self.action(AWS_PAYLOAD)
-            log.info("Provisioning request created: {0}".format(self.req_id))
-            return self.req_id
+        # lookup cloud_subnets attribute from cloud network entity
+        # to get the id
+        if 'subnet' in input_data and input_data['subnet']:
+            out = network.get_attribute(
+                _payload['vm_fields']['cloud_network'],
+                'cloud_subnets')
+
+            # Get id for supplied Subnet
+            subnet_id = None
+            if isinstance(out, list):
+                for att in out:
+                    if 'name' in att and att['name'] == \
+                            input_data['subnet']:
+                        subnet_id = att['id']
+            elif isinstance(out, dict):
+                if out and 'name' in out and out['name'] == \
+                        input_data['subnet']:
+                    subnet_id = out['id']
+
+            if subnet_id is None:
+                raise ResourceNotFound(
+                    'Cannot obtain Cloud Subnet: {0} info, please check '
+                    'setting in the payload is correct'.format(
+                        input_data['subnet']))
+
+            log.info('Attribute: {0}'.format(out))
+            _payload['vm_fields']['cloud_subnet'] = subnet_id
+        return _payload
+
+    @staticmethod
+    def _submit(action, batch):
+        """Submit a batch of provision requests with a single request.
+
+        :param action: create action
+        :type action: Action
+        :param batch: list of (line, vm_name, payload)
+        :type batch: list
+        :return: result of each payload, its request id or error
+        :rtype: list
+        """
+        try:
+            outcome = list(action(*[item[2] for item in batch]))
+        except APIException as e:
+            return [dict(line=line, vm_name=vm_name, error=str(e))
+                    for line, vm_name, _ in batch]
+
+        results = list()
+        for index, (line, vm_name, _) in enumerate(batch):
+            result = dict(line=line, vm_name=vm_name)
+            if index >= len(outcome):
+                result['error'] = 'No result sent back by the server'
+            elif isinstance(outcome[index], dict):
+                # failed, only its message was sent back
+                result['error'] = outcome[index].get('message')
+            else:
+                result['request_id'] = getattr(outcome[index], 'id')
+            results.append(result)
+        return results
+
+    def _create_from_manifest(self, provider, manifest, results, workers,
+                              batch_size=PROVISION_BATCH_SIZE):
+        """Create a provision request for each payload of the manifest.
+
+        Every line is verified before any request is submitted, the
+        payloads are then built (resource names shared by lines are
+        resolved once) and submitted in batches by a bounded pool of
+        workers. The result of each line, its request id or error, is
+        written to the results file. An invalid line does not stop the
+        other ones.
+
+        :param provider: cloud provider
+        :type provider: str
+        :param manifest: file location of the payloads, one per line
+        :type manifest: str
+        :param results: file location of the results
+        :type results: str
+        :param workers: requests submitted concurrently
+        :type workers: int
+        :param batch_size: provision requests sent by each request
+        :type batch_size: int
+        :return: results, ordered by manifest line
+        :rtype: list
+        """
+        if not os.path.isfile(manifest):
+            log.abort("File: {0} not found.".format(manifest))
+        if results is None:
+            results = os.path.splitext(manifest)[0] + '.results.jsonl'
+
+        outcome = dict()
+
+        # verify every line up front
+        entries = list()
+        with open(manifest) as f:
+            for line, content in enumerate(f, 1):
+                content = content.strip()
+                if not content or content.startswith('#'):
+                    continue
+                try:
+                    input_data = json.loads(content)
+                    if not isinstance(input_data, dict):
+                        raise ValueError('Payload is not a JSON object')
+                    self._validate(provider, input_data)
+                except ValueError as e:
+                    outcome[line] = dict(line=line, error=str(e))
+                    continue
+                entries.append((line, input_data))
+
+        log.info("Manifest {0}: {1} valid and {2} invalid payload(s)".format(
+            manifest, len(entries), len(outcome)))
+
+        # build the payloads w/id lookups
+        payloads = list()
+        for line, input_data in entries:
+            try:
+                payloads.append((line, input_data['vm_name'],
+                                 self._build_payload(provider, input_data)))
+            except PAYLOAD_ERRORS as e:
+                # recorded in the line result, the other lines carry on
+                outcome[line] = dict(line=line, vm_name=input_data['vm_name'],
+                                     error=str(e))
+
+        if payloads:
+            action = self.action
+            if action is None:
+                log.abort('Unable to create provision requests: create '
+                          'action not available.')
+
+            batches = [payloads[i:i + batch_size]
+                       for i in range(0, len(payloads), batch_size)]
+            pool = ThreadPool(min(workers, len(batches)))
+            try:
+                for batch in pool.imap_unordered(log.propagate(
+                        lambda items: self._submit(action, items)), batches):
+                    for result in batch:
+                        outcome[result['line']] = result
+            finally:
+                pool.close()
+                pool.join()
+
+        outcome = [outcome[line] for line in sorted(outcome)]
+        with open(results, 'w') as f:
+            for result in outcome:
+                f.write(json.dumps(result) + '\n')
+
+        failed = len([result for result in outcome if 'error' in result])
+        log.info("Provisioning requests created: {0}, failed: {1}, results "
+                 "written to {2}".format(len(outcome) - failed, failed,
+                                         results))
+        return outcome
 
     @client_api
     def deny(self):
@@ -244,9 +446,12 @@ class Collections(CollectionsMixin):
         """
         status = OrderedDict()
         query = BasicQuery(self.collection)
+        # only the printed attributes are requested
+        fields = ('id', 'options', 'request_state', 'status', 'message')
 
         if req_id:
-            provision_requests = query(("id", "=", req_id))
+            provision_requests = query(("id", "=", req_id),
+                                       fields=fields)
 
             if len(provision_requests) < 1:
                 log.warning('Provision request id: %s not found!' % req_id)
@@ -267,7 +472,8 @@ class Collections(CollectionsMixin):
 
             return req
         else:
-            provision_requests = query(("request_state", "!=", "finished"))
+            provision_requests = query(
+                ("request_state", "!=", "finished"), fields=fields)
 
             if len(provision_requests) < 1:
                 log.warning(' * No active provision requests at this time')
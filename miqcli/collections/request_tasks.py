@@ -43,9 +43,11 @@ class Collections(CollectionsMixin):
         """
         status = OrderedDict()
         query = BasicQuery(self.collection)
+        # only the printed attributes are requested
+        fields = ('id', 'description', 'state', 'status', 'message')
 
         if req_id:
-            requests_tasks = query(("id", "=", req_id))
+            requests_tasks = query(("id", "=", req_id), fields=fields)
 
             if len(requests_tasks) < 1:
                 log.warning('Request id: %s not found!' % req_id)
@@ -66,7 +68,8 @@ class Collections(CollectionsMixin):
 
             return req
         else:
-            requests_tasks = query(("state", "!=", "finished"))
+            requests_tasks = query(("state", "!=", "finished"),
+                                   fields=fields)
 
             if len(requests_tasks) < 1:
                 log.warning(' * No active requests tasks at this time')
@@ -46,9 +46,11 @@ class Collections(CollectionsMixin):
         """
         status = OrderedDict()
         query = BasicQuery(self.collection)
+        # only the printed attributes are requested
+        fields = ('id', 'name', 'state', 'status', 'message')
         if task_id:
 
-            tasklist = query(("id", "=", task_id))
+            tasklist = query(("id", "=", task_id), fields=fields)
 
             if len(tasklist) < 1:
                 log.warning('Provision request id: %s not found!' % task_id)
@@ -69,7 +71,8 @@ class Collections(CollectionsMixin):
 
             return task
         else:
-            task_list = query(("state", "!=", "Finished"))
+            task_list = query(("state", "!=", "Finished"),
+                              fields=fields)
 
             if len(task_list) < 1:
                 log.warning(' * No active tasks at this time')
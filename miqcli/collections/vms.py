@@ -17,6 +17,7 @@
 import click
 from manageiq_client.api import APIException
 from miqcli.collections import CollectionsMixin
+from miqcli.constants import BULK_BATCH_SIZE
 from miqcli.decorators import client_api
 from miqcli.query import AdvancedQuery
 from miqcli.query import BasicQuery
@@ -27,25 +28,9 @@ from miqcli.utils import log
 class Collections(CollectionsMixin):
     """Virtual machines collections."""
 
-    @click.option('--by_id', type=bool, default=False,
-                  help='name given as ID of vm, all other options except '
-                  '--attr are ignored')
-    @click.option('--attr', type=str, default='',
-                  help='attribute of a vm(s)', multiple=True)
-    @click.option('--provider', type=str, default='',
-                  help='provider of an vm(s)')
-    @click.option('--vendor', type=str, default='',
-                  help='vendor of an vm(s)')
-    @click.option('--vtype', type=str, default='',
-                  help='type of an vm(s) - ex. "Openstack", "Amazon"...')
-    @click.argument('vm_name', metavar="VM_NAME", type=str, default='')
-    @client_api
-    def query(self, vm_name, provider=None, vendor=None,
-              vtype=None, attr=None, by_id=False):
-        """Query vms.
-
-        ::
-        Allows querying vms based on name, provider and attributes
+    def _find(self, vm_name, provider=None, vendor=None, vtype=None,
+              attr=None, by_id=False, fields=None):
+        """Return the vms matching the options.
 
         :param vm_name: name of the vm
         :type vm_name: str
@@ -59,10 +44,12 @@ class Collections(CollectionsMixin):
         :type attr: tuple
         :param by_id: name is vm id
         :type by_id: bool
-        :return: vm object or list of vm objects
+        :param fields: only request these attributes (and id, attr), None
+            for all of them
+        :type fields: tuple
+        :return: generator of vms and the message when none is found
+        :rtype: tuple
         """
-        vms = None
-
         # Query by ID
         if by_id:
             # ID given in name
@@ -72,13 +59,9 @@ class Collections(CollectionsMixin):
 
                 qs_by_id = ("id", "=", vm_name)
                 query = BasicQuery(self.collection)
-                vms = query(qs_by_id, attr)
-
-                if len(vms) < 1:
-                    log.abort(
-                        'Cannot find Vm with ID:%s in %s' %
-                        (vm_name,
-                         self.collection.name))
+                vms = query.iter(qs_by_id, attr, fields)
+                not_found = 'Cannot find Vm with ID:%s in %s' % (
+                    vm_name, self.collection.name)
 
             # Error no ID given
             else:
@@ -106,67 +89,72 @@ class Collections(CollectionsMixin):
                 if len(qs) == 1:
                     # Name only
                     query = BasicQuery(self.collection)
-                    vms = query(qs[0], attr)
+                    vms = query.iter(qs[0], attr, fields)
                 else:
                     # Mix of various options and name
                     query = AdvancedQuery(self.collection)
-                    vms = query(qs, attr)
-
-                if len(vms) < 1:
-                    log.abort('No Vm(s) found for given parameters')
+                    vms = query.iter(qs, attr, fields)
+                not_found = 'No Vm(s) found for given parameters'
 
             # general query on all vms
             else:
+                query = BasicQuery(self.collection)
+                vms = query.iter(None, attr, fields)
+                not_found = 'No vm(s) found for given parameters'
 
-                # return vms that have the attribute passed set
-                if attr:
-                    # scrub attr of base attributes
-                    opt_lists = self.collection.options()
-                    att_list = list(attr)
-                    for att in att_list:
-                        if att in opt_lists['attributes']:
-                            att_list.remove(att)
-                    clean_attr = tuple(att_list)
+        return vms, not_found
 
-                    vms = self.collection.all_include_attributes(clean_attr)
+    @click.option('--by_id', type=bool, default=False,
+                  help='name given as ID of vm, all other options except '
+                  '--attr are ignored')
+    @click.option('--attr', type=str, default='',
+                  help='attribute of a vm(s)', multiple=True)
+    @click.option('--provider', type=str, default='',
+                  help='provider of an vm(s)')
+    @click.option('--vendor', type=str, default='',
+                  help='vendor of an vm(s)')
+    @click.option('--vtype', type=str, default='',
+                  help='type of an vm(s) - ex. "Openstack", "Amazon"...')
+    @click.argument('vm_name', metavar="VM_NAME", type=str, default='')
+    @client_api
+    def query(self, vm_name, provider=None, vendor=None,
+              vtype=None, attr=None, by_id=False):
+        """Query vms.
 
-                # attribute not set, pass back all vms w/basic info
-                else:
-                    vms = self.collection.all
-
-        if vms:
-            log.info('-' * 50)
-            log.info('Vm Info'.center(50))
-            log.info('-' * 50)
-
-            debug = click.get_current_context().find_root().params['verbose']
-            for e in vms:
-                log.info(' * ID: %s' % e['id'])
-                log.info(' * NAME: %s' % e['name'])
-
-                if debug:
-                    for k, v in e['_data'].items():
-                        if k == "id" or k == "name" or k in attr:
-                            continue
-                        try:
-                            log.debug(' * %s: %s' % (k.upper(), v))
-                        except AttributeError:
-                            log.debug(' * %s: ' % k.upper())
-
-                if attr:
-                    for a in attr:
-                        try:
-                            log.info(' * %s: %s' % (a.upper(), e[a]))
-                        except AttributeError:
-                            log.info(' * %s: ' % a.upper())
-                log.info('-' * 50)
-
-            if len(vms) == 1:
-                return vms[0]
-            else:
-                return vms
+        ::
+        Allows querying vms based on name, provider and attributes
+
+        :param vm_name: name of the vm
+        :type vm_name: str
+        :param provider: name of provider
+        :type provider: str
+        :param vendor: name of vendor
+        :type vendor: str
+        :param vtype: type of vm - "Openstack" or "Amazon"
+        :type vtype: str
+        :param attr: attribute
+        :type attr: tuple
+        :param by_id: name is vm id
+        :type by_id: bool
+        :return: vm object or list of vm objects
+        """
+        # only the printed attributes are requested unless verbose
+        debug = self.verbose
+        fields = None if debug else ('id', 'name')
+
+        vms, not_found = self._find(vm_name, provider, vendor, vtype, attr,
+                                    by_id, fields)
+
+        # print the resources as the query pages are received, run by the
+        # cli they are not kept (see CollectionsMixin._show)
+        found, count = self._show(vms, 'Vm Info', attr, debug)
+        if not count:
+            log.abort(not_found)
+        elif count == 1:
+            return found[0]
         else:
-            log.abort('No vm(s) found for given parameters')
+            # several matched, run by the cli only the first one is kept
+            return found
 
     @client_api
     def edit(self):
@@ -266,14 +254,24 @@ class Collections(CollectionsMixin):
                   help='vendor of an vm(s)')
     @click.option('--vtype', type=str, default='',
                   help='type of an vm(s) - ex. "Openstack", "Amazon"...')
+    @click.option('--all_matching', is_flag=True, default=False,
+                  help='delete all the vms matching the options')
+    @click.option('--batch_size', type=int, default=BULK_BATCH_SIZE,
+                  help='vms deleted by each request with --all_matching')
+    @click.option('--wait', is_flag=True, default=False,
+                  help='wait for the tasks deleting the vms to finish with '
+                       '--all_matching')
     @click.argument('vm_name', metavar='VM_NAME', type=str, default='')
     @client_api
     def delete(self, vm_name, provider=None, vendor=None,
-               vtype=None, by_id=False):
+               vtype=None, by_id=False, all_matching=False,
+               batch_size=BULK_BATCH_SIZE, wait=False):
         """Delete.
 
         ::
-        Delete the vm with the provided options.
+        Delete the vm with the provided options. With all_matching, every
+        vm matching the options is deleted, the task created for each one
+        is reported.
 
         :param vm_name: name of the vm
         :type vm_name: str
@@ -285,10 +283,27 @@ class Collections(CollectionsMixin):
         :type vtype: str
         :param by_id: name is vm id
         :type by_id: bool
-        :return: id of a task that will delete the vm
-        :rtype: int
+        :param all_matching: delete all the matching vms
+        :type all_matching: bool
+        :param batch_size: vms deleted by each request
+        :type batch_size: int
+        :param wait: wait for the tasks to finish
+        :type wait: bool
+        :return: id of a task that will delete the vm, with all_matching
+            the result of each vm
+        :rtype: int|list
         """
-        if vm_name:
+        if all_matching:
+            if not (vm_name or provider or vendor or vtype):
+                log.abort('Set a vm or options matching the vms to be '
+                          'deleted.')
+            vms, not_found = self._find(vm_name, provider, vendor, vtype,
+                                        by_id=by_id, fields=('name',))
+            vms = list(vms)
+            if not vms:
+                log.abort(not_found)
+            return self._bulk_action(vms, batch_size, wait=wait)
+        elif vm_name:
             vm = self.query(vm_name, provider, vendor,
                             vtype, by_id=by_id)
             if vm and type(vm) is list:
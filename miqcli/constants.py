@@ -17,7 +17,6 @@
 miqcli.constants values will differ from installation to installation.
 """
 import os
-import pkg_resources
 
 import click
 
@@ -25,17 +24,18 @@ import click
 #: name of miqcli package
 PACKAGE = 'miqcli'
 
-try:
-    #: Installed version of miqcli
-    _miqcli_distribution = pkg_resources.get_distribution(PACKAGE)
-    VERSION = str(_miqcli_distribution.parsed_version)
-except pkg_resources.DistributionNotFound:
-    # This should be very unlikely, as it means this module is being
-    # imported without the miqcli package being installed
-    VERSION = '0.0.0dev1'
+#: version reported when miqcli is not installed, see
+#: :func:`miqcli.utils.get_version` for the installed version
+DEV_VERSION = '0.0.0dev1'
 
 #: base URL of PyPI
-PYPI = 'https://pypi.python.org/pypi'
+PYPI = 'https://pypi.org/pypi'
+
+#: lifetime (seconds) of the latest released version cached by --version
+VERSION_CHECK_TTL = 86400
+
+#: seconds to wait for PyPI to tell the latest released version
+VERSION_CHECK_TIMEOUT = 2
 
 #: current filesystem root of miqcli source
 PROJECT_ROOT = os.path.dirname(__file__)
@@ -89,9 +89,86 @@ REQUIRED_AWS_PLACEMENT_KEYS = ["email", "image", "flavor", "vm_name",
 
 OPTIONAL_AWS_KEYS = ["network", "subnet", "key_pair", "security_group"]
 
+#: requests submitted concurrently from a provision manifest
+PROVISION_WORKERS = 4
+
+#: provision requests sent by each request from a provision manifest
+PROVISION_BATCH_SIZE = 50
+
+#: resources sent by each request of a bulk action (terminate, delete)
+BULK_BATCH_SIZE = 100
+
+#: requests of a bulk action submitted concurrently
+BULK_WORKERS = 4
+
 #: token file used to authenticate into ManageIQ
 TOKENFILE = os.path.join(os.path.expanduser('~'), ".miqcli/token")
 
+#: default lifetime (seconds) of a ManageIQ token, used when the server
+#: does not tell the token ttl
+TOKEN_TTL = 600
+
+#: maximum connections kept alive to the server by the http session
+HTTP_POOL_SIZE = 10
+
+#: seconds to wait for a connection to the server to be established
+HTTP_CONNECT_TIMEOUT = 10
+
+#: seconds to wait for the server to send a response
+HTTP_READ_TIMEOUT = 120
+
+#: number of collection resources requested per page by queries
+QUERY_PAGE_SIZE = 1000
+
+#: seconds between the first polls of watched requests
+WATCH_INTERVAL = 2
+
+#: maximum seconds between the polls of watched requests
+WATCH_MAX_INTERVAL = 60
+
+#: growth of the seconds between polls while no watched request changes
+WATCH_BACKOFF = 1.5
+
+#: random part (fraction) of the seconds between polls, spreads the polls
+#: of concurrent watchers
+WATCH_JITTER = 0.2
+
+#: watched requests polled by each query
+WATCH_CHUNK_SIZE = 100
+
+#: seconds log messages are left in the standard output buffer at most,
+#: checked when logging
+LOG_FLUSH_INTERVAL = 0.2
+
+#: state attribute and terminal states of the collections watched
+WATCHED_STATES = {
+    'automation_requests': ('request_state', ('finished',)),
+    'provision_requests': ('request_state', ('finished',)),
+    'request_tasks': ('state', ('finished',)),
+    'tasks': ('state', ('finished',))
+}
+
+#: unix domain socket the miqcli daemon listens on
+DAEMON_SOCKET = os.path.join(os.path.expanduser('~'), ".miqcli/daemon.sock")
+
+#: directory holding the miqcli on-disk caches
+CACHE_DIR = os.path.join(os.path.expanduser('~'), ".miqcli/cache")
+
+#: lifetime (seconds) of the cached /api entry point document
+API_CACHE_TTL = 3600
+
+#: lifetime (seconds) of the cached provider types
+PROVIDER_CACHE_TTL = 600
+
+#: lifetime (seconds) of the cached resource name to id resolutions
+RESOLVE_CACHE_TTL = 600
+
+#: maximum resource name to id resolutions kept in memory
+RESOLVE_CACHE_SIZE = 1000
+
+#: seconds before the token expiry at which it is no longer trusted as fresh
+TOKEN_EXPIRY_MARGIN = 30
+
 OSP_PAYLOAD = {
     "template_fields": {
         "guid": None
@@ -176,5 +253,21 @@ GLOBAL_PARAMS = [
         param_decls=['--verbose'],
         is_flag=True,
         help='Verbose mode.'
+    ),
+    click.Option(
+        param_decls=['--log_format'],
+        type=click.Choice(['text', 'json']),
+        help='Log messages as text (default) or as JSON lines.'
+    ),
+    click.Option(
+        param_decls=['--trace'],
+        is_flag=True,
+        help='Print a summary of the http calls made.'
+    ),
+    click.Option(
+        param_decls=['--trace_file'],
+        type=click.Path(dir_okay=False, writable=True),
+        help='Write the http calls made to a Chrome trace (json) file, '
+             'implies --trace.'
     )
 ]
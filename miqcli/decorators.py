@@ -18,7 +18,8 @@
 
 from functools import wraps
 
-from miqcli.utils import get_client_api_pointer
+from miqcli.instrumentation import calling
+from miqcli.utils import get_client_api_pointer, log
 
 __all__ = ['client_api']
 
@@ -45,25 +46,30 @@ def client_api(method):
         :type kwargs: dict
         :return: The invoked collection method
         """
-        # set the api pointer attribute
-        setattr(args[0], 'api', get_client_api_pointer())
+        # set the api pointer attribute, collections bound to a client api
+        # object do not look it up in the click context
+        _api = getattr(args[0], '_bound_api', None)
+        setattr(args[0], 'api', _api or get_client_api_pointer())
         _api = getattr(args[0], 'api')
 
-        # set the api.client.collection pointer attribute
-        setattr(args[0], 'collection', getattr(
-            _api.client.collections, args[0].__module__.split('.')[-1]))
-        _collection = getattr(args[0], 'collection')
+        # set the api.client.collection pointer attribute, the memoized
+        # collection resources are dropped when the collection changes
+        _collection = getattr(
+            _api.client.collections, args[0].__module__.split('.')[-1])
+        if getattr(args[0], 'collection', None) is not _collection:
+            setattr(args[0], '_all', None)
+        setattr(args[0], 'collection', _collection)
 
-        # set the api.client.collection.all attribute
-        setattr(args[0], 'all', _collection.all)
+        # set the api.client.collection.action name, the action itself is
+        # looked up when the collection method accesses it
+        _action_name = getattr(args[0], '_action_name', None)
+        setattr(args[0], '_action_name', method.__name__)
 
-        # set the api.client.collection.action pointer attribute
         try:
-            setattr(args[0], 'action', getattr(
-                _collection.action, method.__name__))
-        except (AttributeError, RuntimeError):
-            # action does not exist
-            setattr(args[0], 'action', None)
-
-        return method(*args, **kwargs)
+            with log.verbosity(getattr(args[0], '_bound_verbose', None)), \
+                    calling('{0}.{1}'.format(
+                        args[0].__module__.split('.')[-1], method.__name__)):
+                return method(*args, **kwargs)
+        finally:
+            setattr(args[0], '_action_name', _action_name)
     return func
@@ -0,0 +1,356 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Filters module contains the query filter expression tree.
+
+Filter expressions are built from terms (name, operator, value) joined
+with AND, OR and NOT. An expression compiles to the ``filter[]``
+parameters of the REST API or to ``manageiq_client`` Q objects.
+
+The REST API has no grouping: the ``filter[]`` terms are ANDed and the
+result is ORed with each ``or`` term. The compiler rewrites the
+expression into that shape, NOT is pushed down to the terms by negating
+their operator and duplicated operands of an AND or OR are dropped.
+Expressions of another shape (e.g. an OR group within an AND) raise
+ValueError. Compiled plans are memoized by the expression structure.
+"""
+
+from manageiq_client.filters import OPERATORS, Q, gen_filter
+
+__all__ = ['Filter', 'Term', 'And', 'Or', 'Not', 'parse', 'compile_filter',
+           'compile_q']
+
+#: operator of the negated term
+NEGATED_OPERATORS = {
+    '=': '!=',
+    '!=': '=',
+    '<': '>=',
+    '>=': '<',
+    '>': '<=',
+    '<=': '>'
+}
+
+#: maximum number of memoized compiled plans
+PLAN_CACHE_SIZE = 256
+
+_plans = dict()
+
+
+class Filter(object):
+    """Base filter expression.
+
+    Expressions are combined with the ``&``, ``|`` and ``~`` operators.
+    """
+
+    @property
+    def key(self):
+        """Expression structure property.
+
+        :return: hashable expression structure
+        :rtype: tuple
+        """
+        raise NotImplementedError
+
+    def negate(self):
+        """Return the negated expression, NOT pushed down to the terms.
+
+        :return: negated expression
+        :rtype: Filter
+        """
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+    def __eq__(self, other):
+        return isinstance(other, Filter) and self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return '{0}{1}'.format(self.__class__.__name__, self.key[1:])
+
+
+class Term(Filter):
+    """Filter term comparing an attribute with a value."""
+
+    def __init__(self, name, op, value):
+        """Constructor.
+
+        :param name: attribute name
+        :type name: str
+        :param op: operator
+        :type op: str
+        :param value: value compared with
+        """
+        if op not in OPERATORS:
+            raise ValueError('Invalid operator {0}'.format(op))
+        self.name = name
+        self.op = op
+        self.value = value
+
+    @property
+    def key(self):
+        return 'term', self.name, self.op, self.value
+
+    def negate(self):
+        return Term(self.name, NEGATED_OPERATORS[self.op], self.value)
+
+
+class _Group(Filter):
+    """Filter expression joining its operands."""
+
+    def __init__(self, *operands):
+        """Constructor.
+
+        :param operands: filter expressions
+        :type operands: Filter
+        """
+        if not operands:
+            raise ValueError('{0} requires operands'.format(
+                self.__class__.__name__))
+        self.operands = tuple(operands)
+
+    @property
+    def key(self):
+        return (self.__class__.__name__.lower(),) + tuple(
+            operand.key for operand in self.operands)
+
+
+class And(_Group):
+    """Filter expression matching when all operands match."""
+
+    def negate(self):
+        return Or(*[operand.negate() for operand in self.operands])
+
+
+class Or(_Group):
+    """Filter expression matching when any operand matches."""
+
+    def negate(self):
+        return And(*[operand.negate() for operand in self.operands])
+
+
+class Not(Filter):
+    """Filter expression matching when its operand does not match."""
+
+    def __init__(self, operand):
+        """Constructor.
+
+        :param operand: filter expression
+        :type operand: Filter
+        """
+        self.operand = operand
+
+    @property
+    def key(self):
+        return 'not', self.operand.key
+
+    def negate(self):
+        return self.operand
+
+
+def parse(query):
+    """Build the filter expression for a query.
+
+    Queries are either a (name, operator, value) tuple or a list of
+    tuples joined by ``'&'`` or ``'|'``, evaluated left to right. A
+    tuple preceded by ``'!'`` is negated. Filter expressions are
+    accepted anywhere a tuple is. The given query is left unchanged.
+
+    :param query: query
+    :type query: tuple or list
+    :return: filter expression
+    :rtype: Filter
+    """
+    if isinstance(query, Filter):
+        return query
+    if isinstance(query, tuple):
+        if len(query) != 3:
+            raise ValueError('Query must contain three indexes (name, '
+                             'operator, value)')
+        return Term(*query)
+
+    expression, join, negate = None, None, False
+    for item in query:
+        if item == '!':
+            negate = not negate
+            continue
+        if item in ('&', '|'):
+            if expression is None or join is not None:
+                raise ValueError('Misplaced {0} in query'.format(item))
+            join = item
+            continue
+
+        operand = parse(item)
+        if negate:
+            operand, negate = Not(operand), False
+        if expression is None:
+            expression = operand
+        elif join is None:
+            raise ValueError('Missing & or | in query')
+        else:
+            expression = And(expression, operand) if join == '&' else \
+                Or(expression, operand)
+        join = None
+
+    if expression is None or join is not None or negate:
+        raise ValueError('Incomplete query')
+    return expression
+
+
+def _normalize(expression):
+    """Rewrite the expression into terms, n-ary And and Or.
+
+    NOT is pushed down to the terms, nested groups of the same kind are
+    flattened and duplicated operands are dropped.
+
+    :param expression: filter expression
+    :type expression: Filter
+    :return: normalized expression
+    :rtype: Filter
+    """
+    if isinstance(expression, Not):
+        return _normalize(expression.operand.negate())
+    if isinstance(expression, Term):
+        return expression
+
+    operands, seen = list(), set()
+    for operand in expression.operands:
+        operand = _normalize(operand)
+        if isinstance(operand, expression.__class__):
+            flat = operand.operands
+        else:
+            flat = (operand,)
+        for item in flat:
+            if item.key not in seen:
+                seen.add(item.key)
+                operands.append(item)
+
+    if len(operands) == 1:
+        return operands[0]
+    return expression.__class__(*operands)
+
+
+def _terms(expression):
+    """Return the terms of a term or of an AND of terms, None otherwise.
+
+    :param expression: normalized filter expression
+    :type expression: Filter
+    :return: terms
+    :rtype: list
+    """
+    if isinstance(expression, Term):
+        return [expression]
+    if isinstance(expression, And) and all(
+            isinstance(op, Term) for op in expression.operands):
+        return list(expression.operands)
+    return None
+
+
+def _chain(expression):
+    """Return the ``filter[]`` chain for a normalized expression.
+
+    The REST API ANDs the plain terms of the chain and ORs the result with
+    each ``or`` term, the expression must be an AND of terms ORed with
+    terms.
+
+    :param expression: normalized filter expression
+    :type expression: Filter
+    :return: list of (is_or, term)
+    :rtype: list
+    """
+    terms = _terms(expression)
+    if terms is not None:
+        return [(False, term) for term in terms]
+
+    if isinstance(expression, Or):
+        terms = [op for op in expression.operands if isinstance(op, Term)]
+        groups = [op for op in expression.operands
+                  if not isinstance(op, Term)]
+        if not groups:
+            groups, terms = terms[:1], terms[1:]
+        if len(groups) == 1 and _terms(groups[0]) is not None:
+            return [(False, term) for term in _terms(groups[0])] + \
+                [(True, term) for term in terms]
+
+    raise ValueError('Filter {0} cannot be expressed by filter[], which '
+                     'only ORs terms with an AND of terms'.format(
+                         expression))
+
+
+def _plan(expression):
+    """Return the memoized chain for the expression.
+
+    :param expression: filter expression
+    :type expression: Filter
+    :return: list of (is_or, term)
+    :rtype: list
+    """
+    key = expression.key
+    try:
+        return _plans[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # unhashable values, nothing to memoize
+        return _chain(_normalize(expression))
+
+    plan = _chain(_normalize(expression))
+    if len(_plans) >= PLAN_CACHE_SIZE:
+        _plans.clear()
+    _plans[key] = plan
+    return plan
+
+
+def compile_filter(query):
+    """Compile the query to ``filter[]`` parameters.
+
+    :param query: query or filter expression, see :func:`parse`
+    :type query: tuple, list or Filter
+    :return: filters
+    :rtype: list
+    """
+    return [gen_filter(term.name, term.op, term.value, is_or)
+            for is_or, term in _plan(parse(query))]
+
+
+def compile_q(query):
+    """Compile the query to a ``manageiq_client`` Q object.
+
+    :param query: query or filter expression, see :func:`parse`
+    :type query: tuple, list or Filter
+    :return: Q object
+    :rtype: Q
+    """
+    result = None
+    for is_or, term in _plan(parse(query)):
+        q = Q(term.name, term.op, term.value)
+        if result is None:
+            result = q
+        else:
+            result = result | q if is_or else result & q
+    return result
@@ -0,0 +1,263 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Instrumentation module measures the requests sent to the server.
+
+:class:`RoundTrips` counts the requests, :class:`Tracer` records each of
+them along with the collection method and the miqcli function sending it.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+from contextlib import contextmanager
+
+import click
+
+from miqcli.utils import log
+
+__all__ = ['Call', 'RoundTrips', 'Tracer', 'calling']
+
+#: http call recorded by the tracer, start is the epoch time the request
+#: was sent at, latency the seconds until the response headers arrived
+Call = namedtuple('Call', ['method', 'url', 'status', 'bytes_sent',
+                           'bytes_received', 'start', 'latency', 'caller',
+                           'site', 'thread'])
+
+#: miqcli functions only passing the requests along, never a call site
+TRANSPORT_FRAMES = {('miqcli.api', 'send'),
+                    ('miqcli.api', '_sending_request')}
+
+# collection methods running in each thread
+_local = threading.local()
+
+
+@contextmanager
+def calling(name):
+    """Attribute the http calls made in the block to a collection method.
+
+    :param name: collection method (i.e. vms.query)
+    :type name: str
+    """
+    stack = _local.__dict__.setdefault('callers', [])
+    stack.append(name)
+    try:
+        yield
+    finally:
+        stack.pop()
+
+
+def _caller():
+    """Return the collection method running in this thread."""
+    stack = getattr(_local, 'callers', None)
+    return stack[-1] if stack else None
+
+
+def _site():
+    """Return the innermost miqcli function sending the current request.
+
+    :return: module.class.function, without the miqcli prefix
+    :rtype: str
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        name = frame.f_code.co_name
+        if module.startswith('miqcli.') and module != __name__ and \
+                (module, name) not in TRANSPORT_FRAMES:
+            parts = [module[len('miqcli.'):], name]
+            if 'self' in frame.f_locals:
+                parts.insert(1, type(frame.f_locals['self']).__name__)
+            return '.'.join(parts)
+        frame = frame.f_back
+    return None
+
+
+def _size(num):
+    """Return the byte count in a human readable form."""
+    if num < 1024:
+        return '{0}B'.format(num)
+    for unit in ('kB', 'MB'):
+        num /= 1024.0
+        if num < 1024 or unit == 'MB':
+            return '{0:.1f}{1}'.format(num, unit)
+
+
+class RoundTrips(object):
+    """Round trips counter.
+
+    Registered as a response hook of a http session, it counts every
+    response received from the server in total and by http method.
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self._lock = threading.Lock()
+        self._methods = Counter()
+
+    def __call__(self, response, *args, **kwargs):
+        """Count the response, requests response hook.
+
+        :param response: http response
+        :type response: requests.Response
+        :return: the response unchanged
+        :rtype: requests.Response
+        """
+        with self._lock:
+            self._methods[response.request.method] += 1
+        return response
+
+    @property
+    def count(self):
+        """Round trips count property.
+
+        :return: round trips count
+        :rtype: int
+        """
+        return sum(self._methods.values())
+
+    def by_method(self, method):
+        """Return the round trips count for the http method.
+
+        :param method: http method (i.e. GET, POST)
+        :type method: str
+        :return: round trips count
+        :rtype: int
+        """
+        return self._methods[method.upper()]
+
+    def reset(self):
+        """Reset the counters."""
+        with self._lock:
+            self._methods.clear()
+
+
+class Tracer(object):
+    """Http calls tracer.
+
+    Registered as a response hook of a http session, it records every
+    call: method, url, status, bytes, latency, the collection method
+    making it (see :func:`calling`) and the miqcli function sending it.
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self._lock = threading.Lock()
+        self.calls = list()
+
+    def __call__(self, response, *args, **kwargs):
+        """Record the call, requests response hook.
+
+        :param response: http response
+        :type response: requests.Response
+        :return: the response unchanged
+        :rtype: requests.Response
+        """
+        latency = response.elapsed.total_seconds()
+        request = response.request
+        call = Call(request.method, request.url, response.status_code,
+                    len(request.body or b''), len(response.content),
+                    time.time() - latency, latency, _caller(), _site(),
+                    threading.current_thread().ident)
+        with self._lock:
+            self.calls.append(call)
+        return response
+
+    def reset(self):
+        """Forget the recorded calls."""
+        with self._lock:
+            del self.calls[:]
+
+    def summary(self):
+        """Return the calls grouped by collection method and call site.
+
+        :return: rows of caller, site, calls, bytes sent, bytes received,
+            total and maximum latency, in the order of the first call
+        :rtype: list
+        """
+        rows = OrderedDict()
+        for call in self.calls:
+            key = (call.caller, call.site)
+            row = rows.setdefault(key, [call.caller, call.site, 0, 0, 0,
+                                        0.0, 0.0])
+            row[2] += 1
+            row[3] += call.bytes_sent
+            row[4] += call.bytes_received
+            row[5] += call.latency
+            row[6] = max(row[6], call.latency)
+        return [tuple(row) for row in rows.values()]
+
+    def table(self):
+        """Return the summary of the calls as a text table.
+
+        :return: table
+        :rtype: str
+        """
+        lines = ['HTTP trace: {0} calls, {1} sent, {2} received, '
+                 '{3:.3f}s'.format(
+                     len(self.calls),
+                     _size(sum(c.bytes_sent for c in self.calls)),
+                     _size(sum(c.bytes_received for c in self.calls)),
+                     sum(c.latency for c in self.calls)),
+                 '{0:>6} {1:>9} {2:>9} {3:>8} {4:>8}  {5}'.format(
+                     'calls', 'sent', 'received', 'total', 'max',
+                     'caller / site')]
+        for caller, site, calls, sent, received, total, top in \
+                self.summary():
+            lines.append('{0:>6} {1:>9} {2:>9} {3:>7.3f}s {4:>7.3f}s  '
+                         '{5} / {6}'.format(calls, _size(sent),
+                                            _size(received), total, top,
+                                            caller or '-', site or '-'))
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        """Return the calls in the Chrome trace event format.
+
+        The events can be loaded in chrome://tracing, the call details are
+        in the event arguments.
+
+        :return: trace
+        :rtype: dict
+        """
+        events = list()
+        for call in self.calls:
+            events.append({
+                'name': '{0} {1}'.format(call.method, call.url),
+                'cat': call.caller or 'http',
+                'ph': 'X',
+                'ts': int(call.start * 1e6),
+                'dur': int(call.latency * 1e6),
+                'pid': os.getpid(),
+                'tid': call.thread,
+                'args': call._asdict()})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def report(self, trace_file=None):
+        """Print the summary of the calls, then forget them.
+
+        :param trace_file: file the Chrome trace (json) is written to
+        :type trace_file: str
+        """
+        # the summary follows the output of the command
+        log.flush()
+        click.echo(self.table(), err=True)
+        if trace_file:
+            with open(trace_file, 'w') as fp:
+                json.dump(self.chrome_trace(), fp, indent=2)
+        self.reset()
@@ -16,11 +16,111 @@
 
 from manageiq_client.api import APIException
 
-from miqcli.query import AdvancedQuery
+from miqcli.query import AdvancedQuery, BasicQuery
 from miqcli.utils import log
 
-__all__ = ['Provider', 'Flavors', 'Templates', 'SecurityGroups', 'KeyPair',
-           'Tenant', 'Networks', 'Instances', 'Vms']
+__all__ = ['Provider', 'ProviderTypeRegistry', 'ResourceNotFound', 'Flavors',
+           'Templates', 'SecurityGroups', 'KeyPair', 'Tenant', 'Networks',
+           'Instances', 'Vms']
+
+
+class ResourceNotFound(LookupError):
+    """Raised when a provider resource name cannot be found."""
+
+
+class ProviderTypeRegistry(object):
+    """Provider types registry.
+
+    The types of the providers known by the server (i.e.
+    ManageIQ::Providers::Openstack::CloudManager) are listed once and
+    shared by all provider components of a client api. They can be
+    persisted in a cache, keyed by the server url.
+    """
+
+    def __init__(self, api, cache=None, key=None):
+        """Constructor.
+
+        :param api: client api pointer
+        :type api: class
+        :param cache: cache persisting the provider types
+        :type cache: FileCache
+        :param key: cache key, the server url
+        :type key: str
+        """
+        self._api = api
+        self._cache = cache
+        self._key = key
+        self._types = None
+        self._cached = False
+        self._managers = dict()
+
+    @property
+    def types(self):
+        """Provider types property.
+
+        :return: provider types, empty when they cannot be listed
+        :rtype: list
+        """
+        if self._types is None and self._cache is not None:
+            self._types = self._cache.get(self._key)
+            self._cached = self._types is not None
+
+        if self._types is None:
+            query = BasicQuery(self._api.client.collections.providers)
+            try:
+                types = sorted(set(
+                    res['type'] for page in query._pages([], fields=('type',))
+                    for res in page))
+            except APIException as e:
+                # listed again by the next lookup, a failure is not cached
+                log.error('Unable to list the provider types: {0}'.format(e))
+                return list()
+            self._types = types
+            if self._cache is not None:
+                self._cache.set(self._key, self._types)
+        return self._types
+
+    def managers(self, name):
+        """Return the cloud and network manager types of a provider.
+
+        :param name: provider name (i.e. OpenStack, Amazon)
+        :type name: str
+        :return: cloud type and network type, empty when unknown
+        :rtype: tuple
+        """
+        if name not in self._managers:
+            managers = self._match(name)
+            if not any(managers) and self._cached:
+                # the provider may have been added since types were cached
+                self._types, self._cached = None, False
+                self._cache.delete(self._key)
+                managers = self._match(name)
+            self._managers[name] = managers
+        return self._managers[name]
+
+    def _match(self, name):
+        """Return the cloud and network manager types of a provider.
+
+        :param name: provider name
+        :type name: str
+        :return: cloud type and network type
+        :rtype: tuple
+        """
+        cloud_type, network_type = '', ''
+        for _type in self.types:
+            if name.lower().title() in _type:
+                if 'cloud' in _type.lower():
+                    cloud_type = _type
+                elif 'network' in _type.lower():
+                    network_type = _type
+        return cloud_type, network_type
+
+    def clear(self):
+        """Forget the provider types, they are listed again when needed."""
+        self._types, self._cached = None, False
+        self._managers = dict()
+        if self._cache is not None:
+            self._cache.delete(self._key)
 
 
 class Provider(object):
@@ -49,12 +149,8 @@ class Provider(object):
         self._query = AdvancedQuery(self._collection)
 
         # lets first save the provider types for cloud & network
-        for res in self._api.client.collections.providers.all:
-            if self._name.lower().title() in res.type:
-                if 'cloud' in res.type.lower():
-                    self._cloud_type = res.type
-                elif 'network' in res.type.lower():
-                    self._network_type = res.type
+        self._cloud_type, self._network_type = \
+            self._api.provider_types.managers(self._name)
 
     @property
     def name(self):
@@ -163,6 +259,7 @@ class Provider(object):
         :type tenant_id: str
         :return: resources found from query
         :rtype: list
+        :raises ResourceNotFound: no resource found for the name
         """
         # advanced query
         if tenant_id:
@@ -178,9 +275,9 @@ class Provider(object):
         self.query(_query)
 
         if len(self.query.resources) == 0:
-            log.abort('{0} {1} not found for provider {2}.'.format(
-                self.__class__.__name__, name, self.name
-            ))
+            raise ResourceNotFound(
+                '{0} {1} not found for provider {2}.'.format(
+                    self.__class__.__name__, name, self.name))
 
         return self.query.resources
 
@@ -191,8 +288,36 @@ class Provider(object):
         :return: resource id
         :rtype: int
         """
-        self.get_resource(name)
-        return getattr(self.query, 'id')
+        return self.resolve(name, 'id')
+
+    def resolve(self, name, attribute, tenant_id=None):
+        """Resolve the resource name to the given attribute.
+
+        Resolutions are cached by the client api, keyed by provider,
+        collection, type, name and tenant.
+
+        :param name: resource name
+        :type name: str
+        :param attribute: resource attribute (i.e. id, guid)
+        :type attribute: str
+        :param tenant_id: optional tenant_id for querying
+        :type tenant_id: str
+        :return: attribute value
+        :raises ResourceNotFound: no resource found for the name
+        """
+        cache = self.api.resolutions
+        key = (self.name, self.__collection_name__, self.type, name,
+               tenant_id)
+        if cache is not None:
+            value = cache.get(key)
+            if value is not None:
+                return value
+
+        self.get_resource(name, tenant_id)
+        value = getattr(self.query, attribute)
+        if cache is not None:
+            cache.set(key, value)
+        return value
 
     def get_attribute(self, ent_id, attribute):
         """Get the attribute for the collection entity.
@@ -244,8 +369,7 @@ class Templates(Provider):
 
     def get_id(self, name):
         """Override the parent get_id."""
-        self.get_resource(name)
-        return getattr(self.query, 'guid')
+        return self.resolve(name, 'guid')
 
 
 class SecurityGroups(Provider):
@@ -259,14 +383,13 @@ class SecurityGroups(Provider):
         self.collection = self.__collection_name__
         self.type = self.network_type + '::SecurityGroup'
 
-    def get_id(self, name, tenant_id):
+    def get_id(self, name, tenant_id=None):
         """Override the parent get_id.
         :param name: resource name
         :type name: str
         :param tenant_id: tenant_id for querying
         :type tenant_id: str"""
-        self.get_resource(name, tenant_id)
-        return getattr(self.query, 'id')
+        return self.resolve(name, 'id', tenant_id)
 
 
 class KeyPair(Provider):
@@ -313,8 +436,7 @@ class Networks(Provider):
         :type name: str
         :param tenant_id: optional tenant_id for querying
         :type tenant_id: str"""
-        self.get_resource(name, tenant_id)
-        return getattr(self.query, 'id')
+        return self.resolve(name, 'id', tenant_id)
 
 
 class Instances(Provider):
@@ -14,8 +14,9 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-from manageiq_client.api import APIException
-from manageiq_client.filters import Q
+from manageiq_client.api import APIException, SearchResult
+from miqcli.constants import QUERY_PAGE_SIZE
+from miqcli.filters import compile_filter
 from miqcli.utils import log
 
 __all__ = ['BasicQuery', 'AdvancedQuery', 'inject']
@@ -31,34 +32,232 @@ class BaseQuery(object):
     """Base query.
 
     This class contains default methods each child query class can use.
+    Queries page through the collection resources, :meth:`iter` yields
+    them as each page arrives while calling the query collects them all.
     """
 
-    def __init__(self, collection):
+    #: number of resources requested per page
+    page_size = QUERY_PAGE_SIZE
+
+    def __init__(self, collection, page_size=None):
         """Constructor.
 
         :param collection: collection object
         :type collection: object
+        :param page_size: number of resources requested per page
+        :type page_size: int
         """
-        self.collection = collection
+        self._collection = collection
         self.resources = list()
+        self._missing = set()
+        self._base_attributes = None
+        if page_size:
+            self.page_size = page_size
+
+    @property
+    def collection(self):
+        """Collection property.
+
+        :return: collection object
+        :rtype: object
+        """
+        return self._collection
+
+    @collection.setter
+    def collection(self, value):
+        """Set the collection the query runs against.
+
+        :param value: collection object
+        :type value: object
+        """
+        self._collection = value
+        self._base_attributes = None
+
+    def __call__(self, query, attr=None, fields=None):
+        """Performs the query on the collection.
+
+        :param query: query, see the child query class
+        :param attr: attributes to include
+        :type attr: tuple
+        :param fields: only request these attributes (and id, attr), None
+            for all of them
+        :type fields: tuple
+        :return: collection resources matching the supplied query
+        :rtype: list
+        """
+        resources = list()
+        for ent in self.iter(query, attr, fields):
+            resources.append(ent)
+        self.resources = resources
+        self._missing = set()
+        return self.resources
+
+    def iter(self, query, attr=None, fields=None):
+        """Performs the query on the collection, yielding the resources.
+
+        The resources are yielded as each page is received, at most one
+        page of resources is held in memory.
+
+        :param query: query, see the child query class
+        :param attr: attributes to include
+        :type attr: tuple
+        :param fields: only request these attributes (and id, attr), None
+            for all of them
+        :type fields: tuple
+        :return: generator of collection resources matching the query
+        :rtype: generator
+        """
+        try:
+            filters = self._filters(query)
+            if filters is None:
+                return
+            for page in self._pages(filters, attr, fields):
+                for ent in page:
+                    yield ent
+        except (APIException, ValueError, TypeError) as e:
+            # most likely user passed an invalid attribute name
+            log.error('Query attempted failed: {0}, error: {1}'.format(
+                query, e))
+
+    def _filters(self, query):
+        """Return the ``filter[]`` filters for the query.
+
+        :param query: query, see the child query class
+        :return: filters or None when the query is invalid
+        :rtype: list
+        """
+        raise NotImplementedError
+
+    def _attributes(self, attr):
+        """Return the attributes to request along with the given ones.
+
+        Requesting attributes limits the resources data to the attributes
+        requested. The collection attributes are requested too so the
+        resources keep all their attributes.
+
+        :param attr: attributes requested
+        :type attr: tuple
+        :return: attributes
+        :rtype: list
+        """
+        if self._base_attributes is None:
+            self._base_attributes = list(
+                self.collection.options().get('attributes', []))
+
+        attributes = list(self._base_attributes)
+        for att in attr:
+            if att not in attributes:
+                attributes.append(att)
+        return attributes
+
+    def _projection(self, fields, attr):
+        """Return the only attributes to request.
+
+        :param fields: attributes used from the resources
+        :type fields: tuple
+        :param attr: attributes requested
+        :type attr: tuple
+        :return: attributes
+        :rtype: list
+        """
+        attributes = ['id']
+        for att in tuple(fields) + tuple(attr or ()):
+            if att not in attributes:
+                attributes.append(att)
+        return attributes
+
+    def _pages(self, filters, attr=None, fields=None):
+        """Yield the pages of collection resources matching the filters.
+
+        The matching resources are expanded along with the requested
+        attributes. Pages are requested with offset/limit, ordered by id
+        so resources are not skipped or repeated between pages, until all
+        the matching resources (subquery_count) are received or, when the
+        server does not tell their number, an empty page is.
+
+        :param filters: filters for ``filter[]``
+        :type filters: list
+        :param attr: attributes to include
+        :type attr: tuple
+        :param fields: only request these attributes (and id, attr), None
+            for all of them
+        :type fields: tuple
+        :return: generator of resources pages
+        :rtype: generator
+        """
+        params = {'expand': 'resources', 'sort_by': 'id',
+                  'sort_order': 'asc', 'limit': self.page_size}
+        if filters:
+            params['filter[]'] = filters
+        if fields:
+            params['attributes'] = ','.join(self._projection(fields, attr))
+        elif attr:
+            params['attributes'] = ','.join(self._attributes(attr))
+
+        offset = 0
+        while True:
+            params['offset'] = offset
+            # show the messages logged so far while waiting for the page
+            log.flush()
+            page, total = self._page(dict(params))
+            if not page:
+                break
+            if fields:
+                # partial data, any other attribute or action reloads it
+                for ent in page:
+                    ent._incomplete = True
+            yield page
+
+            # a short page does not tell the last one, the server may cap
+            # the resources per page below the requested limit
+            offset += len(page)
+            if total is not None and offset >= total:
+                break
+
+    def _page(self, params):
+        """Request a page of the collection resources.
+
+        :param params: query parameters
+        :type params: dict
+        :return: page resources and the number of resources matching the
+            query, None when the server does not tell it
+        :rtype: tuple
+        """
+        collection = self.collection
+        data = getattr(collection, '_api').get(
+            getattr(collection, '_href'), **params)
+        total = data.get('subquery_count')
+        return SearchResult(collection, data).resources, total
 
     def __getattr__(self, attr):
         """Return the value for the given attribute.
 
+        The value is read from the resource data received with the query.
+        A missing attribute is requested once from the server, attributes
+        the resource does not have are remembered.
+
         :param attr: attribute name
         :type attr: str
         :return: attribute value
         """
+        if attr.startswith('__') or attr in ('resources', '_missing'):
+            raise AttributeError(attr)
+
         if len(self.resources) == 0:
             raise AttributeError('No available resources. Did you perform '
                                  'a query?')
         elif len(self.resources) == 1:
-            # load attributes into entity object
-            self.resources[0].reload()
+            resource = self.resources[0]
 
-            if attr not in self.resources[0].__dict__:
+            if attr not in resource.__dict__ and attr not in self._missing:
+                # load the missing attribute into entity object
+                resource.reload(attributes=[attr])
+                if attr not in resource.__dict__:
+                    self._missing.add(attr)
+
+            if attr not in resource.__dict__:
                 raise AttributeError('No such attribute {0}'.format(attr))
-            return self.resources[0].__dict__[attr]
+            return resource.__dict__[attr]
         else:
             raise AttributeError('Cannot get attribute when multiple '
                                  'resources exist.')
@@ -70,15 +269,7 @@ class BasicQuery(BaseQuery):
     This class will perform a basic query on the given collection.
     """
 
-    def __init__(self, collection):
-        """Constructor.
-
-        :param collection: collection object
-        :type collection: object
-        """
-        super(BasicQuery, self).__init__(collection)
-
-    def __call__(self, query, attr=None):
+    def __call__(self, query, attr=None, fields=None):
         """Performs a basic query on a collection.
 
         :param query: query containing name, operand and value
@@ -95,28 +286,31 @@ class BasicQuery(BaseQuery):
             query(('name', '=', 'vm_foo'))
             # -- or --
             query.__call__(('name', '=', 'vm_foo'))
-        """
-        if len(query) != 3:
-            log.warning('Query must contain three indexes. i.e. '
-                        '(name, operand, value)')
-            return self.resources
 
-        try:
-            resources = getattr(self.collection, 'filter')(
-                Q(query[0], query[1], query[2])
-            )
+            # query all vms collection resources, one page at a time
+            for vm in BasicQuery(vm_collection).iter(None):
+                print(vm.name)
+        """
+        return super(BasicQuery, self).__call__(query, attr, fields)
 
-            self.resources = resources.resources
+    def _filters(self, query):
+        """Return the ``filter[]`` filters for the basic query.
 
-            if attr:
-                for ent in resources.resources:
-                    ent.reload(True, True, attr)
+        :param query: query containing name, operand and value, None to
+            query all resources
+        :type query: tuple
+        :return: filters or None when the query is invalid
+        :rtype: list
+        """
+        if query is None:
+            return []
 
-        except (APIException, ValueError) as e:
-            log.error('Query attempted failed: {0}, error: {1}'.format(
-                query, e))
+        if len(query) != 3:
+            log.warning('Query must contain three indexes. i.e. '
+                        '(name, operand, value)')
+            return None
 
-        return self.resources
+        return compile_filter(tuple(query))
 
 
 class AdvancedQuery(BaseQuery):
@@ -125,19 +319,17 @@ class AdvancedQuery(BaseQuery):
     This class will perform a advanced query on the given collection
     """
 
-    def __init__(self, collection):
-        """Constructor.
-
-        :param collection: collection object
-        :type collection: object
-        """
-        super(AdvancedQuery, self).__init__(collection)
-
-    def __call__(self, query, attr=None):
+    def __call__(self, query, attr=None, fields=None):
         """Performs a advanced query on a collection.
 
+        The queries are joined by '&' or '|' and evaluated left to right,
+        a query preceded by '!' is negated. The given list is not changed
+        and can be reused. Queries ``filter[]`` cannot express, i.e. other
+        than an AND of queries ORed with queries, are rejected.
+
         :param query: multiple queries containing name, operand and value
-        :type query: list
+            or a filter expression, see :mod:`miqcli.filters`
+        :type query: list or Filter
         :return: collection resources matching the supplied query
         :rtype: list
 
@@ -149,39 +341,23 @@ class AdvancedQuery(BaseQuery):
         query([('name', '=', 'vm_foo'), '&', ('id', '>', '9999934')])
         # -- or --
         query.__call__([('name', '=', 'vm_foo'), '&', ('id', '>', '9999934')])
+        # -- or --
+        query(Term('name', '=', 'vm_foo') & ~Term('id', '>', '9999934'))
         """
-        adv_query = ''
-
-        if len(query) % 2 == 0:
-            log.warning('Query attempted is invalid: {0}'.format(query))
-            return self.resources
-
-        # build query in string form
-        while query:
-            _query = query.pop(0)
-
-            if isinstance(_query, tuple) and len(_query) != 3:
-                log.warning('Query must contain three indexes (name, operator,'
-                            ' value)')
-                return self.resources
-            elif isinstance(_query, tuple):
-                adv_query += str("Q('" + str(_query[0]) + "', '" + str(
-                    _query[1])) + "', '" + str(_query[2]) + "')"
-            elif isinstance(_query, str):
-                adv_query += ' {0} '.format(_query)
-
-        try:
-            resources = getattr(self.collection, 'filter')(eval(adv_query))
-
-            self.resources = resources.resources
+        return super(AdvancedQuery, self).__call__(query, attr, fields)
 
-            if attr:
-                for ent in resources.resources:
-                    ent.reload(True, True, attr)
+    def _filters(self, query):
+        """Return the ``filter[]`` filters for the advanced query.
 
-        except (APIException, ValueError, TypeError) as e:
-            # most likely user passed an invalid attribute name
-            log.error('Query attempted failed: {0}, error: {1}'.format(
+        :param query: multiple queries containing name, operand and value
+            or a filter expression
+        :type query: list or Filter
+        :return: filters or None when the query is invalid
+        :rtype: list
+        """
+        try:
+            return compile_filter(query)
+        except ValueError as e:
+            log.warning('Query attempted is invalid: {0}: {1}'.format(
                 query, e))
-
-        return self.resources
+            return None
@@ -0,0 +1,31 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Testing package contains a local mock ManageIQ REST API server.
+
+The server runs in-process (:class:`MockServer`) or as a subprocess::
+
+    python -m miqcli.testing --vms 10000 --port 8080
+
+It serves fixtures (json files) and synthetic inventories, so miqcli can
+be tested and benchmarked without an appliance.
+"""
+
+from miqcli.testing.inventory import ACTIONS, VIRTUAL, inventory
+from miqcli.testing.server import MOCK_TOKEN, TRANSITIONS, MockServer
+
+__all__ = ['ACTIONS', 'MOCK_TOKEN', 'MockServer', 'TRANSITIONS', 'VIRTUAL',
+           'inventory']
@@ -0,0 +1,72 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Run the mock ManageIQ REST API server.
+
+The first line printed is the server url, the second one its token.
+"""
+
+import json
+import sys
+
+import click
+
+from miqcli.testing import ACTIONS, MOCK_TOKEN, VIRTUAL, MockServer, \
+    inventory
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', help='Address to listen on.')
+@click.option('--port', default=0, type=int,
+              help='Port to listen on, any free port by default.')
+@click.option('--vms', default=100, type=int,
+              help='Number of vms generated.')
+@click.option('--providers', default='openstack,amazon',
+              help='Providers generated, comma separated.')
+@click.option('--requests', default=0, type=int,
+              help='Number of finished provision requests generated.')
+@click.option('--seed', default=0, type=int, help='Random seed.')
+@click.option('--fixtures', multiple=True, type=click.File('r'),
+              help='Json file of collection name -> resources, replaces '
+                   'the generated collections.')
+@click.option('--transition_time', default=1.0, type=float,
+              help='Seconds between the states of the created requests '
+                   'and tasks.')
+@click.option('--max_results', default=1000, type=int,
+              help='Maximum resources per response, 0 for no limit.')
+@click.option('--memoize', is_flag=True,
+              help='Keep the results of the last queries for their next '
+                   'pages.')
+def main(host, port, vms, providers, requests, seed, fixtures,
+         transition_time, max_results, memoize):
+    """Serve a synthetic ManageIQ inventory."""
+    resources = inventory(vms=vms, providers=tuple(providers.split(',')),
+                          requests=requests, seed=seed)
+    for fixture in fixtures:
+        resources.update(json.load(fixture))
+
+    server = MockServer(resources, virtual=VIRTUAL, actions=ACTIONS,
+                        transition_time=transition_time,
+                        max_results=max_results or None, memoize=memoize,
+                        host=host, port=port)
+    click.echo(server.url)
+    click.echo(MOCK_TOKEN)
+    sys.stdout.flush()
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Inventory module generates synthetic ManageIQ inventories.
+
+Inventories are plain dicts (collection name -> list of resource dicts)
+served by :class:`miqcli.testing.MockServer`. They are generated from a
+seed, the same arguments always give the same inventory.
+"""
+
+import random
+
+__all__ = ['ACTIONS', 'PROVIDERS', 'VIRTUAL', 'inventory']
+
+#: provider name -> (cloud manager type, network manager type)
+PROVIDERS = {
+    'openstack': ('ManageIQ::Providers::Openstack::CloudManager',
+                  'ManageIQ::Providers::Openstack::NetworkManager'),
+    'amazon': ('ManageIQ::Providers::Amazon::CloudManager',
+               'ManageIQ::Providers::Amazon::NetworkManager')
+}
+
+#: virtual attributes of the generated collections
+VIRTUAL = {
+    'instances': ['ipaddresses', 'ext_management_system'],
+    'vms': ['ipaddresses', 'ext_management_system']
+}
+
+#: actions accepted for the generated collections
+ACTIONS = {
+    'automation_requests': ['create', 'approve', 'deny'],
+    'instances': ['start', 'stop', 'terminate'],
+    'provision_requests': ['create', 'approve', 'deny'],
+    'tasks': ['delete'],
+    'vms': ['start', 'stop', 'delete']
+}
+
+FLAVORS = ['m1.tiny', 'm1.small', 'm1.medium', 'm1.large', 'm1.xlarge']
+
+POWER_STATES = ['on', 'off', 'suspended']
+
+
+def inventory(vms=100, providers=('openstack', 'amazon'), tenants=2,
+              networks=2, templates=3, requests=0, seed=0):
+    """Generate a synthetic inventory.
+
+    Each provider gets its managers, tenants, flavors, templates, networks,
+    subnets, a security group and a key pair. The vms are spread over the
+    providers and also listed as cloud instances.
+
+    :param vms: number of vms
+    :type vms: int
+    :param providers: provider names, see :data:`PROVIDERS`
+    :type providers: tuple
+    :param tenants: tenants per provider
+    :type tenants: int
+    :param networks: networks per tenant
+    :type networks: int
+    :param templates: templates per provider
+    :type templates: int
+    :param requests: finished provision requests (and their tasks)
+    :type requests: int
+    :param seed: random seed
+    :type seed: int
+    :return: collection name -> resources
+    :rtype: dict
+    """
+    rand = random.Random(seed)
+    ids = iter(range(1, 10 ** 9))
+    data = dict((name, list()) for name in (
+        'providers', 'cloud_tenants', 'flavors', 'templates',
+        'cloud_networks', 'cloud_subnets', 'security_groups',
+        'authentications', 'vms', 'instances', 'tasks',
+        'provision_requests', 'automation_requests', 'request_tasks'))
+
+    def add(collection, **resource):
+        resource['id'] = str(next(ids))
+        data[collection].append(resource)
+        return resource
+
+    hosts = list()
+    for provider in providers:
+        cloud_type, network_type = PROVIDERS[provider]
+        cloud = add('providers', name=provider, type=cloud_type)
+        network = add('providers', name=provider + ' network',
+                      type=network_type, parent_ems_id=cloud['id'])
+        flavors = [add('flavors', name=name, type=cloud_type + '::Flavor',
+                       ems_id=cloud['id'], cpus=2 ** i,
+                       memory=512 * 2 ** i)
+                   for i, name in enumerate(FLAVORS)]
+        images = [add('templates', name='template-%d' % i,
+                      type=cloud_type + '::Template', ems_id=cloud['id'],
+                      guid='%08x-%04x' % (rand.getrandbits(32), i))
+                  for i in range(templates)]
+        add('security_groups', name='default',
+            type=network_type + '::SecurityGroup', ems_id=network['id'])
+        add('authentications', name='%s-key' % provider,
+            type=cloud_type + '::AuthKeyPair', resource_id=cloud['id'])
+        for t in range(tenants):
+            tenant = add('cloud_tenants', name='tenant-%d' % t,
+                         type=cloud_type + '::CloudTenant',
+                         ems_id=cloud['id'])
+            for n in range(networks):
+                net = add('cloud_networks', name='network-%d-%d' % (t, n),
+                          type=network_type + '::CloudNetwork::Private',
+                          ems_id=network['id'],
+                          cloud_tenant_id=tenant['id'])
+                add('cloud_subnets', name='subnet-%d-%d' % (t, n),
+                    type=network_type + '::CloudSubnet',
+                    ems_id=network['id'], cloud_network_id=net['id'],
+                    cidr='10.%d.%d.0/24' % (t, n))
+                hosts.append((provider, cloud, tenant, net, flavors,
+                              images))
+
+    for i in range(vms):
+        provider, cloud, tenant, net, flavors, images = hosts[i % len(hosts)]
+        vm = add('vms', name='vm-%06d' % i, vendor=provider,
+                 type=PROVIDERS[provider][0] + '::Vm', ems_id=cloud['id'],
+                 power_state=rand.choice(POWER_STATES),
+                 cloud_tenant_id=tenant['id'],
+                 flavor_id=rand.choice(flavors)['id'],
+                 genealogy_parent_id=rand.choice(images)['id'],
+                 ipaddresses=['10.0.%d.%d' % (i // 250 % 250, i % 250 + 1)],
+                 ext_management_system={'name': cloud['name']},
+                 cloud_networks=[{'name': net['name']}])
+        data['instances'].append(vm)
+
+    for i in range(requests):
+        request = add('provision_requests',
+                      description='Provision vm-%06d' % i,
+                      request_state='finished', status='Ok',
+                      message='done', approval_state='approved')
+        add('request_tasks', description=request['description'],
+            state='finished', status='Ok', message='done',
+            miq_request_id=request['id'])
+        add('tasks', name=request['description'], state='Finished',
+            status='Ok', message='done')
+    return data
@@ -0,0 +1,536 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Server module contains a local stand-in for the ManageIQ REST API.
+
+The server keeps its resources in memory (collection name -> list of
+resource dicts) and implements the parts of the API used by miqcli:
+
+* ``GET /api``, ``GET /api/auth`` and ``OPTIONS /api/<collection>``
+* ``GET /api/<collection>`` with ``filter[]``, ``sort_by``/``sort_order``,
+  ``offset``/``limit``, ``expand=resources`` and ``attributes``
+* ``GET /api/<collection>/<id>``
+* ``POST /api/<collection>`` actions: posted resources are created,
+  posted hrefs get a task running the action
+
+Requests and tasks created by the server move through their states over
+time, see :data:`TRANSITIONS`. Every request received is recorded in
+:attr:`MockServer.calls`.
+"""
+
+import fnmatch
+import json
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+__all__ = ['MockServer', 'MOCK_TOKEN', 'TRANSITIONS']
+
+#: token handed out by the mock server
+MOCK_TOKEN = 'stubtoken1234'
+
+#: state attribute and states the created resources move through
+TRANSITIONS = {
+    'automation_requests': ('request_state', ('pending', 'active',
+                                              'finished')),
+    'provision_requests': ('request_state', ('pending', 'active',
+                                             'finished')),
+    'request_tasks': ('state', ('pending', 'active', 'finished')),
+    'tasks': ('state', ('Queued', 'Active', 'Finished'))
+}
+
+
+def _values(resource, key):
+    """Return the resource values for a (dotted) attribute name.
+
+    Lists (i.e. ``cloud_networks.name``) give one value per item.
+    """
+    values = [resource]
+    for name in key.split('.'):
+        found = list()
+        for value in values:
+            if isinstance(value, list):
+                found.extend(item.get(name) for item in value
+                             if isinstance(item, dict))
+            elif isinstance(value, dict):
+                found.append(value.get(name))
+        values = found
+    return [item for value in values
+            for item in (value if isinstance(value, list) else [value])]
+
+
+def _value(resource, key):
+    """Return the first resource value for a (dotted) attribute name."""
+    values = _values(resource, key)
+    return values[0] if values else None
+
+
+def _number(value):
+    """Return the value as a float, None when it is not a number."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compare(value, op, expected):
+    """Compare a resource value to the value of a filter expression."""
+    if op in ('=', '!='):
+        if expected in ('nil', 'NULL'):
+            matched = value is None
+        elif '*' in expected or '%' in expected:
+            matched = value is not None and fnmatch.fnmatchcase(
+                str(value), expected.replace('%', '*'))
+        else:
+            matched = str(value) == expected
+        return matched if op == '=' else not matched
+
+    left, right = _number(value), _number(expected)
+    if left is None or right is None:
+        left, right = str(value), expected
+    return {'<': left < right, '<=': left <= right,
+            '>': left > right, '>=': left >= right}[op]
+
+
+def _parse_filters(filters):
+    """Parse the filter[] expressions once per request.
+
+    :return: list of (is_or, attribute, operator, value)
+    :rtype: list
+    """
+    parsed = list()
+    for _filter in filters:
+        is_or = _filter.startswith('or ')
+        key, op, value = _filter[3 if is_or else 0:].split(' ', 2)
+        parsed.append((is_or, key, op, value.strip('\'"')))
+    return parsed
+
+
+def _match_term(resource, key, op, value):
+    """Evaluate a parsed filter[] expression."""
+    values = _values(resource, key) or [None]
+    if op == '!=':
+        return all(_compare(v, op, value) for v in values)
+    return any(_compare(v, op, value) for v in values)
+
+
+def _match(resource, filters):
+    """Evaluate the parsed filter[] expressions like the appliance does.
+
+    The plain expressions are ANDed and the result is ORed with each
+    ``or`` expression.
+    """
+    terms = [f[1:] for f in filters if not f[0]]
+    or_terms = [f[1:] for f in filters if f[0]]
+    if terms and all(_match_term(resource, *term) for term in terms):
+        return True
+    return any(_match_term(resource, *term) for term in or_terms) or \
+        not filters
+
+
+def _sort_key(value):
+    """Sort numeric ids as numbers, like the server does."""
+    try:
+        return int(value), ''
+    except (TypeError, ValueError):
+        return 0, str(value)
+
+
+def _options(resource):
+    """Return the options of a posted resource, fields are flattened."""
+    options = dict()
+    for key, value in resource.items():
+        if isinstance(value, dict):
+            options.update(value)
+        else:
+            options[key] = value
+    return options
+
+
+def _error(klass, message):
+    return {'error': {'klass': klass, 'message': message}}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Request handler serving the mock server resources."""
+
+    # keep the connections alive, like the appliance does
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        """Silence request logging."""
+        pass
+
+    @property
+    def base(self):
+        return 'http://%s:%s/api' % self.server.server_address[:2]
+
+    def _send(self, code, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        """Tell whether the request is authorized, reject it otherwise.
+
+        Requests sending a token other than :data:`MOCK_TOKEN` get a 401,
+        requests without a token (e.g. basic auth) are accepted.
+        """
+        token = self.headers.get('X-Auth-Token')
+        if token is None or token == MOCK_TOKEN:
+            return True
+        self._send(401, _error('AuthenticationError',
+                               'Invalid Authentication Token'))
+        return False
+
+    def _resource(self, collection, resource, params):
+        """Return the resource data as the server sends it."""
+        virtual = self.server.virtual.get(collection, [])
+        if 'attributes' in params:
+            attributes = set(a.split('.')[0] for a in
+                             params['attributes'][0].split(','))
+            data = dict((k, v) for k, v in resource.items()
+                        if k in attributes or k == 'id')
+        else:
+            data = dict((k, v) for k, v in resource.items()
+                        if k not in virtual)
+        data['href'] = '%s/%s/%s' % (self.base, collection, resource['id'])
+        return data
+
+    def do_OPTIONS(self):
+        url = urlparse(self.path)
+        self.server.calls.append(('OPTIONS', url.path, {}))
+        if not self._authorized():
+            return
+        parts = [p for p in url.path.split('/') if p]
+        virtual = self.server.virtual.get(parts[-1], [])
+        attributes = set()
+        with self.server.lock:
+            for resource in self.server.resources.get(parts[-1], []):
+                attributes.update(k for k in resource if k not in virtual)
+        self._send(200, {'attributes': sorted(attributes),
+                         'virtual_attributes': virtual})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        self.server.calls.append(('GET', url.path, params))
+        if not self._authorized():
+            return
+        parts = [p for p in url.path.split('/') if p]
+
+        with self.server.lock:
+            if len(parts) > 1:
+                self.server.advance(parts[1])
+            if parts == ['api']:
+                self._send(200, {
+                    'name': 'API',
+                    'version': self.server.version,
+                    'versions': [],
+                    'collections': [
+                        {'name': name, 'href': self.base + '/' + name,
+                         'description': name.title()}
+                        for name in self.server.resources]})
+            elif parts == ['api', 'auth']:
+                self._send(200, {'auth_token': MOCK_TOKEN})
+            elif len(parts) == 2 and parts[1] in self.server.resources:
+                self._send(200, self._collection(parts[1], params))
+            elif len(parts) == 3 and parts[1] in self.server.resources:
+                for resource in self.server.resources[parts[1]]:
+                    if str(resource['id']) == parts[2]:
+                        self._send(200, self._resource(parts[1], resource,
+                                                       params))
+                        return
+                self._send(404, _error('NotFound', 'not found'))
+            else:
+                self._send(404, _error('NotFound', 'not found'))
+
+    def _query(self, name, params):
+        """Return the collection resources matching the query, sorted.
+
+        With memoize set, the results are kept for the next pages of the
+        query until a resource is added to the collection.
+        """
+        key = (name, len(self.server.resources[name])) + tuple(
+            tuple(params.get(p, ())) for p in ('filter[]', 'sort_by',
+                                               'sort_order'))
+        if key in self.server.queries:
+            return self.server.queries[key]
+
+        filters = _parse_filters(params.get('filter[]', []))
+        resources = [r for r in self.server.resources[name]
+                     if _match(r, filters)]
+        if 'sort_by' in params:
+            resources.sort(key=lambda r: _sort_key(
+                _value(r, params['sort_by'][0])),
+                reverse=params.get('sort_order') == ['desc'])
+
+        if self.server.memoize:
+            if len(self.server.queries) >= 16:
+                self.server.queries.clear()
+            self.server.queries[key] = resources
+        return resources
+
+    def _collection(self, name, params):
+        """Return the collection data for the query parameters."""
+        resources = self._query(name, params)
+        subquery_count = len(resources)
+
+        offset = int(params.get('offset', ['0'])[0])
+        limit = self.server.max_results
+        if 'limit' in params:
+            limit = min(int(params['limit'][0]), limit or float('inf'))
+        if limit:
+            resources = resources[offset:offset + int(limit)]
+        else:
+            resources = resources[offset:]
+
+        if 'expand' in params:
+            data = [self._resource(name, r, params) for r in resources]
+        else:
+            data = [{'href': '%s/%s/%s' % (self.base, name, r['id'])}
+                    for r in resources]
+        return {
+            'name': name,
+            'actions': [
+                {'name': action, 'method': 'post',
+                 'href': '%s/%s' % (self.base, name)}
+                for action in self.server.actions.get(name, [])],
+            'count': len(self.server.resources[name]),
+            'subcount': len(resources),
+            'subquery_count': subquery_count,
+            'resources': data}
+
+    def _task(self, action, href):
+        """Create the task running the action, return the action result."""
+        task = self.server.create('tasks', {
+            'name': '%s %s' % (action, href), 'status': 'Ok',
+            'message': '%s queued' % action})
+        return {'success': True, 'message': '%s queued' % action,
+                'task_id': task['id'],
+                'task_href': self.base + '/tasks/' + task['id'],
+                'href': href}
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+        self.server.calls.append(('POST', url.path, body))
+        if not self._authorized():
+            return
+
+        parts = [p for p in url.path.split('/') if p]
+        if len(parts) != 2 or body.get('action') not in \
+                self.server.actions.get(parts[1], []):
+            self._send(400, _error('BadRequest', 'unsupported action'))
+            return
+
+        results = []
+        with self.server.lock:
+            for resource in body.get('resources',
+                                     [body.get('resource', {})]):
+                message = self.server.reject(resource)
+                if message:
+                    results.append({'success': False, 'message': message})
+                elif 'href' in resource:
+                    # action on an existing resource, a task runs it
+                    results.append(self._task(body['action'],
+                                              resource['href']))
+                else:
+                    created = self.server.create(parts[1], {
+                        'options': _options(resource), 'status': 'Ok',
+                        'message': '%s queued' % body['action']})
+                    results.append({
+                        'success': True,
+                        'message': '%s %s' % (body['action'],
+                                              created['id']),
+                        'id': created['id'],
+                        'href': '%s/%s/%s' % (self.base, parts[1],
+                                              created['id'])})
+        self._send(200, {'results': results})
+
+
+class _HTTPServer(ThreadingMixIn, HTTPServer):
+    """Serve each connection in its own thread."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, resources, virtual, actions, version,
+                 transition_time, max_results, memoize):
+        HTTPServer.__init__(self, address, MockHandler)
+        self.resources = resources
+        self.virtual = virtual
+        self.actions = actions
+        self.version = version
+        self.transition_time = transition_time
+        self.max_results = max_results
+        self.memoize = memoize
+        # query -> matching resources, see memoize
+        self.queries = dict()
+        self.last_id = 1000
+        # posted resource -> failure message or None to accept it
+        self.reject = lambda resource: None
+        self.calls = []
+        self.lock = threading.RLock()
+        # collection name -> [creation time, resource] moving on
+        self.timeline = dict()
+
+    def create(self, collection, data):
+        """Add a resource to the collection, return it.
+
+        Resources of the :data:`TRANSITIONS` collections start in their
+        first state and are moved forward by :meth:`advance`.
+        """
+        self.last_id += 1
+        resource = dict(data, id=str(self.last_id))
+        if collection in TRANSITIONS:
+            self.timeline.setdefault(collection, []).append(
+                [time.time(), resource])
+            self.advance(collection)
+        self.resources.setdefault(collection, []).append(resource)
+        return resource
+
+    def advance(self, collection):
+        """Move the created resources of the collection to their state.
+
+        A resource moves to the next state every ``transition_time``
+        seconds, it reaches the last state at once when it is 0.
+        """
+        if collection not in self.timeline:
+            return
+        attr, states = TRANSITIONS[collection]
+        now, running = time.time(), list()
+        for created, resource in self.timeline[collection]:
+            if self.transition_time:
+                step = int((now - created) / self.transition_time)
+            else:
+                step = len(states)
+            resource[attr] = states[min(step, len(states) - 1)]
+            if step < len(states) - 1:
+                running.append([created, resource])
+            else:
+                resource['message'] = 'done'
+        self.timeline[collection] = running
+
+
+class MockServer(object):
+    """ManageIQ REST API mock server.
+
+    The server runs in a background thread, call :meth:`start` and
+    connect a client to :attr:`url` with the :data:`MOCK_TOKEN` token (any
+    credentials are accepted, any other token is rejected with a 401).
+
+    .. code-block: python
+
+        from miqcli.testing import MockServer, inventory
+
+        server = MockServer(inventory(vms=10000))
+        server.start()
+        ...
+        server.stop()
+
+    :param resources: collection name to list of resource dicts
+    :type resources: dict
+    :param virtual: collection name to list of virtual attribute names,
+        only sent when requested
+    :type virtual: dict
+    :param version: api version
+    :type version: str
+    :param actions: collection name to list of action names accepted by
+        POST, each posted resource is created, each posted href gets a
+        task
+    :type actions: dict
+    :param transition_time: seconds between the states of the created
+        requests and tasks, 0 to create them in their last state
+    :type transition_time: float
+    :param max_results: maximum resources per response, None for no limit
+    :type max_results: int
+    :param memoize: keep the results of the last queries for their next
+        pages, only for resources not modified in place
+    :type memoize: bool
+    :param host: address to listen on
+    :type host: str
+    :param port: port to listen on, 0 for any free port
+    :type port: int
+    """
+
+    def __init__(self, resources=None, virtual=None, version='5.0.0',
+                 actions=None, transition_time=0, max_results=None,
+                 memoize=False, host='127.0.0.1', port=0):
+        self._httpd = _HTTPServer((host, port), {} if resources is None
+                                  else resources, virtual or {},
+                                  actions or {}, version, transition_time,
+                                  max_results, memoize)
+        self._thread = threading.Thread(target=self._httpd.serve_forever)
+        self._thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://%s:%s' % self._httpd.server_address[:2]
+
+    @property
+    def resources(self):
+        return self._httpd.resources
+
+    @property
+    def calls(self):
+        return self._httpd.calls
+
+    def collection_calls(self, collection):
+        """Return the calls made for the collection and its resources."""
+        return [call for call in self.calls
+                if call[1].startswith('/api/' + collection)]
+
+    def list_calls(self, collection):
+        """Return the unfiltered GET calls made for the collection."""
+        return [call for call in self.collection_calls(collection)
+                if call[1] == '/api/' + collection
+                if 'filter[]' not in call[2]]
+
+    def start(self):
+        self._thread.start()
+
+    def serve_forever(self):
+        """Serve in the current thread, until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -18,18 +18,21 @@ from importlib import import_module
 
 import click
 import os
-import yaml
 import ast
 import json
 from types import FunctionType
 
-from miqcli.constants import CFG_FILE_EXT, COLLECTIONS_PACKAGE
+from miqcli.constants import CFG_FILE_EXT, COLLECTIONS_PACKAGE, \
+    DEV_VERSION, PACKAGE
 from miqcli.utils import log
 
 __all__ = ['Config', 'get_class_methods', 'get_client_api_pointer',
            'is_default_config_used', 'display_commands',
            '_abort_invalid_commands', 'get_collection_class',
-           'get_input_data']
+           'get_input_data', 'get_version']
+
+# installed version of miqcli, read once
+_version = list()
 
 
 class Config(dict):
@@ -75,6 +78,9 @@ class Config(dict):
         if _cfg_file is None:
             return
 
+        # yaml is only needed by the configurations using it
+        import yaml
+
         # load config
         try:
             with open(_cfg_file, mode='rb') as fp:
@@ -238,3 +244,30 @@ def get_input_data(payload, payload_file):
             log.abort("File: {0} not found.".format(payload_file))
     else:
         log.abort("Please set the payload or payload_file")
+
+
+def get_version():
+    """Return the installed version of miqcli.
+
+    The version is read from the package metadata the first time, with
+    importlib.metadata when available which is much faster to import than
+    pkg_resources.
+
+    :return: version
+    :rtype: str
+    """
+    if not _version:
+        try:
+            from importlib.metadata import PackageNotFoundError, version
+            try:
+                _version.append(version(PACKAGE))
+            except PackageNotFoundError:
+                _version.append(DEV_VERSION)
+        except ImportError:
+            import pkg_resources
+            try:
+                _version.append(str(
+                    pkg_resources.get_distribution(PACKAGE).parsed_version))
+            except pkg_resources.DistributionNotFound:
+                _version.append(DEV_VERSION)
+    return _version[0]
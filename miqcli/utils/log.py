@@ -14,16 +14,199 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
 import click
 
-__all__ = ['info', 'debug', 'error', 'warning', 'abort']
+from miqcli.constants import LOG_FLUSH_INTERVAL
+
+__all__ = ['info', 'debug', 'error', 'warning', 'abort', 'verbosity',
+           'flush', 'propagate']
+
+# verbose mode and logging settings set for the current thread, and the
+# logging settings of the last click context used by the thread
+_local = threading.local()
+
+# styles of the logging levels on a terminal
+_STYLES = {
+    'error': dict(bold=True, fg='red'),
+    'warning': dict(fg='yellow')
+}
+
+
+class _Writer(object):
+    """Writer of the log messages.
+
+    Messages logged while a command runs are written to the standard output
+    without flushing it, the stream buffers them along with anything else
+    written to it so the output stays in order. The stream is flushed once
+    the messages are older than the flush interval, a warning or an error is
+    logged, or the command is done.
+
+    A terminal flushes each line it is written, the messages are written to
+    its binary buffer instead. The next output line written to the terminal
+    (e.g. by click.echo) flushes them before it.
+
+    The standard output is looked up for each message, it is replaced by
+    the tests and the daemon.
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self._lock = threading.Lock()
+        self._stream = None
+        self._tty = False
+        self._since = 0
+
+    def isatty(self, stream):
+        """Tell whether the stream is a terminal.
+
+        :param stream: output stream
+        :type stream: file
+        :return: True if it is a terminal otherwise False
+        :rtype: bool
+        """
+        if stream is self._stream:
+            return self._tty
+        try:
+            return stream.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    def write(self, text, stream, buffered=True):
+        """Write the text to the stream, flushed at the latest after the
+        flush interval.
+
+        :param text: text, with its new line
+        :type text: str
+        :param stream: output stream
+        :type stream: file
+        :param buffered: False to flush the stream right away
+        :type buffered: bool
+        """
+        with self._lock:
+            if stream is not self._stream:
+                self._flush()
+                self._tty = self.isatty(stream)
+                self._stream = stream
+                self._since = time.time()
+            try:
+                if buffered and self._tty and \
+                        getattr(stream, 'line_buffering', False) and \
+                        hasattr(stream, 'buffer'):
+                    stream.buffer.write(text.encode(
+                        getattr(stream, 'encoding', None) or 'utf-8',
+                        'replace'))
+                else:
+                    try:
+                        stream.write(text)
+                    except (TypeError, UnicodeEncodeError):
+                        # python 2 byte stream
+                        stream.write(text.encode('utf-8'))
+            except ValueError:
+                # the stream was closed (e.g. by the click test runner)
+                return
+            if not buffered or \
+                    time.time() - self._since >= LOG_FLUSH_INTERVAL:
+                self._flush()
+
+    def flush(self):
+        """Flush the stream written to."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        """Flush the stream written to, the lock is held."""
+        if self._stream is not None:
+            try:
+                self._stream.flush()
+            except ValueError:
+                pass
+        self._since = time.time()
+
+
+_writer = _Writer()
+
+
+def _settings():
+    """Return the logging settings of the current thread.
+
+    The settings set by :func:`propagate` are used, otherwise the --verbose
+    and --log_format settings of the running command, read once per click
+    context. Messages logged outside of a command (e.g. by the
+    :class:`miqcli.api.Client` collections) are flushed right away.
+
+    :return: verbose mode, log format and buffered mode
+    :rtype: tuple
+    """
+    settings = getattr(_local, 'settings', None)
+    if settings is not None:
+        return settings
+
+    ctx = click.get_current_context(silent=True)
+    cached = getattr(_local, 'context', None)
+    if cached is not None and cached[0] is ctx:
+        return cached[1]
+
+    if ctx is None:
+        settings = (False, 'text', False)
+    else:
+        root = ctx.find_root()
+        settings = (bool(root.params.get('verbose')),
+                    root.params.get('log_format') or 'text', True)
+        if getattr(_local, 'root', None) is not root:
+            # flush the messages once the command is done
+            root.call_on_close(_writer.flush)
+            _local.root = root
+    _local.context = (ctx, settings)
+    return settings
+
+
+def propagate(func):
+    """Return the function logging with the settings of the calling thread.
+
+    Worker threads have no click context, the functions they run log with
+    the settings of the command submitting them.
+
+    Usage
+
+    .. code-block: python
+
+    pool.imap(log.propagate(submit), batches)
+
+    :param func: function run by another thread
+    :type func: function
+    :return: function
+    :rtype: function
+    """
+    settings = _settings()
+    verbose = getattr(_local, 'verbose', None)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        previous = (getattr(_local, 'settings', None),
+                    getattr(_local, 'verbose', None))
+        _local.settings = settings
+        _local.verbose = verbose
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.settings, _local.verbose = previous
+    return wrapper
 
 
 def __log(message, level, bold=False, fg=None):
     """Base function to log messages using click library.
 
     Function is private and not visible from other modules. Modules should
-    use the logging level functions to log messages.
+    use the logging level functions to log messages. Messages are written
+    as JSON lines with the json log format, they are only styled on a
+    terminal.
 
     :param message: Message content
     :type message: str
@@ -34,7 +217,28 @@ def __log(message, level, bold=False, fg=None):
     :param fg: Text foreground color
     :type fg: str
     """
-    click.secho('{0}: {1}'.format(level.upper(), message), bold=bold, fg=fg)
+    _, log_format, buffered = _settings()
+    stream = sys.stdout
+    if log_format == 'json':
+        text = json.dumps(dict(time=time.time(), level=level,
+                               message=message))
+    else:
+        text = u'{0}: {1}'.format(level.upper(), message)
+        if (bold or fg) and _writer.isatty(stream):
+            text = click.style(text, bold=bold, fg=fg)
+
+    # warnings and errors are written with the messages before them
+    _writer.write(text + u'\n', stream,
+                  buffered=buffered and level in ('info', 'debug'))
+
+
+def flush():
+    """Flush the log messages written to the standard output.
+
+    Code about to wait (e.g. between polls) or to write to the standard
+    error flushes them first.
+    """
+    _writer.flush()
 
 
 def info(message):
@@ -62,10 +266,47 @@ def debug(message):
     :param message: Message content
     :type message: str
     """
-    if click.get_current_context().find_root().params['verbose']:
+    if _verbose():
         __log(message, 'debug')
 
 
+def _verbose():
+    """Return the verbose mode of the current thread.
+
+    The mode set by :func:`verbosity` is used, otherwise the --verbose
+    option of the running command.
+
+    :return: verbose mode
+    :rtype: bool
+    """
+    verbose = getattr(_local, 'verbose', None)
+    if verbose is None:
+        verbose = _settings()[0]
+    return verbose
+
+
+@contextmanager
+def verbosity(verbose):
+    """Set the verbose mode of the debug messages logged by this thread.
+
+    Usage
+
+    .. code-block: python
+
+    with log.verbosity(True):
+        log.debug('Shown without the --verbose option.')
+
+    :param verbose: verbose mode, None to use the --verbose option
+    :type verbose: bool
+    """
+    previous = getattr(_local, 'verbose', None)
+    _local.verbose = verbose
+    try:
+        yield
+    finally:
+        _local.verbose = previous
+
+
 def error(message):
     """Error level messages.
 
@@ -76,7 +317,7 @@ def error(message):
     :param message: Message content
     :type message: str
     """
-    __log(message, 'error', bold=True, fg='red')
+    __log(message, 'error', **_STYLES['error'])
 
 
 def warning(message):
@@ -89,7 +330,7 @@ def warning(message):
     :param message: Message content
     :type message: str
     """
-    __log(message, 'warning', fg='yellow')
+    __log(message, 'warning', **_STYLES['warning'])
 
 
 def abort(message, rc=1):
@@ -0,0 +1,293 @@
+# Copyright (C) 2017 Red Hat, Inc.
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Watch module follows the state of many requests or tasks at once.
+
+Each poll requests the state of every watched resource still running
+with a single ``id = x or id = y ...`` query (one per chunk of ids). The
+time between polls grows exponentially while nothing changes, with a
+random part (jitter), and is reset by the next state change.
+"""
+
+import random
+import time
+from collections import namedtuple
+
+from manageiq_client.api import APIException
+from miqcli.constants import WATCH_BACKOFF, WATCH_CHUNK_SIZE, \
+    WATCH_INTERVAL, WATCH_JITTER, WATCH_MAX_INTERVAL, WATCHED_STATES
+from miqcli.filters import Or, Term, compile_filter
+from miqcli.query import AdvancedQuery
+from miqcli.utils import log
+
+__all__ = ['Event', 'WaitNotFound', 'WaitResult', 'WaitTimeout', 'Watcher',
+           'WATCHED_STATES']
+
+#: state change of a watched resource, previous is None for the first
+#: state received
+Event = namedtuple('Event', ['id', 'previous', 'state', 'status', 'message',
+                             'terminal'])
+
+#: outcome of a wait, latency is the seconds waited
+WaitResult = namedtuple('WaitResult', ['id', 'state', 'status', 'message',
+                                       'polls', 'latency'])
+
+
+class WaitTimeout(Exception):
+    """The resource did not reach the awaited states in time."""
+
+    def __init__(self, result):
+        """Constructor.
+
+        :param result: outcome of the wait
+        :type result: WaitResult
+        """
+        super(WaitTimeout, self).__init__(
+            'Timed out after {0:.1f}s waiting for {1}, state: {2}'.format(
+                result.latency, result.id, result.state))
+        self.result = result
+
+
+class WaitNotFound(Exception):
+    """The server does not return the resource waited for."""
+
+    def __init__(self, result):
+        """Constructor.
+
+        :param result: outcome of the wait
+        :type result: WaitResult
+        """
+        super(WaitNotFound, self).__init__(
+            '{0} not found after {1} polls'.format(result.id, result.polls))
+        self.result = result
+
+
+class Watcher(object):
+    """Watch requests or tasks until they reach a terminal state.
+
+    Iterating over the watcher polls the server and yields an
+    :class:`Event` for each state change. The iteration ends when every
+    resource reached a terminal state or when the timeout expired, the
+    resources still running are then left in :attr:`pending`.
+
+    Resources the server does not return (e.g. a mistyped or deleted id)
+    are reported once with a None state and are no longer watched, their
+    :meth:`result` raises :class:`WaitNotFound`.
+    """
+
+    def __init__(self, api, name, ids, states=None, interval=WATCH_INTERVAL,
+                 max_interval=WATCH_MAX_INTERVAL, backoff=WATCH_BACKOFF,
+                 jitter=WATCH_JITTER, timeout=None,
+                 chunk_size=WATCH_CHUNK_SIZE):
+        """Constructor.
+
+        :param api: client api object
+        :type api: ClientAPI
+        :param name: collection name, see :data:`WATCHED_STATES`
+        :type name: str
+        :param ids: resource ids
+        :type ids: list
+        :param states: states ending the watch, the collection terminal
+            states by default
+        :type states: tuple
+        :param interval: seconds between the first polls
+        :type interval: float
+        :param max_interval: maximum seconds between polls
+        :type max_interval: float
+        :param backoff: growth of the seconds between polls while no
+            resource changes
+        :type backoff: float
+        :param jitter: random part (fraction) of the seconds between polls
+        :type jitter: float
+        :param timeout: seconds to watch the resources, None for no limit
+        :type timeout: float
+        :param chunk_size: resources polled by each query
+        :type chunk_size: int
+        """
+        try:
+            self._state_attr, terminal = WATCHED_STATES[name]
+        except KeyError:
+            raise ValueError('Collection {0} cannot be watched, choose from: '
+                             '{1}'.format(name, ', '.join(
+                                 sorted(WATCHED_STATES))))
+        self._terminal = set(str(state).lower()
+                             for state in (states or terminal))
+        self._query = AdvancedQuery(getattr(api.client.collections, name))
+        self._fields = (self._state_attr, 'status', 'message')
+
+        self.ids = list()
+        for _id in ids:
+            if str(_id) not in self.ids:
+                self.ids.append(str(_id))
+
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+        # id -> last event received
+        self.events = dict()
+        # ids the server did not return
+        self.missing = set()
+        self.polls = 0
+        self.start()
+
+    @property
+    def pending(self):
+        """Ids of the resources not in a terminal state.
+
+        :return: resource ids
+        :rtype: list
+        """
+        return [_id for _id in self.ids
+                if _id not in self.events or not self.events[_id].terminal]
+
+    def poll(self):
+        """Poll the state of the pending resources once.
+
+        :return: events for the resources whose state changed
+        :rtype: list
+        """
+        pending = self.pending
+        found = dict()
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = pending[start:start + self.chunk_size]
+            filters = compile_filter(Or(*[Term('id', '=', _id)
+                                          for _id in chunk]))
+            for page in self._query._pages(filters, fields=self._fields):
+                for resource in page:
+                    found[str(resource.id)] = resource.__dict__
+        self.polls += 1
+
+        events = list()
+        for _id in pending:
+            data = found.get(_id)
+            if data is None:
+                event = Event(_id, self._state(_id), None, None,
+                              'not found', True)
+                self.missing.add(_id)
+            else:
+                state = data.get(self._state_attr)
+                event = Event(_id, self._state(_id), state,
+                              data.get('status'), data.get('message'),
+                              str(state).lower() in self._terminal)
+                if _id in self.events and event.state == event.previous:
+                    continue
+            self.events[_id] = event
+            events.append(event)
+        return events
+
+    def _state(self, _id):
+        """Return the last state received for the resource.
+
+        :param _id: resource id
+        :type _id: str
+        :return: state or None
+        :rtype: str
+        """
+        event = self.events.get(_id)
+        return event.state if event else None
+
+    def start(self):
+        """Start the watch clock, the timeout and the backoff are reset."""
+        self._started = time.time()
+        self._deadline = None
+        if self.timeout is not None:
+            self._deadline = self._started + self.timeout
+        self._interval = self.interval
+        self.elapsed = 0.0
+
+    def update(self):
+        """Poll the pending resources once, failed polls are only logged.
+
+        :return: events for the resources whose state changed
+        :rtype: list
+        """
+        try:
+            events = self.poll()
+        except APIException as e:
+            log.warning('Polling {0} failed: {1}'.format(
+                ', '.join(self.pending), e))
+            events = list()
+        self.elapsed = time.time() - self._started
+        return events
+
+    def delay(self, events):
+        """Return the seconds to wait before the next poll.
+
+        :param events: events of the last poll
+        :type events: list
+        :return: seconds or None when the watch is over
+        :rtype: float
+        """
+        if not self.pending:
+            return None
+
+        if events:
+            self._interval = self.interval
+        else:
+            self._interval = min(self._interval * self.backoff,
+                                 self.max_interval)
+
+        delay = self._interval * random.uniform(1 - self.jitter,
+                                                1 + self.jitter)
+        if self._deadline is not None:
+            delay = min(delay, self._deadline - time.time())
+            if delay <= 0:
+                return None
+        return delay
+
+    def result(self, _id):
+        """Return the outcome of the watch for a resource.
+
+        :param _id: resource id
+        :type _id: str
+        :return: outcome, with the poll count and the latency
+        :rtype: WaitResult
+        :raises WaitTimeout: the resource is still pending
+        :raises WaitNotFound: the server did not return the resource
+        """
+        event = self.events.get(str(_id))
+        result = WaitResult(str(_id), getattr(event, 'state', None),
+                            getattr(event, 'status', None),
+                            getattr(event, 'message', None),
+                            self.polls, self.elapsed)
+        if str(_id) in self.missing:
+            raise WaitNotFound(result)
+        if str(_id) in self.pending:
+            raise WaitTimeout(result)
+        return result
+
+    def __iter__(self):
+        """Poll the resources until they all reached a terminal state.
+
+        :return: generator of events
+        :rtype: generator
+        """
+        self.start()
+        while self.pending:
+            events = self.update()
+            for event in events:
+                yield event
+
+            delay = self.delay(events)
+            if delay is None:
+                break
+            # show the events logged so far while waiting
+            log.flush()
+            time.sleep(delay)
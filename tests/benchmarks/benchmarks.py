@@ -0,0 +1,330 @@
+"""Benchmarks of the miqcli hot paths against the mock ManageIQ server.
+
+Each benchmark runs in its own python process, against a mock server
+(``python -m miqcli.testing``) serving a synthetic inventory, and reports:
+
+* wall: seconds, median of the runs (wall_min is the fastest run)
+* round_trips: http requests sent
+* bytes_sent, bytes_received: http bodies sizes
+* peak_rss_kb: peak resident memory of the benchmark process
+
+Usage::
+
+    python tests/benchmarks/benchmarks.py -o results.json
+    python tests/benchmarks/benchmarks.py --sizes 1000,10000 \\
+        --only basic_query --compare results.json
+"""
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+import click
+
+#: benchmark name -> (function, sized), sized benchmarks run for each
+#: inventory size
+BENCHMARKS = OrderedDict()
+
+#: seconds between the states of the requests created by the mock server
+TRANSITION_TIME = 0.5
+
+#: provision requests created by the polling benchmarks
+POLLED_REQUESTS = 50
+
+PAYLOAD = {'email': 'user@example.com', 'tenant': 'tenant-0',
+           'image': 'template-0', 'network': 'network-0-0',
+           'flavor': 'm1.small'}
+
+
+def benchmark(sized=False):
+    """Register a benchmark, it returns the metrics it measured."""
+    def register(func):
+        BENCHMARKS[func.__name__] = (func, sized)
+        return func
+    return register
+
+
+class Counter(object):
+    """Count the http round trips and bytes of every session."""
+
+    def __init__(self):
+        self.round_trips = self.bytes_sent = self.bytes_received = 0
+
+    def install(self):
+        from requests.adapters import HTTPAdapter
+        send = HTTPAdapter.send
+        counter = self
+
+        def counted(adapter, request, *args, **kwargs):
+            response = send(adapter, request, *args, **kwargs)
+            counter.round_trips += 1
+            counter.bytes_sent += len(request.body or b'')
+            counter.bytes_received += len(response.content)
+            return response
+        HTTPAdapter.send = counted
+
+    def reset(self):
+        self.__init__()
+
+
+class Env(object):
+    """Benchmark environment, in the benchmark process."""
+
+    def __init__(self, url, token, size, home):
+        self.url, self.token, self.size, self.home = url, token, size, home
+        self.counter = Counter()
+        self.counter.install()
+
+        import miqcli.api
+        miqcli.api.TOKENFILE = os.path.join(home, 'auth')
+        miqcli.api.CACHE_DIR = home
+
+    def api(self):
+        from miqcli.api import ClientAPI
+        api = ClientAPI(dict(url=self.url, token=self.token))
+        api.connect()
+        return api
+
+    def create_requests(self, api, count):
+        requests = api.client.collections.provision_requests
+        return [r.id for r in requests.action.create(
+            *[dict(vm_fields={'vm_name': 'polled-%d' % i})
+              for i in range(count)])]
+
+
+def _rss_kb(who=resource.RUSAGE_SELF):
+    rss = resource.getrusage(who).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+@benchmark()
+def cold_start(env):
+    """Run ``miqcli --help`` in a new interpreter."""
+    env.start = time.time()
+    subprocess.check_call(
+        [sys.executable, '-c', 'from miqcli.cli import main; main()',
+         '--help'], stdout=subprocess.DEVNULL)
+    return {'peak_rss_kb': _rss_kb(resource.RUSAGE_CHILDREN)}
+
+
+@benchmark()
+def connect(env):
+    """Connect a client api, no cache."""
+    env.start = time.time()
+    env.api()
+
+
+@benchmark(sized=True)
+def basic_query(env):
+    """Query all the vms."""
+    from miqcli.query import BasicQuery
+    api = env.api()
+    env.counter.reset()
+    env.start = time.time()
+    return {'rows': len(BasicQuery(api.client.collections.vms)(None))}
+
+
+@benchmark(sized=True)
+def advanced_query(env):
+    """Query all the vms, one filter per vendor."""
+    from miqcli.query import AdvancedQuery
+    api = env.api()
+    env.counter.reset()
+    env.start = time.time()
+    return {'rows': len(AdvancedQuery(api.client.collections.vms)(
+        [('vendor', '=', 'openstack'), '|', ('vendor', '=', 'amazon')]))}
+
+
+@benchmark()
+def provision_create(env):
+    """Create 10 OpenStack provision requests, resolving their payloads."""
+    from miqcli.collections.provision_requests import Collections
+    api = env.api()
+    env.counter.reset()
+    env.start = time.time()
+    requests = Collections(api=api)
+    for i in range(10):
+        requests.create('OpenStack', json.dumps(dict(
+            PAYLOAD, vm_name='vm-bench-%d' % i)), None)
+
+
+@benchmark()
+def status_polling(env):
+    """Poll provision requests with ``status`` until they finish."""
+    from miqcli.collections.provision_requests import Collections
+    api = env.api()
+    ids = env.create_requests(api, POLLED_REQUESTS)
+    env.counter.reset()
+    env.start = time.time()
+    requests = Collections(api=api)
+    while ids:
+        ids = [_id for _id in ids
+               if requests.status(_id).request_state != 'finished']
+        time.sleep(0.1)
+
+
+@benchmark()
+def watch_polling(env):
+    """Poll provision requests with a watcher until they finish."""
+    from miqcli.watch import Watcher
+    api = env.api()
+    ids = env.create_requests(api, POLLED_REQUESTS)
+    env.counter.reset()
+    env.start = time.time()
+    list(Watcher(api, 'provision_requests', ids, interval=0.1, jitter=0))
+
+
+def run_benchmark(name, url, token, size):
+    """Run the benchmark in this process, return its metrics."""
+    home = tempfile.mkdtemp()
+    try:
+        env = Env(url, token, size, home)
+        env.start = time.time()
+        metrics = BENCHMARKS[name][0](env) or dict()
+        wall = time.time() - env.start
+    finally:
+        shutil.rmtree(home)
+
+    result = {'wall': wall, 'round_trips': env.counter.round_trips,
+              'bytes_sent': env.counter.bytes_sent,
+              'bytes_received': env.counter.bytes_received,
+              'peak_rss_kb': _rss_kb()}
+    result.update(metrics)
+    return result
+
+
+class Server(object):
+    """Mock server subprocess."""
+
+    def __init__(self, size):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'miqcli.testing', '--vms', str(size),
+             '--memoize', '--transition_time', str(TRANSITION_TIME)],
+            stdout=subprocess.PIPE)
+        self.url = self.process.stdout.readline().decode('utf-8').strip()
+        self.token = self.process.stdout.readline().decode('utf-8').strip()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _summary(output):
+    """Return the run summary, the JSON line written among the logs."""
+    for line in reversed(output.splitlines()):
+        try:
+            run = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(run, dict) and 'wall' in run:
+            return run
+    raise ValueError('No run summary in the output:\n' + output)
+
+
+def _runs(name, server, size, repeat):
+    """Run the benchmark processes, return the summary of the runs."""
+    runs = list()
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), '--child', name,
+             '--url', server.url, '--token', server.token,
+             '--sizes', str(size or 0)])
+        runs.append(_summary(output.decode('utf-8')))
+
+    result = OrderedDict([('name', name), ('size', size), ('runs', repeat)])
+    result['wall'] = statistics.median(run['wall'] for run in runs)
+    result['wall_min'] = min(run['wall'] for run in runs)
+    result['peak_rss_kb'] = max(run['peak_rss_kb'] for run in runs)
+    for key, value in sorted(runs[0].items()):
+        result.setdefault(key, value)
+    return result
+
+
+def _compare(results, baseline):
+    """Print the results against a baseline, by benchmark and size."""
+    base = dict(((r['name'], r['size']), r) for r in baseline['results'])
+    click.echo('{0:<18} {1:>7} {2:>9} {3:>9} {4:>7} {5:>13}'.format(
+        'benchmark', 'size', 'wall', 'baseline', 'ratio', 'round trips'),
+        err=True)
+    for result in results:
+        old = base.get((result['name'], result['size']))
+        if old is None:
+            continue
+        click.echo('{0:<18} {1:>7} {2:>9.3f} {3:>9.3f} {4:>7.2f} '
+                   '{5:>6}/{6:<6}'.format(
+                       result['name'], result['size'] or '-', result['wall'],
+                       old['wall'], result['wall'] / (old['wall'] or 1e-9),
+                       result['round_trips'], old['round_trips']), err=True)
+
+
+@click.command()
+@click.option('--sizes', default='1000,10000,100000',
+              help='Vms in the inventories, comma separated.')
+@click.option('--only', multiple=True, type=click.Choice(list(BENCHMARKS)),
+              help='Benchmarks to run, all by default.')
+@click.option('--repeat', default=3, type=int, help='Runs per benchmark.')
+@click.option('-o', '--output', type=click.File('w'),
+              help='Json results file, printed by default.')
+@click.option('--compare', type=click.File('r'),
+              help='Json results file to compare the results to.')
+@click.option('--child', help='Run this benchmark only, in this process.')
+@click.option('--url', help='Mock server url, for --child.')
+@click.option('--token', help='Mock server token, for --child.')
+def main(sizes, only, repeat, output, compare, child, url, token):
+    """Run the benchmarks."""
+    sizes = [int(size) for size in sizes.split(',')]
+    if child:
+        click.echo(json.dumps(run_benchmark(child, url, token, sizes[0])))
+        return
+
+    results = list()
+    for size in sizes:
+        server = Server(size)
+        try:
+            for name, (func, sized) in BENCHMARKS.items():
+                if only and name not in only:
+                    continue
+                if not sized and size != sizes[0]:
+                    continue
+                result = _runs(name, server, size if sized else None,
+                               repeat)
+                click.echo('{name:<18} {size!s:>7} {wall:>8.3f}s '
+                           '{round_trips:>6} round trips '
+                           '{bytes_received:>10} bytes '
+                           '{peak_rss_kb:>8} kB'.format(**result), err=True)
+                results.append(result)
+        finally:
+            server.stop()
+
+    report = OrderedDict([
+        ('commit', _git_commit()),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('timestamp', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('results', results)])
+    output = output or sys.stdout
+    json.dump(report, output, indent=2)
+    output.write('\n')
+    if compare:
+        _compare(results, json.load(compare))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""ManageIQ REST API stub server used by the functional tests.
+
+The functional tests use the mock server shipped in :mod:`miqcli.testing`,
+it records every request it receives so tests can assert on the HTTP
+calls made by the client.
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+
+from miqcli.testing.server import MOCK_TOKEN as STUB_TOKEN
+from miqcli.testing.server import MockServer as StubServer
+
+__all__ = ['StubServer', 'StubServerTestCase', 'STUB_TOKEN']
+
+
+class StubServerTestCase(TestCase):
+    """Test case running the client against stub servers.
+
+    Each test gets a temporary home directory holding the token file, the
+    caches and the configuration of the client. The servers started with
+    :meth:`start_server` are stopped after the test.
+    """
+
+    def setUp(self):
+        self.servers = list()
+        self.home = tempfile.mkdtemp()
+        self.patches = [
+            mock.patch('miqcli.api.TOKENFILE',
+                       os.path.join(self.home, 'auth')),
+            mock.patch('miqcli.api.CACHE_DIR', self.home),
+            mock.patch('miqcli.api.CFG_DIR', self.home)
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        for server in self.servers:
+            server.stop()
+        shutil.rmtree(self.home)
+
+    def start_server(self, resources=None, **kwargs):
+        """Start a stub server serving the resources.
+
+        :param resources: collection name -> resources
+        :type resources: dict
+        :param kwargs: other stub server settings
+        :return: stub server
+        :rtype: StubServer
+        """
+        server = StubServer(resources, **kwargs)
+        server.start()
+        self.servers.append(server)
+        return server
@@ -0,0 +1,116 @@
+import sys
+import threading
+import time
+from unittest import skipIf
+
+import mock
+from nose.tools import assert_equal
+
+from miqcli.utils import log
+from stub_server import StubServerTestCase, STUB_TOKEN
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from manageiq_client.api import APIException
+    from miqcli.aio import AsyncClient
+
+TASKS = [
+    {'id': str(i), 'name': 'task %s' % i, 'state': 'Queued', 'status': 'Ok',
+     'message': 'queued'}
+    for i in range(1, 21)
+]
+
+
+@skipIf(sys.version_info < (3, 5), 'asyncio client requires python 3.5+')
+class TestAsyncClient(StubServerTestCase):
+    """Test aio module against a stub server"""
+
+    def setUp(self):
+        super(TestAsyncClient, self).setUp()
+        self.tasks = [dict(task) for task in TASKS]
+        self.server = self.start_server({'tasks': self.tasks})
+        self.client = AsyncClient(
+            {'url': self.server.url, 'token': STUB_TOKEN}, concurrency=4)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+        self.client.close()
+        super(TestAsyncClient, self).tearDown()
+
+    def run_all(self, coroutines):
+        return self.loop.run_until_complete(asyncio.gather(*coroutines))
+
+    def test_async_client_collection_actions(self):
+        """Test AsyncClient runs the collection actions concurrently"""
+        tasks = self.client.collection('tasks')
+        results = self.run_all([tasks.status(str(i)) for i in range(1, 21)])
+        assert_equal([task.name for task in results],
+                     ['task %s' % i for i in range(1, 21)])
+
+    def test_async_client_concurrency_limit(self):
+        """Test AsyncClient bounds the actions in flight"""
+        lock = threading.Lock()
+        running, peak = [0], [0]
+
+        def action(name, action, args, kwargs):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return action
+
+        with mock.patch.object(self.client, '_action', action):
+            results = self.run_all([self.client.call('tasks', 'status')
+                                    for _ in range(20)])
+        assert_equal(results, ['status'] * 20)
+        assert peak[0] <= 4
+
+    @mock.patch('time.sleep')
+    def test_async_client_wait_for(self, sleep):
+        """Test AsyncClient.wait_for sleeps in the event loop"""
+        def finish(delay):
+            for task in self.tasks:
+                task['state'] = 'Finished'
+            done = self.loop.create_future()
+            done.set_result(None)
+            return done
+
+        with mock.patch('asyncio.sleep', new=finish):
+            results = self.run_all([
+                self.client.wait_for('tasks', str(i), interval=1)
+                for i in range(1, 4)])
+
+        assert_equal([r.state for r in results], ['Finished'] * 3)
+        assert all(r.polls <= 2 for r in results)
+        assert_equal(sleep.call_count, 0)
+
+    def test_async_client_action_aborted(self):
+        """Test AsyncClient raises the aborted actions as API errors"""
+        def action(name, action, args, kwargs):
+            if args:
+                log.abort('Unable to run %s.' % action)
+            return action
+
+        with mock.patch.object(self.client, '_action', action):
+            results = self.loop.run_until_complete(asyncio.gather(
+                self.client.call('tasks', 'delete', '1'),
+                self.client.call('tasks', 'status'),
+                return_exceptions=True))
+        assert isinstance(results[0], APIException)
+        assert_equal(results[1], 'status')
+
+    def test_async_client_event_loops(self):
+        """Test AsyncClient runs the actions in several event loops"""
+        tasks = self.client.collection('tasks')
+        for _ in range(2):
+            loop = asyncio.new_event_loop()
+            try:
+                task = loop.run_until_complete(tasks.status('1'))
+            finally:
+                loop.close()
+            assert_equal(task.name, 'task 1')
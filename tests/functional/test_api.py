@@ -1,6 +1,8 @@
 import os
+import shutil
 import stat
 import tempfile
+import time
 
 from unittest import TestCase
 from requests.exceptions import ConnectionError
@@ -8,6 +10,7 @@ import mock
 from nose.tools import assert_is_none, assert_equal, raises
 
 from miqcli import api
+from stub_server import StubServerTestCase, STUB_TOKEN
 
 #: token value from tests/assets/auth_token
 AUTH_TOKEN_VALUE = '78asdjasd7nasd90asdmzxc90'
@@ -112,7 +115,7 @@ class TestApi(TestCase):
         """Test api.ClientAPI._get_from_auth_file when file doesn't exit"""
         assert_is_none(self.cli_emptysettings._get_from_auth_file())
 
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
     def test_clientapi_validate_token(self, mock_requests_get_func):
         """Test api.ClientAPI._valid_token function"""
         # mock a valid token (response 200)
@@ -126,10 +129,11 @@ class TestApi(TestCase):
             self.cli_emptysettings._valid_token(token=FAKE_AUTH_TOKEN_VALUE),
             False)
 
-    @mock.patch('miqcli.api.TOKENFILE', 'tests/assets/auth_token')
-    @mock.patch('requests.get')
+    @mock.patch('miqcli.api.TOKENFILE', TEMP_AUTH_TOKEN.name)
+    @mock.patch('requests.Session.get')
     def test_clientapi_build_token_none_is_given(self, mock_requests_get_func):
         """Test api.ClientAPI._build_token function when none is given"""
+        shutil.copyfile('tests/assets/auth_token', TEMP_AUTH_TOKEN.name)
         # mock a valid token (response 200)
         mock_requests_get_func.return_value.status_code = 200
         new_client = api.ClientAPI({})
@@ -137,7 +141,7 @@ class TestApi(TestCase):
         assert_equal(new_client.token, AUTH_TOKEN_VALUE)
 
     @raises(SystemExit)
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
     def test_clientapi_build_token_invalid_is_given(
         self, mock_requests_get_func):
         """Test api.ClientAPI._build_token func when given token is not valid"""
@@ -159,7 +163,7 @@ class TestApi(TestCase):
         new_client._generate_token()
 
     @raises(SystemExit)
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
     def test_clientapi_generate_token_auth_fails(self, mock_requests_get_func):
         """Test api.ClientAPI._generate_token when authentication fails"""
         mock_requests_get_func.return_value.status_code = 401
@@ -167,9 +171,129 @@ class TestApi(TestCase):
         new_client._generate_token()
 
     @raises(SystemExit)
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
     def test_clientapi_generate_token_conn_error(self, mock_requests_get_func):
         """Test api.ClientAPI._generate_token throws ConnectionError"""
         mock_requests_get_func.side_effect = ConnectionError()
         new_client = api.ClientAPI({})
         new_client._generate_token()
+
+    @mock.patch('miqcli.api.TOKENFILE', TEMP_AUTH_TOKEN.name)
+    def test_clientapi_write_tokenfile_metadata(self):
+        """Test api.ClientAPI._set_auth_file saves the token metadata"""
+        self.cli_withsettings._set_auth_file(FAKE_AUTH_TOKEN_VALUE, 10.0, 600)
+        data = self.cli_withsettings._read_auth_file()
+        assert_equal(data['token'], FAKE_AUTH_TOKEN_VALUE)
+        assert_equal(data['issued'], 10.0)
+        assert_equal(data['token_ttl'], 600)
+        assert_equal(data['url'], 'https://mydomain.com/api')
+        assert_equal(data['username'], 'johnny')
+
+    @mock.patch('miqcli.api.TOKENFILE', TEMP_AUTH_TOKEN.name)
+    @mock.patch('requests.Session.get')
+    def test_clientapi_build_token_fresh_is_not_validated(
+        self, mock_requests_get_func):
+        """Test api.ClientAPI._build_token skips validating a fresh token"""
+        self.cli_emptysettings._set_auth_file(
+            FAKE_AUTH_TOKEN_VALUE, time.time(), 600)
+        new_client = api.ClientAPI({})
+        new_client._build_token()
+        assert_equal(new_client.token, FAKE_AUTH_TOKEN_VALUE)
+        assert_equal(mock_requests_get_func.call_count, 0)
+
+    @mock.patch('miqcli.api.TOKENFILE', TEMP_AUTH_TOKEN.name)
+    @mock.patch('requests.Session.get')
+    def test_clientapi_build_token_expired_is_regenerated(
+        self, mock_requests_get_func):
+        """Test api.ClientAPI._build_token generates a token once expired"""
+        self.cli_emptysettings._set_auth_file(
+            FAKE_AUTH_TOKEN_VALUE, time.time() - 600, 600)
+        mock_requests_get_func.return_value.status_code = 200
+        mock_requests_get_func.return_value.json.return_value = {
+            'auth_token': AUTH_TOKEN_VALUE, 'token_ttl': 300}
+        new_client = api.ClientAPI({})
+        new_client._build_token()
+        assert_equal(new_client.token, AUTH_TOKEN_VALUE)
+        assert_equal(mock_requests_get_func.call_count, 1)
+        assert_equal(new_client._read_auth_file()['token_ttl'], 300)
+
+    @mock.patch('miqcli.api.TOKENFILE', TEMP_AUTH_TOKEN.name)
+    @mock.patch('requests.Session.get')
+    def test_clientapi_build_token_other_url_is_validated(
+        self, mock_requests_get_func):
+        """Test api.ClientAPI._build_token validates a token of another url"""
+        self.cli_withsettings._set_auth_file(
+            FAKE_AUTH_TOKEN_VALUE, time.time(), 600)
+        mock_requests_get_func.return_value.status_code = 200
+        new_client = api.ClientAPI({})
+        new_client._build_token()
+        assert_equal(new_client.token, FAKE_AUTH_TOKEN_VALUE)
+        assert_equal(mock_requests_get_func.call_count, 1)
+
+    @mock.patch('miqcli.api.TOKENFILE', TEMP_AUTH_TOKEN.name)
+    @mock.patch('requests.Session.get')
+    def test_clientapi_reauthenticate(self, mock_requests_get_func):
+        """Test api.ClientAPI._reauthenticate replaces a rejected token"""
+        mock_requests_get_func.return_value.status_code = 200
+        mock_requests_get_func.return_value.json.return_value = {
+            'auth_token': AUTH_TOKEN_VALUE}
+        assert_equal(self.cli_emptysettings._reauthenticate(), AUTH_TOKEN_VALUE)
+        assert_equal(self.cli_emptysettings.token, AUTH_TOKEN_VALUE)
+        assert_equal(
+            self.cli_emptysettings._get_from_auth_file(), AUTH_TOKEN_VALUE)
+
+    @raises(SystemExit)
+    @mock.patch('requests.Session.get')
+    def test_clientapi_reauthenticate_given_token(self, mock_requests_get_func):
+        """Test api.ClientAPI._reauthenticate aborts for a given token"""
+        mock_requests_get_func.return_value.status_code = 200
+        self.cli_withsettings._build_token(token='abcd1234')
+        self.cli_withsettings._reauthenticate()
+
+    def test_clientapi_session_settings(self):
+        """Test api.ClientAPI.session pool size and timeouts settings"""
+        new_client = api.ClientAPI({'pool_size': 4, 'read_timeout': 5})
+        adapter = new_client.session.get_adapter('https://mydomain.com/api')
+        assert_equal(adapter._pool_maxsize, 4)
+        assert_equal(adapter._timeout, (10, 5))
+        assert_equal(new_client.session.verify, False)
+
+    @mock.patch('requests.adapters.HTTPAdapter.send')
+    def test_clientapi_session_default_timeout(self, mock_send_func):
+        """Test api.ClientAPI.session applies the default timeouts"""
+        mock_send_func.side_effect = ConnectionError()
+        with self.assertRaises(SystemExit):
+            self.cli_emptysettings._valid_token(token=FAKE_AUTH_TOKEN_VALUE)
+        assert_equal(mock_send_func.call_args[1]['timeout'], (10, 120))
+
+    def test_clientapi_round_trips(self):
+        """Test api.ClientAPI.round_trips counts the session responses"""
+        round_trips = self.cli_emptysettings.round_trips
+        assert round_trips in self.cli_emptysettings.session.hooks['response']
+
+        for method in ('GET', 'POST', 'GET'):
+            round_trips(mock.Mock(request=mock.Mock(method=method)))
+        assert_equal(round_trips.count, 3)
+        assert_equal(round_trips.by_method('get'), 2)
+
+        round_trips.reset()
+        assert_equal(round_trips.count, 0)
+
+
+class TestApiStubServer(StubServerTestCase):
+    """Test API module against a stub server"""
+
+    def test_clientapi_stale_token_reauthenticates(self):
+        """Test a fresh looking token rejected by the server is regenerated"""
+        server = self.start_server({'tasks': []})
+        cli = api.ClientAPI({'url': server.url, 'username': 'admin',
+                             'password': 'smartvm'})
+        cli._set_auth_file('staletoken1234', time.time(), 3600)
+        cli.connect()
+
+        # the token is not validated, the rejected request is retried once
+        assert_equal([call[:2] for call in server.calls],
+                     [('GET', '/api'), ('GET', '/api/auth'),
+                      ('GET', '/api')])
+        assert_equal(cli._read_auth_file()['token'], STUB_TOKEN)
+        assert_equal(cli.client._version, server._httpd.version)
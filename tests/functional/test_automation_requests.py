@@ -0,0 +1,37 @@
+from click.testing import CliRunner
+from nose.tools import assert_equal
+
+from miqcli.cli.main import cli
+from miqcli.constants import OSP_FIP_PAYLOAD
+from stub_server import StubServerTestCase, STUB_TOKEN
+
+
+class TestAutomationRequests(StubServerTestCase):
+    """Test automation_requests collection against a stub server"""
+
+    def setUp(self):
+        super(TestAutomationRequests, self).setUp()
+        self.server = self.start_server(
+            {'automation_requests': []},
+            actions={'automation_requests': ['create']})
+
+    def invoke(self, *args):
+        return CliRunner().invoke(
+            cli, ['--url', self.server.url, '--token', STUB_TOKEN,
+                  'automation_requests', 'create'] + list(args))
+
+    def test_automation_requests_fip_payload_unchanged(self):
+        """Test automation_requests create leaves the fip payload as is"""
+        result = self.invoke('--method', 'release_floating_ip',
+                             '--payload', '{"floating_ip": "10.0.0.1"}')
+        assert_equal(result.exception, None)
+        result = self.invoke('--method', 'gen_floating_ip', '--payload', '{}')
+        assert_equal(result.exception, None)
+
+        posted = [call[2]['resources'][0] for call in self.server.calls
+                  if call[0] == 'POST']
+        assert_equal([p['uri_parts']['instance'] for p in posted],
+                     ['release_floating_ip', 'get_floating_ip'])
+        assert 'floating_ip' not in posted[1]['parameters']
+        assert_equal(OSP_FIP_PAYLOAD['uri_parts']['instance'],
+                     'get_floating_ip')
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+import mock
+from click.testing import CliRunner
+from nose.tools import assert_equal, assert_is_none
+
+from miqcli.cache import FileCache, LRUCache
+from miqcli.cli.main import cli
+
+
+class TestCache(TestCase):
+    """Test cache module"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache', 'test.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_cache_get_missing(self):
+        """Test cache.FileCache.get when the file doesn't exist"""
+        assert_is_none(FileCache(self.path).get('key'))
+        assert_equal(FileCache(self.path).get('key', 'default'), 'default')
+
+    def test_cache_set_persists(self):
+        """Test cache.FileCache.set saves the entry on disk"""
+        FileCache(self.path).set('key', {'a': [1, 2]})
+        assert_equal(FileCache(self.path).get('key'), {'a': [1, 2]})
+
+    def test_cache_ttl_expiry(self):
+        """Test cache.FileCache.get ignores expired entries"""
+        cache = FileCache(self.path, ttl=60)
+        cache.set('key', 'value')
+        assert_equal(cache.get('key'), 'value')
+        with mock.patch('time.time', return_value=time.time() + 61):
+            assert_is_none(cache.get('key'))
+
+    def test_cache_corrupted_file(self):
+        """Test cache.FileCache treats a corrupted file as empty"""
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as fp:
+            fp.write('{not json')
+        cache = FileCache(self.path)
+        assert_is_none(cache.get('key'))
+        cache.set('key', 'value')
+        assert_equal(FileCache(self.path).get('key'), 'value')
+
+    def test_cache_delete_and_clear(self):
+        """Test cache.FileCache.delete and clear remove entries"""
+        cache = FileCache(self.path)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.delete('a')
+        assert_is_none(FileCache(self.path).get('a'))
+        assert_equal(FileCache(self.path).get('b'), 2)
+        cache.clear()
+        assert_equal(os.path.exists(self.path), False)
+        assert_is_none(cache.get('b'))
+
+    def test_lru_cache_eviction(self):
+        """Test cache.LRUCache evicts the least recently used entry"""
+        cache = LRUCache(2)
+        cache.set(('a',), 1)
+        cache.set(('b',), 2)
+        assert_equal(cache.get(('a',)), 1)
+        cache.set(('c',), 3)
+        assert_is_none(cache.get(('b',)))
+        assert_equal(cache.get(('a',)), 1)
+        assert_equal(len(cache), 2)
+
+    def test_lru_cache_ttl_expiry(self):
+        """Test cache.LRUCache.get ignores expired entries"""
+        cache = LRUCache(10, ttl=60)
+        cache.set(('a',), 1)
+        with mock.patch('time.time', return_value=time.time() + 61):
+            assert_is_none(cache.get(('a',)))
+        assert_equal(len(cache), 0)
+
+    def test_lru_cache_store(self):
+        """Test cache.LRUCache persists the entries in the store"""
+        LRUCache(10, store=FileCache(self.path), namespace='x').set(
+            ('a', None), 1)
+        cache = LRUCache(10, store=FileCache(self.path), namespace='x')
+        assert_equal(cache.get(('a', None)), 1)
+        assert_is_none(LRUCache(10, store=FileCache(self.path),
+                                namespace='y').get(('a', None)))
+
+        cache.clear()
+        assert_is_none(LRUCache(10, store=FileCache(self.path),
+                                namespace='x').get(('a', None)))
+
+    def test_lru_cache_store_keeps_stored_time(self):
+        """Test cache.LRUCache entries loaded from the store keep their age"""
+        now = time.time()
+        LRUCache(10, ttl=60, store=FileCache(self.path)).set(('a',), 1)
+        cache = LRUCache(10, ttl=60, store=FileCache(self.path))
+        with mock.patch('time.time', return_value=now + 30):
+            assert_equal(cache.get(('a',)), 1)
+        with mock.patch('time.time', return_value=now + 61):
+            assert_is_none(cache.get(('a',)))
+        assert_equal(len(cache), 0)
+
+    def test_cache_clear_command(self):
+        """Test the cache clear command removes the cache files"""
+        FileCache(self.path).set('key', 'value')
+        api = mock.Mock()
+        cli.client_apis = {'settings': api}
+        try:
+            with mock.patch('miqcli.cli.cache.CACHE_DIR',
+                            os.path.dirname(self.path)):
+                result = CliRunner().invoke(cli, ['cache', 'clear'])
+        finally:
+            cli.client_apis = None
+        assert_equal(result.exception, None)
+        assert u'Cleared 1 cache file(s).' in result.output
+        assert_is_none(FileCache(self.path).get('key'))
+        api.clear_caches.assert_called_once_with()
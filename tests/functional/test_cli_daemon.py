@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from io import StringIO
+from unittest import TestCase
+
+import mock
+from nose.tools import assert_equal, assert_is_none
+
+import miqcli
+from miqcli.cli import daemon
+from stub_server import StubServer, STUB_TOKEN
+
+TASKS = [
+    {'id': '42', 'name': 'task 42', 'state': 'Finished', 'status': 'Ok',
+     'message': 'done'}
+]
+
+
+class TestCliDaemon(TestCase):
+    """Test cli daemon module"""
+
+    def setUp(self):
+        self.server = StubServer({'tasks': TASKS})
+        self.server.start()
+        self.home = tempfile.mkdtemp()
+        self.socket = os.path.join(self.home, 'daemon.sock')
+
+        env = dict(os.environ, HOME=self.home, PYTHONPATH=os.path.dirname(
+            os.path.dirname(miqcli.__file__)))
+        self.daemon = subprocess.Popen(
+            [sys.executable, '-c', 'from miqcli.cli.daemon import serve; '
+                                   'serve(%r)' % self.socket],
+            env=env, cwd=self.home)
+        for _ in range(100):
+            if os.path.exists(self.socket):
+                break
+            time.sleep(0.1)
+
+    def tearDown(self):
+        daemon.stop(self.socket)
+        self.daemon.wait()
+        self.server.stop()
+        shutil.rmtree(self.home)
+
+    def forward(self, *args):
+        with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+            rc = daemon.forward(
+                ['--url', self.server.url, '--token', STUB_TOKEN] +
+                list(args), self.socket)
+        return rc, stdout.getvalue()
+
+    def test_daemon_forward(self):
+        """Test cli.daemon.forward runs the command in the daemon"""
+        rc, output = self.forward('tasks', 'status', '42')
+        assert_equal(rc, 0)
+        assert u'Name: task 42' in output
+
+        # the connected client api is reused by the next command
+        del self.server.calls[:]
+        rc, output = self.forward('tasks', 'status', '42')
+        assert_equal(rc, 0)
+        assert u'Name: task 42' in output
+        assert_equal([call for call in self.server.calls
+                      if call[1] in ('/api', '/api/auth')], [])
+
+    def test_daemon_forward_exit_code(self):
+        """Test cli.daemon.forward returns the command exit code"""
+        rc, output = self.forward('tasks', 'invalid')
+        assert_equal(rc, 1)
+        assert u'Command "invalid" is invalid' in output
+
+    def test_daemon_forward_disabled(self):
+        """Test cli.daemon.forward is bypassed by the environment"""
+        with mock.patch.dict(os.environ, {daemon.NO_DAEMON_ENV: '1'}):
+            assert_is_none(daemon.forward(['tasks', 'status'], self.socket))
+
+    def test_daemon_forward_not_running(self):
+        """Test cli.daemon.forward without a running daemon"""
+        daemon.stop(self.socket)
+        self.daemon.wait()
+        assert_is_none(daemon.forward(['tasks', 'status'], self.socket))
+
+    def test_daemon_frame_writer(self):
+        """Test cli.daemon frames hold the bytes of the buffers written"""
+        ours, theirs = socket.socketpair()
+        try:
+            writer = daemon._FrameWriter(ours, daemon._STDOUT)
+            assert_equal(writer.write(memoryview(b'output\n')), 7)
+            assert_equal(daemon._recv_frame(theirs),
+                         (daemon._STDOUT, b'output\n'))
+        finally:
+            ours.close()
+            theirs.close()
+
+    def test_daemon_command_not_forwarded(self):
+        """Test cli.daemon does not run the daemon command in the daemon"""
+        assert_is_none(daemon.forward(['--verbose', 'daemon', '--stop'],
+                                      self.socket))
+
+        # sent anyway, the daemon refuses it and keeps serving
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket)
+            daemon._send_frame(sock, daemon._REQUEST, json.dumps(dict(
+                args=['--verbose', 'daemon', '--stop'],
+                cwd=self.home)).encode('utf-8'))
+            frames = list(iter(lambda: daemon._recv_frame(sock),
+                               (None, None)))
+        finally:
+            sock.close()
+        assert_equal(frames[-1], (daemon._EXIT, b'2'))
+        assert b'cannot be run by the miqcli daemon' in b''.join(
+            payload for channel, payload in frames
+            if channel == daemon._STDERR)
+
+        rc, output = self.forward('tasks', 'status', '42')
+        assert_equal(rc, 0)
+
+    def test_daemon_default_socket(self):
+        """Test cli.daemon.serve creates the folder of its socket"""
+        home = tempfile.mkdtemp()
+        path = os.path.join(home, '.miqcli', 'daemon.sock')
+        process = subprocess.Popen(
+            [sys.executable, '-c', 'from miqcli.cli.daemon import serve; '
+                                   'serve()'],
+            env=dict(os.environ, HOME=home, PYTHONPATH=os.path.dirname(
+                os.path.dirname(miqcli.__file__))), cwd=home)
+        try:
+            for _ in range(100):
+                if os.path.exists(path) or process.poll() is not None:
+                    break
+                time.sleep(0.1)
+            assert os.path.exists(path)
+        finally:
+            daemon.stop(path)
+            process.wait()
+            shutil.rmtree(home)
+        assert_equal(process.returncode, 0)
@@ -0,0 +1,75 @@
+import io
+import threading
+
+import click
+import mock
+from nose.tools import assert_equal, assert_is_none
+
+from miqcli.api import Client
+from miqcli.utils import log
+from stub_server import StubServerTestCase, STUB_TOKEN
+
+
+def _tasks(prefix):
+    return [{'id': str(i), 'name': '%s task %s' % (prefix, i),
+             'state': 'Queued', 'status': 'Ok', 'message': 'queued'}
+            for i in range(1, 11)]
+
+
+class TestClient(StubServerTestCase):
+    """Test api.Client against stub servers"""
+
+    def setUp(self):
+        super(TestClient, self).setUp()
+        for name in ('one', 'two'):
+            self.start_server({'tasks': _tasks(name)})
+
+    def client(self, server, verbose=False):
+        return Client({'url': server.url, 'token': STUB_TOKEN},
+                      verbose=verbose)
+
+    def test_client_no_click_context(self):
+        """Test api.Client does not push a click context"""
+        client = self.client(self.servers[0])
+        assert_is_none(click.get_current_context(silent=True))
+
+        client.collection = 'tasks'
+        assert_equal(client.collection.status('3').name, 'one task 3')
+
+    def test_client_threads(self):
+        """Test api.Client objects used from several threads"""
+        clients = [self.client(server) for server in self.servers]
+        results, errors = dict(), list()
+
+        def run(index, client, task_id):
+            try:
+                client.collection = 'tasks'
+                results[index] = client.collection.status(task_id).name
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(
+            i, clients[i % 2], str(i % 10 + 1))) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert_equal(errors, [])
+        assert_equal(results, dict(
+            (i, '%s task %s' % (('one', 'two')[i % 2], i % 10 + 1))
+            for i in range(20)))
+
+    def test_client_verbose(self):
+        """Test api.Client collections use the client verbose mode"""
+        client = self.client(self.servers[0])
+        assert_equal(client.get_collection('tasks').verbose, False)
+        client = self.client(self.servers[0], verbose=True)
+        assert_equal(client.get_collection('tasks').verbose, True)
+
+        stream = io.StringIO()
+        with mock.patch('sys.stdout', stream):
+            with log.verbosity(True):
+                log.debug('shown')
+            log.debug('hidden')
+        assert_equal(stream.getvalue(), u'DEBUG: shown\n')
@@ -0,0 +1,183 @@
+import mock
+from click.testing import CliRunner
+from nose.tools import assert_equal
+
+from miqcli.cli.main import cli
+from stub_server import StubServerTestCase, STUB_TOKEN
+
+TASKS = [
+    {'id': '41', 'name': 'task 41', 'state': 'Queued', 'status': 'Ok',
+     'message': 'queued'},
+    {'id': '42', 'name': 'task 42', 'state': 'Finished', 'status': 'Ok',
+     'message': 'done'}
+]
+
+VMS = [
+    {'id': str(i), 'name': 'vm%s' % i, 'vendor': 'openstack',
+     'ipaddresses': ['10.0.0.%s' % i],
+     'ext_management_system': {'name': 'osp' if i % 2 else 'aws'}}
+    for i in range(1, 21)
+]
+
+
+class TestCollections(StubServerTestCase):
+    """Test collections against a stub server"""
+
+    def setUp(self):
+        super(TestCollections, self).setUp()
+        self.runner = CliRunner()
+        self.server = self.start_server(
+            {'tasks': list(TASKS), 'vms': VMS},
+            virtual={'vms': ['ipaddresses']}, actions={'vms': ['delete']})
+
+    def invoke(self, *args):
+        return self.runner.invoke(
+            cli, ['--url', self.server.url, '--token', STUB_TOKEN] +
+            list(args))
+
+    def test_collections_status_no_list_calls(self):
+        """Test tasks status <id> does not list the collection"""
+        result = self.invoke('tasks', 'status', '42')
+        assert_equal(result.exception, None)
+        assert u'Name: task 42' in result.output
+        assert_equal(self.server.list_calls('tasks'), [])
+
+    def test_collections_all_is_lazy_and_memoized(self):
+        """Test CollectionsMixin.all lists the collection once on access"""
+        self.server._httpd.resources['zones'] = [
+            {'id': '1', 'name': 'default', 'description': 'Default Zone'}]
+
+        result = self.invoke('zones', 'query')
+        assert_equal(result.exception, None)
+        assert u'Name: default' in result.output
+        assert_equal(len(self.server.list_calls('zones')), 1)
+
+    def test_collections_entry_point_is_cached(self):
+        """Test a warm start neither validates the token nor loads /api"""
+        result = self.runner.invoke(
+            cli, ['--url', self.server.url, 'tasks', 'status', '42'])
+        assert_equal(result.exception, None)
+        del self.server.calls[:]
+
+        result = self.runner.invoke(
+            cli, ['--url', self.server.url, 'tasks', 'status', '42'])
+        assert_equal(result.exception, None)
+        assert u'Name: task 42' in result.output
+        assert_equal([call for call in self.server.calls
+                      if call[1] in ('/api', '/api/auth')], [])
+
+    def test_collections_query_attributes_single_request(self):
+        """Test vms query --attr fetches the attributes with the query"""
+        result = self.invoke('vms', 'query', '--provider', 'osp',
+                             '--attr', 'ipaddresses')
+        assert_equal(result.exception, None)
+        assert u'NAME: vm19' in result.output
+        assert u"IPADDRESSES: ['10.0.0.19']" in result.output
+        assert_equal(len([call for call in self.server.collection_calls('vms')
+                          if call[0] == 'GET']), 1)
+
+    @mock.patch('miqcli.query.BaseQuery.page_size', 6)
+    def test_collections_query_pages(self):
+        """Test vms query requests the resources one page at a time"""
+        result = self.invoke('vms', 'query')
+        assert_equal(result.exception, None)
+        assert u'NAME: vm1\n' in result.output
+        assert u'NAME: vm20\n' in result.output
+
+        calls = [call for call in self.server.collection_calls('vms')
+                 if call[0] == 'GET']
+        assert_equal([call[2]['offset'] for call in calls],
+                     [['0'], ['6'], ['12'], ['18']])
+        assert_equal(set(call[2]['limit'][0] for call in calls), set(['6']))
+
+    @mock.patch('miqcli.query.BaseQuery.page_size', 5)
+    def test_collections_query_filtered_pages(self):
+        """Test vms query pages through the filtered resources"""
+        result = self.invoke('vms', 'query', '--provider', 'osp')
+        assert_equal(result.exception, None)
+        assert_equal(result.output.count(u'NAME: vm'), 10)
+
+        calls = [call for call in self.server.collection_calls('vms')
+                 if call[0] == 'GET']
+        assert_equal(len(calls), 2)
+
+    def test_collections_query_projection(self):
+        """Test vms query only requests the printed attributes"""
+        result = self.invoke('vms', 'query', 'vm3', '--attr', 'vendor')
+        assert_equal(result.exception, None)
+        assert u'VENDOR: openstack' in result.output
+
+        calls = [call for call in self.server.collection_calls('vms')]
+        assert_equal(len(calls), 1)
+        assert_equal(calls[0][2]['attributes'], ['id,name,vendor'])
+
+    def test_collections_query_verbose_no_projection(self):
+        """Test vms query requests all attributes when verbose"""
+        result = self.runner.invoke(
+            cli, ['--url', self.server.url, '--token', STUB_TOKEN, '--verbose',
+                  'vms', 'query', 'vm3'])
+        assert_equal(result.exception, None)
+        assert u'VENDOR: openstack' in result.output
+
+        calls = self.server.collection_calls('vms')
+        assert_equal(len(calls), 1)
+        assert 'attributes' not in calls[0][2]
+
+    def test_collections_status_projection(self):
+        """Test tasks status only requests the printed attributes"""
+        result = self.invoke('tasks', 'status')
+        assert_equal(result.exception, None)
+        assert u'NAME: task 41' in result.output
+        assert u'task 42' not in result.output
+
+        calls = self.server.collection_calls('tasks')
+        assert_equal(len(calls), 1)
+        assert_equal(calls[0][2]['attributes'],
+                     ['id,name,state,status,message'])
+
+    def test_collections_delete_all_matching(self):
+        """Test vms delete --all_matching deletes the vms in batches"""
+        self.server._httpd.reject = lambda resource: \
+            'vm locked' if resource['href'].endswith('/vms/5') else None
+        result = self.invoke('vms', 'delete', '--provider', 'osp',
+                             '--all_matching', '--batch_size', '4')
+        assert_equal(result.exception, None)
+        assert u'vm1 (1): task ' in result.output
+        assert u'vm5 (5): vm locked' in result.output
+        assert u'Tasks created: 9, failed: 1' in result.output
+
+        posts = [call for call in self.server.collection_calls('vms')
+                 if call[0] == 'POST']
+        assert_equal(sorted(len(call[2]['resources']) for call in posts),
+                     [2, 4, 4])
+        assert_equal(set(call[2]['action'] for call in posts),
+                     set(['delete']))
+
+    def test_collections_delete_all_matching_wait(self):
+        """Test vms delete --all_matching --wait watches the tasks together"""
+        result = self.invoke('vms', 'delete', '--provider', 'aws',
+                             '--all_matching', '--wait')
+        assert_equal(result.exception, None)
+        assert_equal(result.output.count(u'Finished, status: Ok'), 10)
+
+        polls = [call for call in self.server.collection_calls('tasks')
+                 if call[0] == 'GET']
+        assert_equal(len(polls), 1)
+        assert_equal(len(polls[0][2]['filter[]']), 10)
+
+    def test_collections_delete_all_matching_requires_options(self):
+        """Test vms delete --all_matching without options"""
+        result = self.invoke('vms', 'delete', '--all_matching')
+        assert_equal(result.exit_code, 1)
+        assert_equal([call for call in self.server.collection_calls('vms')
+                      if call[0] == 'POST'], [])
+
+    def test_collections_show_keeps_bound_results(self):
+        """Test CollectionsMixin._show only keeps the results it returns"""
+        from miqcli.collections.vms import Collections
+        with CliRunner().isolation():
+            found, count = Collections()._show(iter(VMS), 'Vm Info')
+            assert_equal((found, count), ([VMS[0]], 20))
+            found, count = Collections(api=mock.Mock())._show(
+                iter(VMS), 'Vm Info')
+            assert_equal((found, count), (VMS, 20))
@@ -0,0 +1,86 @@
+from unittest import TestCase
+
+from nose.tools import assert_equal, assert_raises
+
+from miqcli import filters
+from miqcli.filters import And, Not, Or, Term, compile_filter, compile_q, \
+    parse
+
+
+class TestFilters(TestCase):
+    """Test filters module"""
+
+    def test_filters_compile_term(self):
+        """Test filters.compile_filter with a single query"""
+        assert_equal(compile_filter(('name', '=', 'foo')), ['name = "foo"'])
+
+    def test_filters_compile_list_left_to_right(self):
+        """Test filters.compile_filter evaluates a list left to right"""
+        query = [('name', '=', 'foo'), '&', ('id', '>', 5), '|',
+                 ('name', '=', 'bar')]
+        assert_equal(compile_filter(query),
+                     ['name = "foo"', 'id > 5', 'or name = "bar"'])
+        # (foo or bar) and id > 5
+        assert_raises(ValueError, compile_filter,
+                      query[2:] + ['&'] + query[:1])
+
+    def test_filters_compile_keeps_query(self):
+        """Test filters.compile_filter does not change the given list"""
+        query = [('name', '=', 'foo'), '&', ('id', '>', 5)]
+        compile_filter(query)
+        assert_equal(query, [('name', '=', 'foo'), '&', ('id', '>', 5)])
+
+    def test_filters_compile_not(self):
+        """Test filters.compile_filter pushes NOT down to the terms"""
+        assert_equal(compile_filter(['!', ('name', '=', 'foo')]),
+                     ['name != "foo"'])
+        expression = ~(Term('id', '<', 5) | Term('id', '>=', 9))
+        assert_equal(compile_filter(expression), ['id >= 5', 'id < 9'])
+        assert_equal(compile_filter(Not(Not(Term('id', '<=', 5)))),
+                     ['id <= 5'])
+
+    def test_filters_compile_merges_redundant(self):
+        """Test filters.compile_filter drops duplicated predicates"""
+        expression = And(Term('name', '=', 'foo'), Term('id', '>', 5),
+                         And(Term('name', '=', 'foo'), Term('id', '>', 5)))
+        assert_equal(compile_filter(expression), ['name = "foo"', 'id > 5'])
+
+    def test_filters_compile_reorders_group(self):
+        """Test filters.compile_filter moves the AND group first"""
+        expression = Term('name', '=', 'bar') | (
+            Term('vendor', '=', 'amazon') & Term('name', '=', 'foo')) | \
+            Term('name', '=', 'baz')
+        assert_equal(compile_filter(expression),
+                     ['vendor = "amazon"', 'name = "foo"', 'or name = "bar"',
+                      'or name = "baz"'])
+
+    def test_filters_compile_not_chainable(self):
+        """Test filters.compile_filter with groups filter[] cannot express"""
+        expression = Term('vendor', '=', 'amazon') & (
+            Term('name', '=', 'foo') | Term('name', '=', 'bar'))
+        assert_raises(ValueError, compile_filter, expression)
+        expression = (Term('a', '=', 1) & Term('b', '=', 2)) | (
+            Term('c', '=', 3) & Term('d', '=', 4))
+        assert_raises(ValueError, compile_filter, expression)
+
+    def test_filters_compile_q(self):
+        """Test filters.compile_q builds the same filters"""
+        query = [('name', '=', 'foo'), '&', ('id', '>', 5), '|',
+                 ('name', '=', 'bar')]
+        assert_equal(compile_q(query).as_filters, compile_filter(query))
+
+    def test_filters_plans_memoized(self):
+        """Test filters compiled plans are memoized by structure"""
+        filters._plans.clear()
+        compile_filter([('name', '=', 'foo'), '&', ('id', '>', 5)])
+        compile_filter(Term('name', '=', 'foo') & Term('id', '>', 5))
+        assert_equal(len(filters._plans), 1)
+
+    def test_filters_parse_invalid(self):
+        """Test filters.parse with invalid queries"""
+        assert_raises(ValueError, parse, [('name', '=', 'foo'), '&'])
+        assert_raises(ValueError, parse, [('name', '=', 'foo'),
+                                          ('id', '>', 5)])
+        assert_raises(ValueError, parse, [('name', '=')])
+        assert_raises(ValueError, parse, [('name', '~', 'foo')])
+        assert_raises(ValueError, Or)
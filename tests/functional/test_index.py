@@ -0,0 +1,104 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import TestCase
+
+import mock
+from click.testing import CliRunner
+from nose.tools import assert_equal, assert_is_none, assert_raises
+
+import miqcli
+from miqcli.cli.index import CommandIndex
+from miqcli.cli.main import cli
+from miqcli.constants import COLLECTIONS_ROOT
+
+#: modules the cli must not import to list its commands
+HEAVY_MODULES = ('requests', 'manageiq_client', 'yaml', 'pkg_resources',
+                 'importlib.metadata')
+
+
+class TestCommandIndex(TestCase):
+    """Test cli.index.CommandIndex"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'commands.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_index_cached(self):
+        """Test cli.index.CommandIndex is only built once"""
+        with mock.patch.object(CommandIndex, 'build',
+                               wraps=CommandIndex.build) as build:
+            index = CommandIndex(path=self.path)
+            assert 'vms' in index.names()
+            assert 'start' in index.get('vms')['commands']
+            assert_equal(index.get('vms')['help'].strip(),
+                         'Virtual machines collections.')
+            assert_is_none(index.get('bogus'))
+
+            assert_equal(CommandIndex(path=self.path).commands,
+                         index.commands)
+            assert_equal(build.call_count, 1)
+
+    def test_index_rebuilt(self):
+        """Test cli.index.CommandIndex is rebuilt once miqcli changes"""
+        CommandIndex(path=self.path).names()
+        with mock.patch('os.path.getmtime', return_value=time.time()), \
+                mock.patch.object(CommandIndex, 'build',
+                                  return_value={'vms': {}}) as build:
+            assert_equal(CommandIndex(path=self.path).names(), ['vms'])
+            assert_equal(CommandIndex(path=self.path).names(), ['vms'])
+            assert_equal(build.call_count, 1)
+
+    def test_index_modules(self):
+        """Test cli.index.CommandIndex lists the collection modules"""
+        modules = CommandIndex(path=self.path).modules()
+        assert_equal(modules['vms'], os.path.join(COLLECTIONS_ROOT, 'vms.py'))
+        assert '__init__' not in modules
+
+    def test_cli_help_from_index(self):
+        """Test miqcli help lists the collections from the index"""
+        index = CommandIndex(path=self.path)
+        with mock.patch('miqcli.cli.main.CommandIndex',
+                        return_value=index), \
+                mock.patch.object(cli, '_index', None):
+            result = CliRunner().invoke(cli, ['vms', '--help'])
+        assert_equal(result.exit_code, 0)
+        assert 'Virtual machines collections.' in result.output
+        assert 'add_lifecycle_event' in result.output
+
+    def test_cli_lazy_imports(self):
+        """Test miqcli --help does not import the client libraries"""
+        code = ('import sys\n'
+                'from miqcli.cli.main import cli\n'
+                'try:\n'
+                '    cli(["--help"])\n'
+                'except SystemExit:\n'
+                '    pass\n'
+                'sys.stderr.write(",".join(m for m in {0!r} '
+                'if m in sys.modules))\n').format(HEAVY_MODULES)
+        env = dict(os.environ, HOME=self.directory)
+        # first run builds the index, the second one reads it
+        for _ in range(2):
+            process = subprocess.Popen(
+                [sys.executable, '-c', code], env=env,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            out, err = process.communicate()
+        assert 'vms' in out.decode('utf-8')
+        assert_equal(err.decode('utf-8'), '')
+
+    def test_lazy_module(self):
+        """Test the miqcli module proxy imports the clients when used"""
+        module = miqcli._LazyModule('proxy')
+        assert 'Client' in dir(module)
+        assert 'Client' not in vars(module)
+
+        from miqcli.api import Client
+        assert module.Client is Client
+        assert 'Client' in vars(module)
+        assert_raises(AttributeError, getattr, module, 'bogus')
@@ -0,0 +1,149 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import TestCase
+
+import mock
+from nose.tools import assert_equal
+
+from miqcli.api import ClientAPI
+from miqcli.cache import FileCache
+from miqcli.query import AdvancedQuery, BasicQuery
+from miqcli.testing import ACTIONS, MOCK_TOKEN, VIRTUAL, inventory
+from stub_server import StubServerTestCase
+
+
+class TestMockServer(StubServerTestCase):
+    """Test testing.MockServer serving a synthetic inventory"""
+
+    def setUp(self):
+        super(TestMockServer, self).setUp()
+        self.server = self.start_server(
+            inventory(vms=2500), virtual=VIRTUAL, actions=ACTIONS,
+            max_results=1000)
+        self.api = ClientAPI(dict(url=self.server.url, token=MOCK_TOKEN))
+        self.api.connect()
+
+    def query(self, name, query, **kwargs):
+        return AdvancedQuery(getattr(self.api.client.collections, name))(
+            query, **kwargs)
+
+    def test_inventory(self):
+        """Test testing.inventory generates the same inventory per seed"""
+        assert_equal(inventory(vms=10), inventory(vms=10))
+        assert inventory(vms=10) != inventory(vms=10, seed=1)
+
+        data = self.server.resources
+        assert_equal(len(data['vms']), 2500)
+        assert_equal(data['instances'], data['vms'])
+        assert_equal(sorted(p['name'] for p in data['providers']),
+                     ['amazon', 'amazon network', 'openstack',
+                      'openstack network'])
+
+    def test_mock_server_paging(self):
+        """Test testing.MockServer pages through the query results"""
+        resources = self.query('vms', ('power_state', '=', 'on'),
+                               fields=('name',))
+        expected = [vm for vm in self.server.resources['vms']
+                    if vm['power_state'] == 'on']
+        assert_equal([r.name for r in resources],
+                     [vm['name'] for vm in expected])
+        assert_equal(len(self.server.collection_calls('vms')),
+                     len(expected) // 1000 + 1)
+
+    def test_mock_server_capped_pages(self):
+        """Test the queries page past the server results cap"""
+        resources = BasicQuery(self.api.client.collections.vms,
+                               page_size=1500)(None, fields=('name',))
+        assert_equal(len(resources), 2500)
+        assert_equal(len(set(r.id for r in resources)), 2500)
+        assert_equal(len(self.server.collection_calls('vms')), 3)
+
+    def test_mock_server_filters(self):
+        """Test testing.MockServer filter operators and attributes"""
+        resources = self.query('vms', [('name', '=', 'vm-00001*'), '&',
+                                       ('id', '<', 59)],
+                               attr=('ext_management_system.name',))
+        assert_equal([r.name for r in resources],
+                     ['vm-000010', 'vm-000011', 'vm-000012', 'vm-000013'])
+        assert_equal(resources[0].ext_management_system,
+                     {'name': 'openstack'})
+
+        resources = self.query('cloud_networks',
+                               [('name', '=', 'network-0-1'), '|',
+                                ('name', '=', 'network-1-1')])
+        assert_equal(len(resources), 4)
+
+        # the appliance ANDs the plain filters then ORs each or filter
+        resources = self.api.client.collections.vms.query_string(**{
+            'expand': 'resources', 'filter[]': [
+                'name = "vm-000200"', 'or name = "vm-00001*"', 'id < 59']})
+        assert_equal([r.name for r in resources],
+                     ['vm-0000%s' % i for i in range(10, 20)])
+
+    def test_mock_server_entry_point_cache(self):
+        """Test the entry point document is cached per user and refreshed"""
+        cache = FileCache(os.path.join(self.home, 'api.json'))
+        assert_equal(list(cache.entries), [self.server.url + '/api admin'])
+
+        other = ClientAPI(dict(url=self.server.url, token=MOCK_TOKEN,
+                               username='johnny'))
+        other.connect()
+        assert_equal(sorted(FileCache(cache.path).entries),
+                     [self.server.url + '/api admin',
+                      self.server.url + '/api johnny'])
+
+        # the server upgrade is picked up with the next token validation
+        self.server._httpd.version = '6.0.0'
+        os.remove(os.path.join(self.home, 'auth'))
+        del self.server.calls[:]
+        upgraded = ClientAPI(dict(url=self.server.url, token=MOCK_TOKEN))
+        upgraded.connect()
+        assert_equal(upgraded.client._version, '6.0.0')
+        assert_equal(FileCache(cache.path).get(
+            self.server.url + '/api admin')['version'], '6.0.0')
+        # the validation answer is the entry point document
+        assert_equal(len(self.server.calls), 1)
+
+    def test_mock_server_transitions(self):
+        """Test testing.MockServer moves the created requests forward"""
+        self.server._httpd.transition_time = 0.05
+        requests = self.api.client.collections.provision_requests
+        created, = requests.action.create({'vm_name': 'vm'})
+
+        assert_equal(requests(created.id).request_state, 'pending')
+        time.sleep(0.12)
+        request = requests(created.id)
+        assert_equal(request.request_state, 'finished')
+        assert_equal(request.options, {'vm_name': 'vm'})
+
+        vms = self.api.client.collections.vms
+        vms.action.stop(vms('101'))
+        assert_equal(self.server.resources['tasks'][-1]['state'], 'Queued')
+
+
+class TestMockServerProcess(TestCase):
+    """Test the mock server command"""
+
+    def test_mock_server_subprocess(self):
+        """Test python -m miqcli.testing serves the inventory"""
+        home = tempfile.mkdtemp()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'miqcli.testing', '--vms', '10'],
+            stdout=subprocess.PIPE)
+        try:
+            url = process.stdout.readline().decode('utf-8').strip()
+            token = process.stdout.readline().decode('utf-8').strip()
+            api = ClientAPI(dict(url=url, token=token))
+            with mock.patch('miqcli.api.TOKENFILE',
+                            os.path.join(home, 'auth')), \
+                    mock.patch('miqcli.api.CACHE_DIR', home):
+                api.connect()
+            assert_equal(len(api.client.collections.vms.all), 10)
+        finally:
+            process.terminate()
+            process.wait()
+            shutil.rmtree(home)
@@ -0,0 +1,122 @@
+
+import os
+
+import mock
+from manageiq_client.api import APIException
+from nose.tools import assert_equal
+
+from miqcli.api import ClientAPI
+from miqcli.cache import FileCache
+from miqcli.provider import Flavors, KeyPair, Networks, SecurityGroups, \
+    Templates, Tenant
+from stub_server import StubServerTestCase, STUB_TOKEN
+
+PROVIDERS = [
+    {'id': '1', 'name': 'osp',
+     'type': 'ManageIQ::Providers::Openstack::CloudManager'},
+    {'id': '2', 'name': 'osp network',
+     'type': 'ManageIQ::Providers::Openstack::NetworkManager'},
+    {'id': '3', 'name': 'aws',
+     'type': 'ManageIQ::Providers::Amazon::CloudManager'}
+]
+
+COLLECTIONS = ['flavors', 'templates', 'security_groups', 'authentications',
+               'cloud_tenants', 'cloud_networks']
+
+
+class TestProvider(StubServerTestCase):
+    """Test provider module against a stub server"""
+
+    def setUp(self):
+        super(TestProvider, self).setUp()
+        resources = dict((name, []) for name in COLLECTIONS)
+        resources['providers'] = list(PROVIDERS)
+        self.server = self.start_server(resources)
+
+    def client_api(self, **settings):
+        api = ClientAPI(dict(url=self.server.url, token=STUB_TOKEN,
+                             **settings))
+        api.connect()
+        return api
+
+    def test_provider_types_listed_once(self):
+        """Test provider components share one providers lookup"""
+        api = self.client_api()
+        components = [Tenant('openstack', api), Flavors('openstack', api),
+                      Templates('openstack', api),
+                      SecurityGroups('openstack', api),
+                      KeyPair('openstack', api), Networks('openstack', api)]
+
+        assert_equal(components[1].type,
+                     'ManageIQ::Providers::Openstack::CloudManager::Flavor')
+        assert_equal(components[3].type,
+                     'ManageIQ::Providers::Openstack::NetworkManager::'
+                     'SecurityGroup')
+        assert_equal(len(self.server.collection_calls('providers')), 1)
+
+    def test_provider_types_persisted(self):
+        """Test provider types are read from the cache"""
+        Flavors('amazon', self.client_api())
+        del self.server.calls[:]
+
+        flavors = Flavors('amazon', self.client_api())
+        assert_equal(flavors.cloud_type,
+                     'ManageIQ::Providers::Amazon::CloudManager')
+        assert_equal(self.server.collection_calls('providers'), [])
+
+    def test_provider_types_cache_disabled(self):
+        """Test provider types are listed by each client api"""
+        Flavors('amazon', self.client_api(provider_cache_ttl=0))
+        Flavors('amazon', self.client_api(provider_cache_ttl=0))
+        assert_equal(len(self.server.collection_calls('providers')), 2)
+
+    def test_provider_types_cache_refreshed(self):
+        """Test an unknown provider refreshes the cached provider types"""
+        Flavors('amazon', self.client_api())
+        self.server._httpd.resources['providers'].append(
+            {'id': '4', 'name': 'azure',
+             'type': 'ManageIQ::Providers::Azure::CloudManager'})
+        del self.server.calls[:]
+
+        flavors = Flavors('azure', self.client_api())
+        assert_equal(flavors.cloud_type,
+                     'ManageIQ::Providers::Azure::CloudManager')
+        assert_equal(len(self.server.collection_calls('providers')), 1)
+
+    def test_provider_resolve_cached(self):
+        """Test resolved resource names are cached"""
+        self.server._httpd.resources['flavors'] = [
+            {'id': '7', 'name': 'm1.small',
+             'type': 'ManageIQ::Providers::Openstack::CloudManager::Flavor'}]
+        api = self.client_api()
+        assert_equal(Flavors('openstack', api).get_id('m1.small'), '7')
+        assert_equal(Flavors('openstack', api).get_id('m1.small'), '7')
+        assert_equal(Flavors('openstack', self.client_api()).get_id(
+            'm1.small'), '7')
+        assert_equal(len([call for call in
+                          self.server.collection_calls('flavors')
+                          if call[0] == 'GET']), 1)
+
+    def test_provider_resolve_cache_disabled(self):
+        """Test resource names are resolved each time without cache"""
+        self.server._httpd.resources['flavors'] = [
+            {'id': '7', 'name': 'm1.small',
+             'type': 'ManageIQ::Providers::Openstack::CloudManager::Flavor'}]
+        api = self.client_api(resolve_cache_ttl=0)
+        Flavors('openstack', api).get_id('m1.small')
+        api.round_trips.reset()
+        Flavors('openstack', api).get_id('m1.small')
+        assert_equal(api.round_trips.count, 1)
+
+    def test_provider_types_failure_not_cached(self):
+        """Test provider types are not cached when they cannot be listed"""
+        with mock.patch('miqcli.query.BaseQuery._page',
+                        side_effect=APIException('forbidden')):
+            flavors = Flavors('amazon', self.client_api())
+        assert_equal(flavors.cloud_type, '')
+        assert_equal(FileCache(os.path.join(
+            self.home, 'providers.json')).entries, dict())
+
+        flavors = Flavors('amazon', self.client_api())
+        assert_equal(flavors.cloud_type,
+                     'ManageIQ::Providers::Amazon::CloudManager')
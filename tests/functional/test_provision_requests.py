@@ -0,0 +1,200 @@
+import json
+import os
+
+import mock
+from click.testing import CliRunner
+from nose.tools import assert_equal
+
+from manageiq_client.api import APIException
+from miqcli.cli.main import cli
+from miqcli.provider import Tenant
+from stub_server import StubServerTestCase, STUB_TOKEN
+
+OSP = 'ManageIQ::Providers::Openstack::CloudManager'
+OSP_NETWORK = 'ManageIQ::Providers::Openstack::NetworkManager'
+
+RESOURCES = {
+    'providers': [
+        {'id': '1', 'name': 'osp', 'type': OSP},
+        {'id': '2', 'name': 'osp network', 'type': OSP_NETWORK}],
+    'cloud_tenants': [
+        {'id': '10', 'name': 'admin', 'type': OSP + '::CloudTenant'}],
+    'flavors': [
+        {'id': '20', 'name': 'm1.small', 'type': OSP + '::Flavor'}],
+    'templates': [
+        {'id': '30', 'guid': 'abc-123', 'name': 'rhel',
+         'type': OSP + '::Template'}],
+    'cloud_networks': [
+        {'id': '40', 'name': 'private', 'cloud_tenant_id': '10',
+         'type': OSP_NETWORK + '::CloudNetwork::Private'}],
+    'security_groups': [],
+    'authentications': [],
+    'provision_requests': []
+}
+
+
+def payload(vm_name, **kwargs):
+    data = dict(email='user@example.com', tenant='admin', image='rhel',
+                network='private', flavor='m1.small', vm_name=vm_name)
+    data.update(kwargs)
+    return data
+
+
+class TestProvisionRequests(StubServerTestCase):
+    """Test provision requests collection against a stub server"""
+
+    def setUp(self):
+        super(TestProvisionRequests, self).setUp()
+        self.server = self.start_server(
+            dict((name, list(res)) for name, res in RESOURCES.items()),
+            actions={'provision_requests': ['create']})
+        self.manifest = os.path.join(self.home, 'vms.jsonl')
+
+    def invoke(self, *args):
+        return CliRunner().invoke(
+            cli, ['--url', self.server.url, '--token', STUB_TOKEN,
+                  'provision_requests', 'create', '--provider', 'OpenStack'] +
+            list(args))
+
+    def write_manifest(self, *lines):
+        with open(self.manifest, 'w') as f:
+            for line in lines:
+                f.write((line if isinstance(line, str) else
+                         json.dumps(line)) + '\n')
+
+    def read_results(self, path=None):
+        path = path or os.path.join(self.home, 'vms.results.jsonl')
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+
+    def posted(self):
+        return [resource for call in self.server.calls if call[0] == 'POST'
+                for resource in call[2]['resources']]
+
+    def test_provision_requests_create(self):
+        """Test provision_requests create with a single payload"""
+        result = self.invoke('--payload', repr(payload('vm1')))
+        assert_equal(result.exception, None)
+        assert u'Provisioning request created: 1001' in result.output
+
+        posted = self.posted()
+        assert_equal(len(posted), 1)
+        assert_equal(posted[0]['vm_fields']['instance_type'], '20')
+        assert_equal(posted[0]['vm_fields']['cloud_network'], '40')
+        assert_equal(posted[0]['template_fields']['guid'], 'abc-123')
+
+    def test_provision_requests_create_not_found(self):
+        """Test provision_requests create with an unknown flavor"""
+        result = self.invoke('--payload',
+                             repr(payload('vm1', flavor='m1.huge')))
+        assert_equal(result.exit_code, 1)
+        assert u'Flavors m1.huge not found for provider OpenStack.' in \
+            result.output
+        assert_equal(self.posted(), [])
+
+    def test_provision_requests_create_manifest(self):
+        """Test provision_requests create --manifest"""
+        self.write_manifest(*[payload('vm%s' % i) for i in range(1, 21)])
+
+        result = self.invoke('--manifest', self.manifest, '--workers', '3')
+        assert_equal(result.exception, None)
+        assert u'Provisioning requests created: 20, failed: 0' in \
+            result.output
+
+        results = self.read_results()
+        assert_equal([r['line'] for r in results], list(range(1, 21)))
+        assert_equal(sorted(r['request_id'] for r in results),
+                     [str(i) for i in range(1001, 1021)])
+        assert_equal(len(self.posted()), 20)
+        assert_equal(len([call for call in self.server.calls
+                          if call[0] == 'POST']), 1)
+
+        # shared names are resolved once
+        for name in ('flavors', 'templates', 'cloud_tenants',
+                     'cloud_networks', 'providers'):
+            assert_equal(len([call for call in
+                              self.server.collection_calls(name)
+                              if call[0] == 'GET']), 1)
+
+    def test_provision_requests_create_manifest_errors(self):
+        """Test provision_requests create --manifest reports bad lines"""
+        self.server._httpd.reject = lambda resource: (
+            'quota exceeded' if resource['vm_fields']['vm_name'] == 'vm4'
+            else None)
+        missing = payload('vm2')
+        del missing['flavor']
+        self.write_manifest(payload('vm1'), missing, 'not json',
+                            payload('vm4'), payload('vm5', image='fedora'),
+                            payload('vm6'))
+
+        results = os.path.join(self.home, 'out.jsonl')
+        result = self.invoke('--manifest', self.manifest, '--results',
+                             results)
+        assert_equal(result.exception, None)
+        assert u'Provisioning requests created: 2, failed: 4' in \
+            result.output
+
+        results = self.read_results(results)
+        assert_equal([r['line'] for r in results], [1, 2, 3, 4, 5, 6])
+        assert 'request_id' in results[0]
+        assert u"Required key(s) missing: ['flavor']" in results[1]['error']
+        assert 'error' in results[2]
+        assert_equal(results[3]['error'], 'quota exceeded')
+        assert_equal(results[4]['error'],
+                     'Templates fedora not found for provider OpenStack.')
+        assert 'request_id' in results[5]
+
+    def test_provision_requests_create_manifest_lookup_errors(self):
+        """Test provision_requests create --manifest lookup errors"""
+        self.server.resources['flavors'].extend([
+            {'id': '21', 'name': 'm1.dup', 'type': OSP + '::Flavor'},
+            {'id': '22', 'name': 'm1.dup', 'type': OSP + '::Flavor'}])
+        get_id = Tenant.get_id
+
+        def lookup(tenant, name):
+            if name == 'broken':
+                raise APIException('Internal Server Error')
+            return get_id(tenant, name)
+
+        self.write_manifest(payload('vm1', flavor='m1.dup'),
+                            payload('vm2', tenant='broken'), payload('vm3'))
+        with mock.patch.object(Tenant, 'get_id', lookup):
+            result = self.invoke('--manifest', self.manifest)
+        assert_equal(result.exception, None)
+        assert u'Provisioning requests created: 1, failed: 2' in \
+            result.output
+
+        results = self.read_results()
+        assert_equal([r['line'] for r in results], [1, 2, 3])
+        assert u'multiple' in results[0]['error']
+        assert_equal(results[1]['error'], 'Internal Server Error')
+        assert 'request_id' in results[2]
+        assert_equal([r['vm_fields']['vm_name'] for r in self.posted()],
+                     ['vm3'])
+
+    def test_provision_requests_create_manifest_batches(self):
+        """Test provision_requests create --manifest sends batches"""
+        self.server._httpd.reject = lambda resource: (
+            'quota exceeded' if resource['vm_fields']['vm_name'] == 'vm10'
+            else None)
+        self.write_manifest(*[payload('vm%s' % i) for i in range(1, 21)])
+
+        result = self.invoke('--manifest', self.manifest, '--batch_size', '8')
+        assert_equal(result.exception, None)
+        assert u'Provisioning requests created: 19, failed: 1' in \
+            result.output
+
+        posts = [call for call in self.server.calls if call[0] == 'POST']
+        assert_equal(sorted(len(call[2]['resources']) for call in posts),
+                     [4, 8, 8])
+
+        results = self.read_results()
+        assert_equal(results[9], {'line': 10, 'vm_name': 'vm10',
+                                  'error': 'quota exceeded'})
+        for result in results[:9] + results[10:]:
+            posted = [resource for resource in self.posted()
+                      if resource['vm_fields']['vm_name'] ==
+                      result['vm_name']]
+            assert_equal(len(posted), 1)
+        assert_equal(len(set(r['request_id'] for r in results
+                             if 'request_id' in r)), 19)
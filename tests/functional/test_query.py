@@ -0,0 +1,113 @@
+from unittest import TestCase
+
+import mock
+from nose.tools import assert_equal, assert_raises
+
+from miqcli.query import AdvancedQuery, BaseQuery, BasicQuery
+
+
+class TestQuery(TestCase):
+    """Test query module"""
+
+    def setUp(self):
+        self.collection = mock.MagicMock()
+        self.collection.options.return_value = {'attributes': ['id', 'name']}
+        self.pages = [[1, 2], [3, 4], [5]]
+        patch = mock.patch.object(BaseQuery, '_page', side_effect=[
+            (page, 5) for page in self.pages])
+        self.page = patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_query_iter_is_lazy(self):
+        """Test BaseQuery.iter requests the next page when needed"""
+        resources = BasicQuery(self.collection, page_size=2).iter(None)
+        assert_equal(next(resources), 1)
+        assert_equal(self.page.call_count, 1)
+        assert_equal(list(resources), [2, 3, 4, 5])
+        assert_equal(self.page.call_count, 3)
+
+    def test_query_call_pages(self):
+        """Test BaseQuery.__call__ collects the pages"""
+        query = BasicQuery(self.collection, page_size=2)
+        assert_equal(query(('name', '=', 'foo'), ('vendor',)),
+                     [1, 2, 3, 4, 5])
+        assert_equal(query.resources, [1, 2, 3, 4, 5])
+
+        offsets = [call[0][0]['offset'] for call in
+                   self.page.call_args_list]
+        assert_equal(offsets, [0, 2, 4])
+        kwargs = self.page.call_args[0][0]
+        assert_equal(kwargs['filter[]'], ['name = "foo"'])
+        assert_equal(kwargs['attributes'], 'id,name,vendor')
+        assert_equal(kwargs['sort_by'], 'id')
+
+    def test_query_flush_log_per_page(self):
+        """Test BaseQuery flushes the log messages before each page"""
+        with mock.patch('miqcli.utils.log.flush') as flush:
+            BasicQuery(self.collection, page_size=2)(None)
+        assert_equal(flush.call_count, 3)
+
+    def test_query_invalid(self):
+        """Test BasicQuery with an invalid query"""
+        query = BasicQuery(self.collection)
+        assert_equal(query(('name', '=')), [])
+        assert_equal(self.page.call_count, 0)
+
+    def test_advanced_query_keeps_query(self):
+        """Test AdvancedQuery does not change the given query"""
+        query = [('name', '=', 'foo'), '&', ('id', '>', 5)]
+        AdvancedQuery(self.collection, page_size=2)(query)
+        assert_equal(query, [('name', '=', 'foo'), '&', ('id', '>', 5)])
+        assert_equal(self.page.call_args[0][0]['filter[]'],
+                     ['name = "foo"', 'id > 5'])
+
+    def test_advanced_query_invalid(self):
+        """Test AdvancedQuery with an invalid query"""
+        query = AdvancedQuery(self.collection)
+        assert_equal(query([('name', '=', 'foo'), '&']), [])
+        assert_equal(self.page.call_count, 0)
+
+    def test_query_getattr_local(self):
+        """Test BaseQuery.__getattr__ answers from the received data"""
+        resource = mock.Mock(spec=['reload'])
+        resource.id = '7'
+        self.page.side_effect = [([resource], 1)]
+        query = BasicQuery(self.collection)
+        query(('name', '=', 'foo'))
+        assert_equal(query.id, '7')
+        assert_equal(resource.reload.call_count, 0)
+
+    def test_query_getattr_reload_once(self):
+        """Test BaseQuery.__getattr__ requests a missing attribute once"""
+        resource = mock.Mock(spec=['reload'])
+
+        def reload(attributes=None):
+            if 'guid' in attributes:
+                resource.guid = 'abc'
+        resource.reload.side_effect = reload
+        self.page.side_effect = [([resource], 1)]
+        query = BasicQuery(self.collection)
+        query(('name', '=', 'foo'))
+
+        assert_equal(query.guid, 'abc')
+        assert_equal(query.guid, 'abc')
+        assert_raises(AttributeError, getattr, query, 'unknown')
+        assert_raises(AttributeError, getattr, query, 'unknown')
+        assert_equal(resource.reload.call_args_list,
+                     [mock.call(attributes=['guid']),
+                      mock.call(attributes=['unknown'])])
+
+    def test_query_capped_pages(self):
+        """Test BaseQuery pages past the pages capped by the server"""
+        self.page.side_effect = [([1, 2], 5), ([3], 5), ([4, 5], 5)]
+        query = BasicQuery(self.collection, page_size=3)
+        assert_equal(query(None), [1, 2, 3, 4, 5])
+        assert_equal([call[0][0]['offset'] for call in
+                      self.page.call_args_list], [0, 2, 3])
+
+    def test_query_pages_without_count(self):
+        """Test BaseQuery pages until an empty page without a count"""
+        self.page.side_effect = [([1, 2], None), ([3], None), ([], None)]
+        query = BasicQuery(self.collection, page_size=2)
+        assert_equal(query(None), [1, 2, 3])
+        assert_equal(self.page.call_count, 3)
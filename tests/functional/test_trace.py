@@ -0,0 +1,81 @@
+import json
+import os
+
+from click.testing import CliRunner
+from nose.tools import assert_equal, assert_is_none
+
+from miqcli.api import Client
+from miqcli.cli.main import cli
+from miqcli.instrumentation import calling
+from stub_server import StubServerTestCase, STUB_TOKEN
+
+TASKS = [
+    {'id': str(i), 'name': 'task %s' % i, 'state': 'Finished',
+     'status': 'Ok', 'message': 'done'}
+    for i in range(1, 4)
+]
+
+
+class TestTrace(StubServerTestCase):
+    """Test the http calls tracing against a stub server"""
+
+    def setUp(self):
+        super(TestTrace, self).setUp()
+        self.server = self.start_server({'tasks': list(TASKS)})
+
+    def invoke(self, *args):
+        return CliRunner().invoke(
+            cli, ['--url', self.server.url, '--token', STUB_TOKEN] +
+            list(args))
+
+    def test_trace_summary(self):
+        """Test --trace prints the http calls by collection method"""
+        result = self.invoke('--trace', 'tasks', 'status', '2')
+        assert_equal(result.exception, None)
+        assert u'HTTP trace: 2 calls' in result.output
+        assert u'- / api.ClientAPI._valid_token' in result.output
+        # the entry point document answered the token validation
+        assert u'_load_data' not in result.output
+        assert u'tasks.status / ' in result.output
+
+    def test_trace_off(self):
+        """Test the http calls are not traced by default"""
+        result = self.invoke('tasks', 'status', '2')
+        assert_equal(result.exception, None)
+        assert u'HTTP trace' not in result.output
+
+    def test_trace_file(self):
+        """Test --trace_file writes the http calls as a Chrome trace"""
+        path = os.path.join(self.home, 'trace.json')
+        result = self.invoke('--trace_file', path, 'tasks', 'status', '2')
+        assert_equal(result.exception, None)
+
+        with open(path) as fp:
+            events = json.load(fp)['traceEvents']
+        assert_equal(len(events), 2)
+        assert_equal([e['ph'] for e in events], ['X'] * 2)
+        assert_equal(events[-1]['cat'], 'tasks.status')
+        assert_equal(events[-1]['args']['status'], 200)
+        assert events[-1]['args']['bytes_received'] > 0
+        assert events[-1]['args']['url'].startswith(
+            self.server.url + '/api/tasks')
+
+    def test_client_trace(self):
+        """Test Client(trace=True) records the calls of its collections"""
+        client = Client({'url': self.server.url, 'token': STUB_TOKEN})
+        assert_is_none(client.tracer)
+
+        client = Client({'url': self.server.url, 'token': STUB_TOKEN},
+                        trace=True)
+        client.tracer.reset()
+        client.collection = 'tasks'
+        client.collection.status('1')
+        with calling('script'):
+            client.collection.status('3')
+
+        calls = client.tracer.calls
+        assert_equal([(c.method, c.status, c.caller) for c in calls],
+                     [('GET', 200, 'tasks.status')] * 2)
+        assert_equal([row[:3] for row in client.tracer.summary()],
+                     [('tasks.status', calls[0].site, 2)])
+        assert all(c.latency >= 0 and c.bytes_sent == 0 for c in calls)
@@ -1,6 +1,10 @@
+import io
+import json
+import threading
 from unittest import TestCase
 
 import click
+import mock
 from click.testing import CliRunner
 from nose.tools import assert_equal
 from miqcli.utils import log as miqcli_log
@@ -83,4 +87,97 @@ class TestUtilsLog(TestCase):
 
     result = self.runner.invoke(cli)
     assert isinstance(result.exception, SystemExit)
-    assert_equal(ABORT_MESSAGE_RESULT, result.output)
\ No newline at end of file
+    assert_equal(ABORT_MESSAGE_RESULT, result.output)
+
+  def test_utilslog_buffered(self):
+    """Test utils.log messages are flushed on warnings, in output order"""
+    @click.command()
+    def cli():
+        """Print info messages, an output line then a warning"""
+        for _ in range(100):
+            miqcli_log.info(MESSAGE)
+        click.echo('output')
+        miqcli_log.warning(MESSAGE)
+        for _ in range(100):
+            miqcli_log.info(MESSAGE)
+
+    with mock.patch.object(miqcli_log._writer, '_flush',
+                           wraps=miqcli_log._writer._flush) as flush, \
+            mock.patch('miqcli.utils.log.LOG_FLUSH_INTERVAL', 60):
+        result = self.runner.invoke(cli)
+    assert_equal(result.exception, None)
+    assert_equal(result.output, INFO_MESSAGE_RESULT * 100 + u'output\n' +
+                 WARNING_MESSAGE_RESULT + INFO_MESSAGE_RESULT * 100)
+    # the previous stream, the warning and the end of the command
+    assert_equal(flush.call_count, 3)
+
+  def test_utilslog_buffered_terminal(self):
+    """Test utils.log buffers the messages of a line buffered terminal"""
+    class Terminal(io.BytesIO):
+        def isatty(self):
+            return True
+
+    raw = Terminal()
+    stream = io.TextIOWrapper(io.BufferedWriter(raw), encoding='utf-8',
+                              line_buffering=True)
+    with mock.patch('sys.stdout', stream), \
+            mock.patch('miqcli.utils.log._settings',
+                       return_value=(False, 'text', True)):
+        miqcli_log.info(MESSAGE)
+        miqcli_log.info(MESSAGE)
+        assert_equal(raw.getvalue(), b'')
+        click.echo(u'output', file=stream)
+        assert_equal(raw.getvalue().decode('utf-8'),
+                     INFO_MESSAGE_RESULT * 2 + u'output\n')
+        miqcli_log.info(MESSAGE)
+        miqcli_log.flush()
+    assert_equal(raw.getvalue().decode('utf-8'),
+                 INFO_MESSAGE_RESULT * 2 + u'output\n' + INFO_MESSAGE_RESULT)
+    assert stream.line_buffering
+
+  def test_utilslog_propagate(self):
+    """Test utils.log settings are used by worker threads"""
+    @click.command()
+    @click.option('--log_format')
+    @click.option('-v', '--verbose', count=True)
+    def cli(log_format, verbose):
+        """Print a debug message from a worker thread"""
+        thread = threading.Thread(
+            target=miqcli_log.propagate(miqcli_log.debug), args=(MESSAGE,))
+        thread.start()
+        thread.join()
+
+    result = self.runner.invoke(cli, ['--log_format', 'json', '--verbose'])
+    assert_equal(result.exception, None)
+    line = json.loads(result.output)
+    assert_equal((line['level'], line['message']), ('debug', MESSAGE))
+
+  def test_utilslog_json(self):
+    """Test utils.log messages as JSON lines"""
+    @click.command()
+    @click.option('--log_format')
+    @click.option('-v', '--verbose', count=True)
+    def cli(log_format, verbose):
+        """Print info and debug messages"""
+        miqcli_log.info(MESSAGE)
+        miqcli_log.debug(MESSAGE)
+
+    result = self.runner.invoke(cli, ['--log_format', 'json', '--verbose'])
+    assert_equal(result.exception, None)
+    lines = [json.loads(line) for line in result.output.splitlines()]
+    assert_equal([(line['level'], line['message']) for line in lines],
+                 [('info', MESSAGE), ('debug', MESSAGE)])
+
+  def test_utilslog_styles(self):
+    """Test utils.log only styles the messages on a terminal"""
+    stream = io.StringIO()
+    with mock.patch('sys.stdout', stream):
+        miqcli_log.error(MESSAGE)
+    assert_equal(stream.getvalue(), ERROR_MESSAGE_RESULT)
+
+    stream = io.StringIO()
+    stream.isatty = lambda: True
+    with mock.patch('sys.stdout', stream):
+        miqcli_log.error(MESSAGE)
+    assert_equal(stream.getvalue(), click.style(
+        ERROR_MESSAGE_RESULT[:-1], bold=True, fg='red') + u'\n')
@@ -0,0 +1,98 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+import mock
+from click.testing import CliRunner
+from nose.tools import assert_equal, assert_is_none
+
+from miqcli.cli.main import cli
+from miqcli.cli.version import fetch_latest_version, latest_version, \
+    version_status
+
+
+def pypi_response(version):
+    return io.BytesIO(json.dumps(
+        {'info': {'version': version}}).encode('utf-8'))
+
+
+class TestVersion(TestCase):
+    """Test the installed and latest versions reported by --version"""
+
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.patches = [
+            mock.patch('miqcli.cli.version.CACHE_DIR', self.home),
+            mock.patch('miqcli.cli.version.get_version',
+                       return_value='1.2.0'),
+            mock.patch.dict(os.environ, {'MIQ_CFG': '{}'})
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.home)
+
+    def test_version_status(self):
+        """Test version.version_status compares the versions"""
+        assert_equal(version_status('1.2.0', '1.2.0'), 'an up-to-date')
+        assert_equal(version_status('1.2.0', '1.10.0'), 'an out-of-date')
+        assert_equal(version_status('1.3.0.dev1', '1.2.0'), 'a pre-release')
+
+    def test_version_cached(self):
+        """Test --version only asks PyPI once per cache lifetime"""
+        with mock.patch('miqcli._compat.urlopen',
+                        side_effect=lambda *a, **kw: pypi_response(
+                            '1.3.0')) as urlopen:
+            for _ in range(2):
+                result = CliRunner().invoke(cli, ['--version'])
+                assert_equal(result.exit_code, 0)
+                assert_equal(result.output,
+                             'Installed version : 1.2.0\n'
+                             'Latest version    : 1.3.0\n\n'
+                             'You are running an out-of-date version of '
+                             'ManageIQ CLI!\n')
+            assert_equal(urlopen.call_count, 1)
+
+            with mock.patch('time.time', return_value=time.time() + 86401):
+                assert_equal(latest_version(dict()), '1.3.0')
+            assert_equal(urlopen.call_count, 2)
+
+    def test_version_check_disabled(self):
+        """Test --version does not ask PyPI with version_check false"""
+        with mock.patch('miqcli._compat.urlopen') as urlopen, \
+                mock.patch.dict(os.environ,
+                                {'MIQ_CFG': "{'version_check': False}"}):
+            result = CliRunner().invoke(cli, ['--version'])
+        assert_equal(result.exit_code, 0)
+        assert_equal(result.output, 'Installed version : 1.2.0\n')
+        assert_equal(urlopen.call_count, 0)
+
+    def test_version_offline(self):
+        """Test --version reports no latest version when PyPI is down"""
+        with mock.patch('miqcli._compat.urlopen',
+                        side_effect=IOError('unreachable')) as urlopen:
+            for _ in range(2):
+                result = CliRunner().invoke(cli, ['--version'])
+                assert_equal(result.exit_code, 0)
+                assert_equal(result.output, 'Installed version : 1.2.0\n'
+                                            'Latest version    : N/A\n')
+            # failed lookups are cached as well
+            assert_equal(urlopen.call_count, 1)
+
+    def test_version_timeout(self):
+        """Test version.fetch_latest_version gives up after the timeout"""
+        def hang(*args, **kwargs):
+            time.sleep(1)
+            return pypi_response('1.3.0')
+
+        with mock.patch('miqcli._compat.urlopen', side_effect=hang):
+            start = time.time()
+            assert_is_none(fetch_latest_version(timeout=0.1))
+            assert time.time() - start < 0.5
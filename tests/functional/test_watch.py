@@ -0,0 +1,180 @@
+
+import click
+import mock
+from click.testing import CliRunner
+from nose.tools import assert_equal, assert_raises
+
+from miqcli.api import ClientAPI
+from miqcli.cli.main import cli
+from miqcli.collections.provision_requests import Collections
+from miqcli.watch import WaitNotFound, WaitTimeout, Watcher
+from stub_server import StubServerTestCase, STUB_TOKEN
+
+
+def _requests():
+    return [
+        {'id': str(i), 'request_state': 'pending', 'status': 'Ok',
+         'message': 'pending'}
+        for i in range(1, 6)
+    ]
+
+
+class TestWatch(StubServerTestCase):
+    """Test watch module against a stub server"""
+
+    def setUp(self):
+        super(TestWatch, self).setUp()
+        self.requests = _requests()
+        self.server = self.start_server({'provision_requests': self.requests})
+
+    def client_api(self):
+        api = ClientAPI(dict(url=self.server.url, token=STUB_TOKEN))
+        api.connect()
+        return api
+
+    def advance(self, delay):
+        """Move the next request forward on each sleep."""
+        self.delays.append(delay)
+        for request in self.requests:
+            if request['request_state'] != 'finished':
+                request['request_state'] = 'finished'
+                request['message'] = 'done'
+                return
+
+    def polls(self):
+        return [call for call in self.server.collection_calls(
+            'provision_requests') if call[0] == 'GET']
+
+    @mock.patch('time.sleep')
+    def test_watch_single_query_per_poll(self, sleep):
+        """Test Watcher polls all the requests with one query"""
+        self.delays = []
+        sleep.side_effect = self.advance
+        watcher = Watcher(self.client_api(), 'provision_requests',
+                          ['1', '2', '3', '4', '5'], interval=1)
+        events = list(watcher)
+
+        assert_equal([(e.id, e.previous, e.state) for e in events[:5]],
+                     [(str(i), None, 'pending') for i in range(1, 6)])
+        assert_equal([(e.id, e.previous, e.state) for e in events[5:]],
+                     [(str(i), 'pending', 'finished') for i in range(1, 6)])
+        assert_equal(watcher.pending, [])
+        assert_equal(watcher.polls, 6)
+
+        polls = self.polls()
+        assert_equal(len(polls), 6)
+        assert_equal(len(polls[0][2]['filter[]']), 5)
+        assert_equal(len(polls[-1][2]['filter[]']), 1)
+        assert_equal(polls[0][2]['attributes'],
+                     ['id,request_state,status,message'])
+
+    @mock.patch('time.sleep')
+    def test_watch_backoff(self, sleep):
+        """Test Watcher waits longer while nothing changes"""
+        self.delays = []
+        sleep.side_effect = self.delays.append
+        watcher = Watcher(self.client_api(), 'provision_requests', ['1'],
+                          interval=1, max_interval=3, backoff=2, jitter=0,
+                          timeout=10)
+        events = list(watcher)
+
+        assert_equal(len(events), 1)
+        assert_equal(watcher.pending, ['1'])
+        assert_equal(self.delays[:4], [1, 2, 3, 3])
+
+    @mock.patch('time.sleep')
+    def test_watch_not_found(self, sleep):
+        """Test Watcher reports requests the server does not return"""
+        watcher = Watcher(self.client_api(), 'provision_requests',
+                          ['1', '99'], chunk_size=1)
+        self.requests[0]['request_state'] = 'finished'
+        events = list(watcher)
+
+        assert_equal([(e.id, e.state, e.terminal) for e in events],
+                     [('1', 'finished', True), ('99', None, True)])
+        assert_equal(events[1].message, 'not found')
+        assert_equal(sleep.call_count, 0)
+        assert_equal(len(self.polls()), 2)
+
+    @mock.patch('time.sleep')
+    def test_watch_command(self, sleep):
+        """Test watch prints the state changes until the requests finish"""
+        self.delays = []
+        sleep.side_effect = self.advance
+        result = CliRunner().invoke(
+            cli, ['--url', self.server.url, '--token', STUB_TOKEN, 'watch',
+                  'provision_requests', '1', '2'])
+        assert_equal(result.exception, None)
+        assert u'provision_requests 1: pending, status: Ok' in result.output
+        assert u'provision_requests 2: pending -> finished, status: Ok, ' \
+               u'message: done' in result.output
+
+    @mock.patch('time.sleep')
+    def test_watch_command_timeout(self, sleep):
+        """Test watch fails when the requests do not finish in time"""
+        result = CliRunner().invoke(
+            cli, ['--url', self.server.url, '--token', STUB_TOKEN, 'watch',
+                  'provision_requests', '3', '--timeout', '0'])
+        assert_equal(result.exit_code, 1)
+        assert u'Timed out waiting for provision_requests 3' in result.output
+
+    @mock.patch('time.sleep')
+    def test_watch_jitter(self, sleep):
+        """Test Watcher spreads the delays between polls"""
+        def delay(seconds):
+            self.delays.append(seconds)
+            if len(self.delays) == 10:
+                self.requests[0]['request_state'] = 'finished'
+
+        self.delays = []
+        sleep.side_effect = delay
+        watcher = Watcher(self.client_api(), 'provision_requests', ['1'],
+                          interval=10, max_interval=10, jitter=0.5)
+        list(watcher)
+
+        assert_equal(len(self.delays), 10)
+        assert all(5 <= seconds <= 15 for seconds in self.delays)
+        assert len(set(self.delays)) > 1
+
+    def wait_for(self, *args, **kwargs):
+        with click.Context(cli) as ctx:
+            ctx.client_api = self.client_api()
+            return Collections().wait_for(*args, **kwargs)
+
+    @mock.patch('time.sleep')
+    def test_wait_for(self, sleep):
+        """Test CollectionsMixin.wait_for returns the wait outcome"""
+        self.delays = []
+        sleep.side_effect = self.advance
+        events = []
+        result = self.wait_for('1', callback=events.append)
+
+        assert_equal(result.state, 'finished')
+        assert_equal(result.message, 'done')
+        assert_equal(result.polls, 2)
+        assert result.latency >= 0
+        assert_equal([e.state for e in events], ['pending', 'finished'])
+
+    @mock.patch('time.sleep')
+    def test_wait_for_states(self, sleep):
+        """Test CollectionsMixin.wait_for stops at the given states"""
+        result = self.wait_for('2', states=('active', 'pending'))
+        assert_equal(result.state, 'pending')
+        assert_equal(result.polls, 1)
+        assert_equal(sleep.call_count, 0)
+
+    @mock.patch('time.sleep')
+    def test_wait_for_timeout(self, sleep):
+        """Test CollectionsMixin.wait_for fails after the deadline"""
+        with assert_raises(WaitTimeout) as cm:
+            self.wait_for('3', timeout=0)
+        assert_equal(cm.exception.result.state, 'pending')
+        assert_equal(cm.exception.result.polls, 1)
+
+    @mock.patch('time.sleep')
+    def test_wait_for_not_found(self, sleep):
+        """Test CollectionsMixin.wait_for fails for an unknown id"""
+        with assert_raises(WaitNotFound) as cm:
+            self.wait_for('99', timeout=60)
+        assert_equal(cm.exception.result.id, '99')
+        assert_equal(cm.exception.result.polls, 1)